@@ -1,134 +1,225 @@
-import json
-from google import genai
-from google.genai import types
-from config import GEMINI_API_KEY, VALID_OBJECTIVES, VALID_CTAS, MAX_AD_TEXT_LENGTH, MIN_CAMPAIGN_NAME_LENGTH
-from mock_tiktok_api import MockTikTokAPI
+import os
+from config import MAX_AD_TEXT_LENGTH, MIN_CAMPAIGN_NAME_LENGTH
+from mock_tiktok_api import create_api, create_async_api
+from auth import get_token_manager
+from cache import get_music_cache
+from scheduler import get_submission_scheduler
+from llm import get_llm
+from intent import get_intent_resolver
+from campaign import CampaignDraft, validate_payload
+from rules import field_errors
+from history import ConversationHistory
+from log import get_logger
+from metrics import span, traced, atraced, profiled
+
+# chat steps whose reply is read through the intent resolver, and the step name it knows them by
+INTENT_STEPS = {
+    "collect_campaign_name": "campaign_name",
+    "collect_objective": "objective",
+    "collect_ad_text": "ad_text",
+    "collect_cta": "cta"
+}
 
 class HybridTikTokAgent:
     
-    def __init__(self):
-        # Configure Gemini
-        self.client = genai.Client(api_key=GEMINI_API_KEY)
-        
-        # Initialize API
-        self.api = MockTikTokAPI()
-        auth_result = self.api.oauth_authorize("valid_client", "valid_secret")
-        if auth_result["success"]:
-            print("✅ OAuth Authentication Successful")
-        
-        self.ad_data = {
-            "campaign_name": None,
-            "objective": None,
-            "ad_text": None,
-            "cta": None,
-            "music_option": None,
-            "music_id": None
-        }
+    def __init__(self, authorize=False, history_spill_path=None, quiet=False, api=None, async_api=None):
+        # LLM access is set up on the first _call_gemini(), the deterministic flow never needs it
+        self._llm = None
+        
+        # quiet: reasoning, summaries and API call lines skip the console (they still reach LOG_FILE)
+        self.log = get_logger("agent", quiet)
+        
+        # Initialize API (blocking client for chat/run_from_ui, asyncio client for achat/arun_from_ui)
+        # Both share the process-wide OAuth token, fetched on the first API call unless authorize=True
+        # Callers that keep many agents (e.g. the Streamlit UI) can pass clients to share between them
+        self.tokens = get_token_manager()
+        self.api = api or create_api(quiet=quiet)
+        self.async_api = async_api or create_async_api(quiet=quiet)
+        self.api.token_provider = self.tokens.get_token
+        self.async_api.token_provider = self.tokens.aget_token  # awaited, a cold token never blocks the loop
+        self.api.on_unauthorized = self.async_api.on_unauthorized = self.tokens.invalidate
+        self.music_cache = get_music_cache()
+        self.scheduler = get_submission_scheduler()
+        self.intents = get_intent_resolver()
+        if authorize:
+            self._report_auth(self.tokens.get_token())
+        
+        self.ad_data = CampaignDraft()
         self.current_step = "start"
-        self.conversation_history = []
+        self.conversation_history = ConversationHistory(spill_path=history_spill_path)
+        self.last_reasoning = None  # checks behind the latest submission decision, as data
+    
+    @classmethod
+    async def acreate(cls, **kwargs):
+        """Build an agent with a token ready, without blocking the event loop on OAuth"""
+        agent = cls(**kwargs)
+        agent._report_auth(await agent.tokens.aget_token())
+        return agent
+    
+    @property
+    def llm(self):
+        if self._llm is None:
+            self._llm = get_llm()
+        return self._llm
+    
+    def _report_auth(self, access_token):
+        if access_token:
+            self.log.info("✅ OAuth Authentication Successful", event="oauth")
+        else:
+            error = self.tokens.last_error or {}
+            self.log.error(f"❌ OAuth Authentication Failed: {error.get('message')}", event="oauth", error=error.get("error"))
     
     def _call_gemini(self, prompt):
 
-        try:
-            response = self.client.models.generate_content(
-                model='gemini-2.0-flash-exp',
-                contents=prompt
-            )
-            text = response.text.strip()
-            text = text.replace('```', '').strip()
-            return text
-        except Exception as e:
-            print(f"⚠️ Gemini error: {e}")
-            return None
+        with span("llm") as llm_span:
+            try:
+                text = self.llm.generate(prompt).strip()
+                text = text.replace('```', '').strip()
+                return text
+            except Exception as e:
+                llm_span.fail(type(e).__name__)
+                self.log.warning(f"⚠️ Gemini error: {e}", event="llm", error=type(e).__name__)
+                return None
     
-    def _is_question(self, text):
-        question_words = ['what', 'why', 'how', 'when', 'where', 'who', 'is', 'are', 'can', 'should', 'do', 'does']
-        text_lower = text.lower().strip()
-        
-        if text_lower.endswith('?'):
-            return True
-        
-        first_word = text_lower.split()[0] if text_lower.split() else ""
-        if first_word in question_words:
-            return True
-        
-        return False
+    async def _acall_gemini(self, prompt):
+        """_call_gemini() on a worker thread, so a slow Gemini answer never blocks the event loop"""
+        import asyncio  # lazy, see AsyncMockTikTokAPI
+        return await asyncio.to_thread(self._call_gemini, prompt)
+    
+    def _intent(self, step, user_input):
+        """Rules, then cached LLM verdicts, then Gemini for replies the rules are unsure about"""
+        return self.intents.resolve(step, user_input, self._call_gemini)
+    
+    def _is_music_id(self, text):
+        """ID-shaped input (e.g. music_12345), as opposed to a menu choice or a sentence"""
+        return "_" in text and not field_errors("music_id", text)
     
     def chat(self, user_message):
         """Main conversation interface"""
         
+        with span("agent_step", step=self.current_step), profiled():
+            return self._chat(user_message)
+    
+    def _chat(self, user_message):
         self.conversation_history.append({
             "role": "user",
             "content": user_message
         })
         
         # Route to appropriate handler
+        if self.current_step == "collect_music":
+            response = self._handle_music(user_message)
+        
+        elif self.current_step == "validate":
+            response = self._validate_and_submit()
+        
+        else:
+            response = self._route(user_message)
+        
+        self.conversation_history.append({
+            "role": "assistant",
+            "content": response
+        })
+        
+        return response
+    
+    async def achat(self, user_message):
+        """Async variant of chat() that awaits the API instead of blocking"""
+        
+        with span("agent_step", step=self.current_step), profiled():
+            return await self._achat(user_message)
+    
+    async def _achat(self, user_message):
+        self.conversation_history.append({
+            "role": "user",
+            "content": user_message
+        })
+        
+        if self.current_step == "collect_music":
+            response = await self._ahandle_music(user_message)
+        
+        elif self.current_step == "validate":
+            response = await self._avalidate_and_submit()
+        
+        else:
+            response = await self._aroute(user_message)
+        
+        self.conversation_history.append({
+            "role": "assistant",
+            "content": response
+        })
+        
+        return response
+    
+    async def _aroute(self, user_message):
+        """_route() with the reply's intent resolved first, the LLM tier off the event loop"""
+        step = INTENT_STEPS.get(self.current_step)
+        intent = None
+        if step is not None:
+            intent = await self.intents.aresolve(step, user_message, self._acall_gemini)
+        return self._route(user_message, intent)
+    
+    def _route(self, user_message, intent=None):
+        """Steps that never touch the API; `intent` is the reply's, when already resolved"""
+        
         if self.current_step == "start":
             response = "👋 Hi! I'll help you create an AI TikTok ad campaign.\n\nLet's start with the basics. What would you like to name your campaign? (minimum 3 characters)"
             self.current_step = "collect_campaign_name"
         
         elif self.current_step == "collect_campaign_name":
-            response = self._handle_campaign_name(user_message)
+            response = self._handle_campaign_name(user_message, intent)
         
         elif self.current_step == "collect_objective":
-            response = self._handle_objective(user_message)
+            response = self._handle_objective(user_message, intent)
         
         elif self.current_step == "collect_ad_text":
-            response = self._handle_ad_text(user_message)
+            response = self._handle_ad_text(user_message, intent)
         
         elif self.current_step == "collect_cta":
-            response = self._handle_cta(user_message)
-        
-        elif self.current_step == "collect_music":
-            response = self._handle_music(user_message)
-        
-        elif self.current_step == "validate":
-            response = self._validate_and_submit()
+            response = self._handle_cta(user_message, intent)
         
         else:
             response = "I'm not sure what to do next. Let's start over."
             self.current_step = "start"
         
-        self.conversation_history.append({
-            "role": "assistant",
-            "content": response
-        })
-        
         return response
     
-    def _handle_campaign_name(self, user_input):
+    @traced("agent_handler", handler="campaign_name")
+    def _handle_campaign_name(self, user_input, intent=None):
         """Collect campaign name with smart validation"""
         
         # Check if user is asking a question
-        if self._is_question(user_input):
+        if (intent or self._intent("campaign_name", user_input)).is_question:
             return "A campaign name is a title for your ad campaign (Example like 'Summer Sale 2024' or 'Product Launch'). It needs to be at least 3 characters. What would you like to name your campaign?"
         
         name = user_input.strip()
         
         # Validate length
-        if len(name) < MIN_CAMPAIGN_NAME_LENGTH:
+        if field_errors("campaign_name", name):
             return f"❌ Campaign name is too short. You entered '{name}' which is {len(name)} character(s). Please provide at least {MIN_CAMPAIGN_NAME_LENGTH} characters:"
         
         # Success
-        self.ad_data["campaign_name"] = name
+        self.ad_data.campaign_name = name
         self.current_step = "collect_objective"
         
         return f"✅ Great! Campaign name set to: '{name}'\n\nNow, what's your campaign objective?\n1. Traffic - Drive users to your website\n2. Conversions - Drive specific actions (purchases, sign-ups)\n\nPlease type: Traffic or Conversions"
     
-    def _handle_objective(self, user_input):
+    @traced("agent_handler", handler="objective")
+    def _handle_objective(self, user_input, intent=None):
         """Collect objective with clear validation"""
         
-        if self._is_question(user_input):
+        intent = intent or self._intent("objective", user_input)
+        if intent.is_question:
             return "These are the only two objectives TikTok offers:\n• Traffic - Gets people to visit your website\n• Conversions - Gets people to take action (buy, sign up, download)\n\nWhich one do you want? Type: Traffic or Conversions"
         
-        objective = user_input.strip().capitalize()
+        objective = intent.value or user_input.strip().capitalize()
         
         # Validate
-        if objective not in VALID_OBJECTIVES:
+        if field_errors("objective", objective):
             return f"❌ '{user_input}' is not a valid objective.\n\nPlease choose exactly:\n• Traffic (for website visits)\n• Conversions (for purchases/sign-ups)\n\nType one of these:"
         
         # Success
-        self.ad_data["objective"] = objective
+        self.ad_data.objective = objective
         self.current_step = "collect_ad_text"
         
         music_note = ""
@@ -137,193 +228,270 @@ class HybridTikTokAgent:
         
         return f"✅ Objective set to: {objective}{music_note}\n\nWhat text would you like to display in your ad?\n(Maximum {MAX_AD_TEXT_LENGTH} characters - this is the main message users will see)"
     
-    def _handle_ad_text(self, user_input):
+    @traced("agent_handler", handler="ad_text")
+    def _handle_ad_text(self, user_input, intent=None):
         """Collect ad text with clear validation"""
         
-        if self._is_question(user_input):
+        if (intent or self._intent("ad_text", user_input)).is_question:
             return f"Yes, ad text is required. It's the main message that appears in your ad (like 'Summer Sale - 50% Off!' or 'New Collection Out Now'). Maximum {MAX_AD_TEXT_LENGTH} characters.\n\nWhat message would you like to show?"
         
         text = user_input.strip()
         
         # Validate
-        if len(text) == 0:
+        failed = field_errors("text", text)
+        if "ad_text_empty" in failed:
             return "❌ Ad text cannot be empty. Please enter the message you want to show in your ad:"
         
-        if len(text) > MAX_AD_TEXT_LENGTH:
+        if "ad_text_too_long" in failed:
             return f"❌ Ad text is too long!\n\nYour text: '{text}'\nLength: {len(text)} characters\nMaximum: {MAX_AD_TEXT_LENGTH} characters\n\nPlease shorten your message by {len(text) - MAX_AD_TEXT_LENGTH} characters:"
         
         # Success
-        self.ad_data["ad_text"] = text
+        self.ad_data.ad_text = text
         self.current_step = "collect_cta"
         
         return f"✅ Ad text set!\n\nNow, what Call-to-Action (CTA) button would you like?\n\nAvailable options:\n• Shop Now\n• Learn More\n• Sign Up\n• Download\n• Get App\n• Watch Now\n\nPlease type one of these exactly:"
     
-    def _handle_cta(self, user_input):
+    @traced("agent_handler", handler="cta")
+    def _handle_cta(self, user_input, intent=None):
         """Collect CTA with fuzzy matching and clear errors"""
 
-        if self._is_question(user_input):
+        intent = intent or self._intent("cta", user_input)
+        if intent.is_question:
             return "A CTA (Call-to-Action) is the button users click on your ad. Different buttons work for different goals:\n• Shop Now - for e-commerce\n• Learn More - for information\n• Sign Up - for registrations\n• Download - for apps\n• Get App - for mobile apps\n• Watch Now - for videos\n\nWhich one fits your ad best?"
         
-        user_cta = user_input.strip().lower()
-        
-        matched_cta = None
-        for valid_cta in VALID_CTAS:
-            if user_cta == valid_cta.lower():
-                matched_cta = valid_cta
-                break
-        
-        # Try fuzzy matching
-        if not matched_cta:
-            cta_map = {
-                'shop': 'Shop Now',
-                'buy': 'Shop Now',
-                'purchase': 'Shop Now',
-                'learn': 'Learn More',
-                'more': 'Learn More',
-                'info': 'Learn More',
-                'signup': 'Sign Up',
-                'sign up': 'Sign Up',
-                'register': 'Sign Up',
-                'download': 'Download',
-                'install': 'Download',
-                'get': 'Get App',
-                'app': 'Get App',
-                'watch': 'Watch Now',
-                'view': 'Watch Now',
-                'play': 'Watch Now'
-            }
-            
-            for keyword, cta in cta_map.items():
-                if keyword in user_cta:
-                    matched_cta = cta
-                    break
+        # exact names, then keywords such as "buy" or "install" (see intent.py)
+        matched_cta = intent.value
         
         # Show error if no match
         if not matched_cta:
             return f"❌ '{user_input}' doesn't match any available CTA.\n\nPlease choose from these exact options:\n• Shop Now\n• Learn More\n• Sign Up\n• Download\n• Get App\n• Watch Now\n\nType one of these:"
         
         # Success
-        self.ad_data["cta"] = matched_cta
+        self.ad_data.cta = matched_cta
         self.current_step = "collect_music"
+        # every step from here on calls the API: let OAuth happen while the user picks music
+        self.tokens.prefetch()
         
         # Different prompts based on objective
-        if self.ad_data["objective"] == "Conversions":
+        if self.ad_data.objective == "Conversions":
             return f"✅ CTA set to: {matched_cta}\n\n🎵 Music is REQUIRED for Conversions campaigns.\n\nHow would you like to add music?\n1. Use existing music (you provide a music ID)\n2. Upload custom music\n\nType 1 or 2:"
         else:
             return f"✅ CTA set to: {matched_cta}\n\n🎵 Would you like to add music to your ad?\n\n1. Use existing music (you provide a music ID)\n2. Upload custom music\n3. No music\n\nType 1, 2, or 3:"
     
+    @traced("agent_handler", handler="music")
     def _handle_music(self, user_input):
         """Handle music selection with clear guidance"""
         
+        # file paths are case-sensitive, menu choices are not
+        file_path = os.path.expanduser(user_input.strip())
+        user_input = user_input.strip().lower()
+        
+        response = self._select_music_option(user_input)
+        if response is not None:
+            return response
+        
+        if self.current_step == "validate":
+            # Automatically proceed to validation - no need for user input
+            return self._validate_and_submit()
+        
+        # Handling music ID validation
+        if self.ad_data.music_option == "existing":
+            response = self._music_validation_response(user_input, self.music_cache.validate(self.api, user_input))
+        
+        # file upload
+        elif self.ad_data.music_option == "custom":
+            response = self._music_upload_response(self.api.upload_music(file_path))
+        
+        else:
+            return self._invalid_music_choice()
+        
+        if self.current_step == "validate":
+            # Automatically proceed to validation
+            response += self._validate_and_submit()
+        return response
+    
+    @atraced("agent_handler", handler="music")
+    async def _ahandle_music(self, user_input):
+        """Async variant of _handle_music()"""
+        
+        # file paths are case-sensitive, menu choices are not
+        file_path = os.path.expanduser(user_input.strip())
         user_input = user_input.strip().lower()
         
+        response = self._select_music_option(user_input)
+        if response is not None:
+            return response
+        
+        if self.current_step == "validate":
+            return await self._avalidate_and_submit()
+        
+        if self.ad_data.music_option == "existing":
+            response = self._music_validation_response(user_input, await self.music_cache.avalidate(self.async_api, user_input))
+        
+        elif self.ad_data.music_option == "custom":
+            response = self._music_upload_response(await self.async_api.upload_music(file_path))
+        
+        else:
+            return self._invalid_music_choice()
+        
+        if self.current_step == "validate":
+            response += await self._avalidate_and_submit()
+        return response
+    
+    def _select_music_option(self, user_input):
+        """Menu choices; returns None when the input needs an API call (or skips straight to validation)"""
+        
         # If user is trying to skip music
         if user_input in ["3", "no music", "none", "no", "skip"]:
-            if self.ad_data["objective"] == "Conversions":
+            if field_errors("music_id", None, objective=self.ad_data.objective):
                 return f"❌ Cannot skip music for Conversions campaigns.\n\nWhy? Music significantly increases engagement, which is critical for driving conversions (purchases, sign-ups, etc.).\n\nPlease choose option 1 or 2:"
             
-            self.ad_data["music_option"] = "none"
-            self.ad_data["music_id"] = None
+            self.ad_data.music_option = "none"
+            self.ad_data.music_id = None
             self.current_step = "validate"
-            # Automatically proceed to validation - no need for user input
-            return self._validate_and_submit()
+            return None
         
         if user_input in ["1", "existing", "use existing"]:
-            self.ad_data["music_option"] = "existing"
+            self.ad_data.music_option = "existing"
             return "Please enter the Music ID (example: music_12345):"
         
         if user_input in ["2", "upload", "custom"]:
-            self.ad_data["music_option"] = "custom"
+            self.ad_data.music_option = "custom"
             return "Please enter the file path of your music file (example: /path/to/song.mp3):"
         
-        # Handling music ID validation
-        if self.ad_data["music_option"] == "existing":
-            music_id = user_input
-            result = self.api.validate_music_id(music_id)
-            
-            if result["success"]:
-                self.ad_data["music_id"] = music_id
-                self.current_step = "validate"
-                # Automatically proceed to validation
-                return f"✅ Music validated successfully!\n\nMusic: {result['title']}\nDuration: {result['duration']}s\n\n" + self._validate_and_submit()
-            else:
-                error_msg = f"❌ Music validation failed\n\nMusic ID: {music_id}\nError: {result['message']}\n\n"
-                
-                if self.ad_data["objective"] == "Conversions":
-                    error_msg += "What would you like to do?\n1. Try a different music ID\n2. Upload custom music\n\nType 1 or 2:"
-                else:
-                    error_msg += "What would you like to do?\n1. Try a different music ID\n2. Upload custom music\n3. Continue without music\n\nType 1, 2, or 3:"
-                
-                return error_msg
+        if self.ad_data.music_option is None and self._is_music_id(user_input):
+            # a music ID typed straight at the menu counts as option 1; the caller validates it
+            # synchronously, as the reply depends on the result (there is no later input to overlap with)
+            self.ad_data.music_option = "existing"
         
-        # file upload
-        if self.ad_data["music_option"] == "custom":
-            file_path = user_input
-            result = self.api.upload_music(file_path)
-            
-            if result["success"]:
-                self.ad_data["music_id"] = result["music_id"]
-                self.current_step = "validate"
-                return f"✅ Music uploaded successfully!\n\nGenerated Music ID: {result['music_id']}\n\n" + self._validate_and_submit()
-            else:
-                return f"❌ Upload failed: {result['message']}\n\nPlease try again with a valid file path:"
-        
-        # Invalid input
-        if self.ad_data["objective"] == "Conversions":
+        return None
+    
+    def _music_validation_response(self, music_id, result):
+        if result["success"]:
+            self.ad_data.music_id = music_id
+            self.current_step = "validate"
+            return f"✅ Music validated successfully!\n\nMusic: {result['title']}\nDuration: {result['duration']}s\n\n"
+        
+        error_msg = f"❌ Music validation failed\n\nMusic ID: {music_id}\nError: {result['message']}\n\n"
+        
+        suggestions = result.get("suggestions")
+        if suggestions:
+            error_msg += "💡 Did you mean:\n"
+            for track in suggestions:
+                error_msg += f"• {track['music_id']} - {track['title']} ({track['duration']}s)\n"
+            error_msg += "\nType one of these IDs to use it, or:\n"
+        
+        if self.ad_data.objective == "Conversions":
+            error_msg += "What would you like to do?\n1. Try a different music ID\n2. Upload custom music\n\nType 1 or 2:"
+        else:
+            error_msg += "What would you like to do?\n1. Try a different music ID\n2. Upload custom music\n3. Continue without music\n\nType 1, 2, or 3:"
+        
+        return error_msg
+    
+    def _music_upload_response(self, result):
+        if result["success"]:
+            self.ad_data.music_id = result["music_id"]
+            self.current_step = "validate"
+            if result.get("deduplicated"):
+                return f"✅ This track was uploaded before, reusing it.\n\nMusic ID: {result['music_id']}\n\n"
+            return f"✅ Music uploaded successfully!\n\nGenerated Music ID: {result['music_id']}\n\n"
+        
+        return f"❌ Upload failed: {result['message']}\n\nPlease try again with a valid file path:"
+    
+    def _invalid_music_choice(self):
+        if self.ad_data.objective == "Conversions":
             return "❌ Invalid choice. Please type 1 or 2:"
         else:
             return "❌ Invalid choice. Please type 1, 2, or 3:"
     
+    @traced("agent_handler", handler="validate_and_submit")
     def _validate_and_submit(self):
         """Final validation and submission"""
         
-        # Show reasoning
-        print("\nINTERNAL REASONING:")
-        print("="*50)
-        print("✓ Validating all required fields are collected...")
-        print(f"✓ Campaign Name: '{self.ad_data['campaign_name']}' (min 3 chars) - VALID")
-        print(f"✓ Objective: '{self.ad_data['objective']}' (Traffic/Conversions) - VALID")
-        print(f"✓ Ad Text: {len(self.ad_data['ad_text'])} chars (max 100) - VALID")
-        print(f"✓ CTA: '{self.ad_data['cta']}' - VALID")
-        
-        # Check music logic
-        if self.ad_data['objective'] == 'Conversions' and not self.ad_data['music_id']:
-            print("✗ Music: MISSING (required for Conversions) - INVALID")
-            print("="*50)
-            return "❌ Validation failed: Music is mandatory for Conversions campaigns."
-        elif self.ad_data['music_id']:
-            print(f"✓ Music: '{self.ad_data['music_id']}' - VALID")
-        else:
-            print("✓ Music: None (optional for Traffic) - VALID")
-        
-        print("✓ All validations passed!")
-        print("="*50)
-        
-        # Build payload
-        payload = {
-            "campaign_name": self.ad_data["campaign_name"],
-            "objective": self.ad_data["objective"],
-            "creative": {
-                "text": self.ad_data["ad_text"],
-                "cta": self.ad_data["cta"],
-                "music_id": self.ad_data["music_id"]
-            }
-        }
+        payload, error_response = self._prepare_submission()
+        if error_response:
+            return error_response
         
-        # Display summary
-        summary = f"\n{'='*50}\n📊 AD CAMPAIGN SUMMARY\n{'='*50}\n"
-        summary += f"Campaign Name: {payload['campaign_name']}\n"
-        summary += f"Objective: {payload['objective']}\n"
-        summary += f"Ad Text: {payload['creative']['text']}\n"
-        summary += f"CTA: {payload['creative']['cta']}\n"
-        summary += f"Music ID: {payload['creative']['music_id'] or 'None'}\n"
-        summary += f"{'='*50}\n"
-        print(summary)
+        return self._submission_response(self.scheduler.submit(self.api, payload))
+    
+    @atraced("agent_handler", handler="validate_and_submit")
+    async def _avalidate_and_submit(self):
+        """Async variant of _validate_and_submit()"""
         
-        print("📤 Submitting to TikTok Ads API...")
+        payload, error_response = self._prepare_submission()
+        if error_response:
+            return error_response
         
-        result = self.api.submit_ad(payload)
+        return self._submission_response(await self.scheduler.asubmit(self.async_api, payload))
+    
+    def _prepare_submission(self):
+        """Run the deterministic checks and show the summary, returns (payload, error response)"""
         
+        payload = self.get_payload()
+        errors = {e["error"]: e["message"] for e in validate_payload(payload)}
+        
+        self.last_reasoning = self._reasoning(payload, errors)
+        self._log_reasoning(self.last_reasoning, not errors)
+        
+        if errors:
+            if "missing_music" in errors:
+                return None, "❌ Validation failed: Music is mandatory for Conversions campaigns."
+            return None, "❌ Validation failed:\n" + "\n".join(f"• {message}" for message in errors.values())
+        
+        # Display summary
+        if not self.log.console:
+            self.log.info("submitting", event="submit", payload=payload)
+        elif self.log.enabled():
+            summary = f"\n{'='*50}\n📊 AD CAMPAIGN SUMMARY\n{'='*50}\n"
+            summary += f"Campaign Name: {payload['campaign_name']}\n"
+            summary += f"Objective: {payload['objective']}\n"
+            summary += f"Ad Text: {payload['creative']['text']}\n"
+            summary += f"CTA: {payload['creative']['cta']}\n"
+            summary += f"Music ID: {payload['creative']['music_id'] or 'None'}\n"
+            summary += f"{'='*50}\n"
+            self.log.info(summary, event="summary", payload=payload)
+            self.log.info("📤 Submitting to TikTok Ads API...", event="submit")
+        
+        return payload, None
+    
+    def _reasoning(self, payload, errors):
+        """Each deterministic check as {"check", "valid", "detail"}"""
+        creative = payload["creative"]
+        if "missing_music" in errors:
+            music = (False, "Music: MISSING (required for Conversions)")
+        elif "invalid_music_id" in errors:
+            music = (False, f"Music: '{creative['music_id']}'")
+        elif creative["music_id"]:
+            music = (True, f"Music: '{creative['music_id']}'")
+        else:
+            music = (True, "Music: None (optional for Traffic)")
+        checks = [
+            ("campaign_name", "invalid_campaign_name" not in errors,
+             f"Campaign Name: '{payload['campaign_name']}' (min {MIN_CAMPAIGN_NAME_LENGTH} chars)"),
+            ("objective", "invalid_objective" not in errors, f"Objective: '{payload['objective']}' (Traffic/Conversions)"),
+            ("ad_text", "invalid_ad_text" not in errors,
+             f"Ad Text: {len(creative['text'] or '')} chars (max {MAX_AD_TEXT_LENGTH})"),
+            ("cta", "invalid_cta" not in errors, f"CTA: '{creative['cta']}'"),
+            ("music",) + music
+        ]
+        return [{"check": check, "valid": valid, "detail": detail} for check, valid, detail in checks]
+    
+    def _log_reasoning(self, reasoning, valid):
+        if not self.log.enabled():
+            return
+        if not self.log.console:
+            # the JSON sink gets the checks as data, the text block is only for people watching
+            self.log.info("reasoning", event="reasoning", reasoning=reasoning, valid=valid)
+            return
+        lines = ["\nINTERNAL REASONING:", "="*50, "✓ Validating all required fields are collected..."]
+        for check in reasoning:
+            lines.append(f"✓ {check['detail']} - VALID" if check["valid"] else f"✗ {check['detail']} - INVALID")
+        if valid:
+            lines.append("✓ All validations passed!")
+        lines.append("="*50)
+        self.log.info("\n".join(lines), event="reasoning", reasoning=reasoning, valid=valid)
+    
+    def _submission_response(self, result):
         if result["success"]:
             self.current_step = "complete"
             return f"\n🎉 SUCCESS! Your ad campaign has been created!\n\n📋 Campaign Details:\n• Campaign ID: {result['campaign_id']}\n• Ad ID: {result['ad_id']}\n• Status: {result['status']}\n\nYour ad is now live on TikTok!"
@@ -339,7 +507,7 @@ class HybridTikTokAgent:
                 
                 "invalid_music_id": f"❌ Invalid Music\n\n{message}\n\nThe music ID may have been:\n• Removed from TikTok's library\n• Restricted in your region\n• Typed incorrectly\n\nPlease use a different music ID.",
                 
-                "rate_limit": f"⏱️ Rate Limit Exceeded\n\n{message}\n\nTikTok's API has rate limits. Please wait 60 seconds and try again.",
+                "rate_limit": f"⏱️ Rate Limit Exceeded\n\n{message}\n\nTikTok's API has rate limits and automatic retries ({result.get('attempts', 1)} attempts) did not get through. Please wait 60 seconds and try again.",
                 
                 "geo_restriction": f"🌍 Geographic Restriction\n\n{message}\n\nAction needed:\n1. Check your TikTok Ads account region settings\n2. Verify your business is approved for ads in your region\n3. Contact TikTok support if issue persists",
                 
@@ -350,50 +518,107 @@ class HybridTikTokAgent:
     
     def get_payload(self):
         """Return final payload"""
-        return {
-            "campaign_name": self.ad_data["campaign_name"],
-            "objective": self.ad_data["objective"],
-            "creative": {
-                "text": self.ad_data["ad_text"],
-                "cta": self.ad_data["cta"],
-                "music_id": self.ad_data["music_id"]
-            }
-        }
+        return self.ad_data.to_payload()
         
-    def run_from_ui(self, campaign_name, objective, ad_text, cta, music_option, music_id=None):
+    def run_from_ui(self, campaign_name, objective, ad_text, cta, music_option, music_id=None, music_file=None):
         """Run the agent from UI inputs (for Streamlit)"""
         
-        self.ad_data["campaign_name"] = campaign_name.strip()
-        
-        self.ad_data["objective"] = objective.strip().capitalize()
+        with span("agent_ui_run", music_option=music_option), profiled():
+            return self._run_from_ui(campaign_name, objective, ad_text, cta, music_option, music_id, music_file)
+    
+    def _run_from_ui(self, campaign_name, objective, ad_text, cta, music_option, music_id, music_file):
+        self._apply_ui_inputs(campaign_name, objective, ad_text, cta, music_option)
+        
+        # Cheap deterministic checks first: no round trip before a too-long ad text is reported
+        error = self._ui_precheck(music_option, music_id, music_file)
+        if error:
+            return {"error": error}
+        
+        # Start OAuth (when the token is missing or stale) now. Only the local part of the music
+        # step overlaps it (cache lookup, reading and hashing an upload): every remote call
+        # waits for the token, so a cold token costs OAuth + music call + submission
+        # (benchmarks/ui_latency.py). ui.py fetches the token at page load to keep it warm.
+        self.tokens.prefetch()
+        if music_option == "Use Existing Music":
+            error = self._ui_music_result(music_id, self.music_cache.validate(self.api, music_id))
+        elif music_option == "Upload Custom Music":
+            error = self._ui_music_result(None, self.api.upload_music(music_file))
+        if error:
+            return {"error": error}
         
-        self.ad_data["ad_text"] = ad_text.strip()
+        self.current_step = "validate"
+        return self._ui_result(self._validate_and_submit())
+    
+    async def arun_from_ui(self, campaign_name, objective, ad_text, cta, music_option, music_id=None, music_file=None):
+        """Async variant of run_from_ui()"""
         
-        self.ad_data["cta"] = cta.strip()
+        with span("agent_ui_run", music_option=music_option), profiled():
+            return await self._arun_from_ui(campaign_name, objective, ad_text, cta, music_option, music_id, music_file)
+    
+    async def _arun_from_ui(self, campaign_name, objective, ad_text, cta, music_option, music_id, music_file):
+        self._apply_ui_inputs(campaign_name, objective, ad_text, cta, music_option)
         
-        self.ad_data["music_option"] = music_option.lower()
+        error = self._ui_precheck(music_option, music_id, music_file)
+        if error:
+            return {"error": error}
         
-        if music_option == "No Music":
-            if self.ad_data["objective"] == "Conversions":
-                return {"error": "Music is mandatory for Conversions campaigns. Please add music."}
-            self.ad_data["music_id"] = None
-        elif music_option == "Use Existing Music":
-            if not music_id:
-                return {"error": "Please provide a Music ID."}
-            result = self.api.validate_music_id(music_id)
-            if not result["success"]:
-                return {"error": f"Music validation failed: {result['message']}"}
-            self.ad_data["music_id"] = music_id
+        # same order as _run_from_ui()
+        self.tokens.prefetch()
+        if music_option == "Use Existing Music":
+            error = self._ui_music_result(music_id, await self.music_cache.avalidate(self.async_api, music_id))
         elif music_option == "Upload Custom Music":
-            result = self.api.upload_music("path/to/uploaded/file")
-            if not result["success"]:
-                return {"error": f"Music upload failed: {result['message']}"}
-            self.ad_data["music_id"] = result["music_id"]
+            error = self._ui_music_result(None, await self.async_api.upload_music(music_file))
+        if error:
+            return {"error": error}
         
         self.current_step = "validate"
-        submission_response = self._validate_and_submit()
+        return self._ui_result(await self._avalidate_and_submit())
+    
+    def _ui_precheck(self, music_option, music_id, music_file):
+        """Every rule that needs no API call, returns an error message or None"""
+        
+        if music_option == "Use Existing Music" and not music_id:
+            return "Please provide a Music ID."
+        if music_option == "Upload Custom Music" and music_file is None:
+            return "Please upload a music file."
+        
+        payload = self.get_payload()
+        payload["creative"]["music_id"] = music_id if music_option == "Use Existing Music" else None
+        errors = validate_payload(payload)
+        if music_option == "Upload Custom Music":
+            # the upload supplies the music ID
+            errors = [e for e in errors if e["error"] != "missing_music"]
+        
+        if not errors:
+            return None
+        if any(e["error"] == "missing_music" for e in errors):
+            return "Music is mandatory for Conversions campaigns. Please add music."
+        return "❌ Validation failed:\n" + "\n".join(f"• {e['message']}" for e in errors)
+    
+    def _ui_music_result(self, music_id, result):
+        """Record a validated or uploaded track, returns an error message or None"""
+        if not result["success"]:
+            action = "validation" if music_id else "upload"
+            return f"Music {action} failed: {result['message']}"
+        self.ad_data.music_id = music_id or result["music_id"]
+        return None
+    
+    def _apply_ui_inputs(self, campaign_name, objective, ad_text, cta, music_option):
+        
+        self.ad_data.campaign_name = campaign_name.strip()
+        
+        self.ad_data.objective = objective.strip().capitalize()
         
+        self.ad_data.ad_text = ad_text.strip()
+        
+        self.ad_data.cta = cta.strip()
+        
+        self.ad_data.music_option = music_option.lower()
+        
+        self.ad_data.music_id = None
+    
+    def _ui_result(self, submission_response):
         if self.current_step == "complete":
-            return {"payload": self.get_payload()}
+            return {"payload": self.get_payload(), "reasoning": self.last_reasoning}
         else:
-            return {"error": submission_response}
\ No newline at end of file
+            return {"error": submission_response, "reasoning": self.last_reasoning}
\ No newline at end of file
@@ -0,0 +1,125 @@
+import threading
+import time
+from config import TIKTOK_CLIENT_ID, TIKTOK_CLIENT_SECRET, TOKEN_REFRESH_MARGIN
+from mock_tiktok_api import create_api
+
+
+class TokenManager:
+    """Process-wide OAuth token cache with single-flight, expiry-aware refresh"""
+
+    def __init__(self, api=None, client_id=TIKTOK_CLIENT_ID, client_secret=TIKTOK_CLIENT_SECRET,
+                 refresh_margin=TOKEN_REFRESH_MARGIN, clock=time.monotonic):
+        self.api = api or create_api(quiet=True)  # the callers report the outcome, not every refresh
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.refresh_margin = refresh_margin
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._token = None
+        self._expires_at = 0.0
+        self._inflight = None  # threading.Event of the refresh currently running
+        self._timer = None
+        self.last_error = None
+        self.refresh_count = 0
+
+    def get_token(self):
+        """Return a usable access token, or None if OAuth failed (see last_error)"""
+        with self._lock:
+            now = self.clock()
+            if self._token and now < self._expires_at:
+                # still valid, refresh in the background if we're inside the margin
+                if now >= self._expires_at - self.refresh_margin:
+                    self._start_refresh()
+                return self._token
+            inflight = self._start_refresh()
+
+        # everyone without a usable token waits on the same refresh
+        inflight.wait()
+        with self._lock:
+            return self._token if self.clock() < self._expires_at else None
+
+    async def aget_token(self):
+        """Async variant of get_token(), never blocks the event loop"""
+        import asyncio  # lazy, see AsyncMockTikTokAPI
+        with self._lock:
+            if self._token and self.clock() < self._expires_at - self.refresh_margin:
+                return self._token
+        return await asyncio.to_thread(self.get_token)
+
+    def prefetch(self):
+        """Start fetching a token in the background if there is no fresh one, without waiting"""
+        with self._lock:
+            if not self._token or self.clock() >= self._expires_at - self.refresh_margin:
+                self._start_refresh()
+
+    def expires_in(self):
+        """Seconds until the cached token expires (0 if there is none)"""
+        with self._lock:
+            return max(0.0, self._expires_at - self.clock()) if self._token else 0.0
+
+    def invalidate(self, token=None):
+        """Drop the cached token after the API answered `unauthorized`, so the next get_token() re-authorizes.
+
+        With `token`, only if that is still the cached one: a newer token from a refresh stays.
+        """
+        with self._lock:
+            if token is not None and token != self._token:
+                return
+            self._token = None
+            self._expires_at = 0.0
+            self._cancel_timer()
+
+    def _start_refresh(self):
+        # caller holds self._lock
+        if self._inflight is None:
+            self._inflight = threading.Event()
+            threading.Thread(target=self._refresh, name="oauth-refresh", daemon=True).start()
+        return self._inflight
+
+    def _refresh(self):
+        try:
+            auth_result = self.api.oauth_authorize(self.client_id, self.client_secret)
+        except Exception as e:
+            auth_result = {"success": False, "error": "exception", "message": str(e)}
+
+        with self._lock:
+            if auth_result["success"]:
+                self._token = auth_result["access_token"]
+                self._expires_at = self.clock() + auth_result["expires_in"]
+                self.last_error = None
+                self.refresh_count += 1
+                self._schedule_refresh(auth_result["expires_in"])
+            else:
+                self.last_error = auth_result
+            inflight, self._inflight = self._inflight, None
+        inflight.set()
+
+    def _schedule_refresh(self, expires_in):
+        # caller holds self._lock
+        self._cancel_timer()
+        self._timer = threading.Timer(max(0.0, expires_in - self.refresh_margin), self._proactive_refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _proactive_refresh(self):
+        with self._lock:
+            self._start_refresh()
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_token_manager():
+    """Shared TokenManager for the whole process"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = TokenManager()
+        return _manager
@@ -0,0 +1,148 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from campaign import fingerprint
+from config import SUBMIT_BATCH_SIZE, SUBMIT_BATCH_MAX_WAIT
+from mock_tiktok_api import MAX_BATCH_SIZE
+from scheduler import SubmissionScheduler
+
+DEFAULT_MAX_IN_FLIGHT = 8  # batches being sent at once
+
+
+class _Pending:
+    __slots__ = ("payload", "key", "future", "attempt", "submitted_at")
+
+    def __init__(self, payload, key, future, attempt=0):
+        self.payload = payload
+        self.key = key
+        self.future = future
+        self.attempt = attempt
+        self.submitted_at = time.time()
+
+
+class MicroBatcher:
+    """Coalesces single submissions into submit_ads batches.
+
+    A batch is sent as soon as it holds `batch_size` ads or its oldest ad has waited
+    `max_wait` seconds. Pacing, retries and deduplication come from the scheduler:
+    one bucket token per round trip, and each ad in a batch succeeds, fails or is
+    retried (in a later batch) on its own.
+    """
+
+    def __init__(self, api, scheduler=None, batch_size=SUBMIT_BATCH_SIZE, max_wait=SUBMIT_BATCH_MAX_WAIT,
+                 max_in_flight=DEFAULT_MAX_IN_FLIGHT):
+        self.api = api
+        self.scheduler = scheduler or SubmissionScheduler()
+        self.batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+        self.max_wait = max_wait
+        self.batches = 0
+        self.items = 0
+
+        self._pending = []
+        self._oldest = None  # when the first ad of the current partial batch arrived
+        self._outstanding = 0  # submitted and not yet resolved, including ads waiting to retry
+        self._closed = False
+        self._cond = threading.Condition()
+        self._senders = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="batch-sender")
+        self._flusher = threading.Thread(target=self._loop, name="micro-batcher", daemon=True)
+        self._flusher.start()
+
+    def submit(self, payload):
+        """Queue one ad, returns a Future resolving to its submit result"""
+        future = Future()
+        key = fingerprint(payload)
+        known = self.scheduler.known(key)
+        if known:
+            future.set_result(known)
+            return future
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("MicroBatcher is closed")
+            self._outstanding += 1
+        self._enqueue(_Pending(payload, key, future))
+        return future
+
+    def close(self):
+        """Send everything still queued, wait for every result, then stop"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            while self._outstanding:
+                self._cond.wait()
+        self._flusher.join()
+        self._senders.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _enqueue(self, item):
+        with self._cond:
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending.append(item)
+            if len(self._pending) == 1 or len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+
+    def _next_batch(self):
+        """Block until a batch is due, returns None once closed and drained"""
+        with self._cond:
+            while True:
+                if len(self._pending) >= self.batch_size or (self._pending and self._closed):
+                    break
+                if self._pending:
+                    wait = self._oldest + self.max_wait - time.monotonic()
+                    if wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                elif self._closed and not self._outstanding:
+                    return None
+                else:
+                    self._cond.wait()
+            batch = self._pending[:self.batch_size]
+            del self._pending[:self.batch_size]
+            self._oldest = time.monotonic() if self._pending else None
+            return batch
+
+    def _loop(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            self._senders.submit(self._send, batch)
+
+    def _send(self, batch):
+        try:
+            self.scheduler.bucket.acquire()
+            response = self.api.submit_ads([item.payload for item in batch], [item.key for item in batch])
+        except Exception as e:
+            for item in batch:
+                self._resolve(item, exception=e)
+            return
+
+        with self._cond:
+            self.batches += 1
+            self.items += len(batch)
+        # a rejected batch (unauthorized, rate_limit, ...) is the same answer for every ad in it
+        results = response["results"] if response.get("success") else [dict(response) for _ in batch]
+        for item, result in zip(batch, results):
+            if self.scheduler.finished(item.key, result, item.attempt, item.payload, item.submitted_at):
+                self._resolve(item, result)
+            else:
+                delay = self.scheduler.backoff(item.attempt)
+                item.attempt += 1
+                timer = threading.Timer(delay, self._enqueue, (item,))
+                timer.daemon = True
+                timer.start()
+
+    def _resolve(self, item, result=None, exception=None):
+        if exception is not None:
+            item.future.set_exception(exception)
+        else:
+            item.future.set_result(result)
+        with self._cond:
+            self._outstanding -= 1
+            if not self._outstanding:
+                self._cond.notify_all()
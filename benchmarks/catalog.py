@@ -0,0 +1,80 @@
+"""Music catalog lookup and search latency at library scale.
+
+Builds a synthetic catalog (or opens an existing one) and times exact ID lookups,
+title prefix search, typo-tolerant search and "did you mean" suggestions, against a
+linear scan of a plain ID list as the old baseline.
+
+    python benchmarks/catalog.py --tracks 1000000
+    python benchmarks/catalog.py --catalog music.catalog
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import MusicCatalog, build_catalog, generate_tracks
+
+
+def timed(fn, queries):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(query)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+
+
+def typo(rng, text):
+    i = rng.randrange(len(text))
+    return text[:i] + text[i + 1:]
+
+
+def report(label, p50, p99):
+    print(f"{label:28s} p50 {p50 * 1e6:9.1f} µs   p99 {p99 * 1e6:9.1f} µs")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tracks", type=int, default=1_000_000)
+    parser.add_argument("--catalog", help="existing catalog file (skips the build)")
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    path = args.catalog
+    if not path:
+        path = os.path.join(tempfile.mkdtemp(), "bench.catalog")
+        start = time.perf_counter()
+        build_catalog(generate_tracks(args.tracks), path)
+        print(f"build: {args.tracks} tracks in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    catalog = MusicCatalog.open(path)
+    print(f"open: {(time.perf_counter() - start) * 1000:.2f} ms, {len(catalog)} tracks, "
+          f"{os.path.getsize(path) / 1024 / 1024:.1f} MiB on disk")
+
+    rng = random.Random(0)
+    sample = [catalog._track(rng.randrange(len(catalog))) for _ in range(args.queries)]
+    ids = [track["music_id"] for track in sample]
+    titles = [track["title"] for track in sample]
+
+    report("get (hit)", *timed(catalog.get, ids))
+    report("get (miss)", *timed(catalog.get, [music_id + "x" for music_id in ids]))
+    report("prefix_search", *timed(lambda t: catalog.prefix_search(t, 10), [t[:rng.randint(3, 12)] for t in titles]))
+    start = time.perf_counter()
+    catalog.fuzzy_search("warm up")
+    print(f"{'vocabulary index (once)':28s} {(time.perf_counter() - start) * 1000:9.1f} ms")
+    report("fuzzy_search (1 typo)", *timed(lambda t: catalog.fuzzy_search(t, 10), [typo(rng, t) for t in titles[:200]]))
+    report("suggest (ID typo)", *timed(catalog.suggest, [typo(rng, music_id) for music_id in ids[:200]]))
+
+    id_list = [catalog._track(i)["music_id"] for i in range(len(catalog))]
+    report("baseline: `in` on ID list", *timed(id_list.__contains__, ids[:50]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
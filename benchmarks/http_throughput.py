@@ -0,0 +1,66 @@
+"""End-to-end submit_ad throughput over real HTTP against the local stand-in server.
+
+Compares the pooled keep-alive HttpTikTokAPI with opening a new connection per request.
+
+    python benchmarks/http_throughput.py --requests 2000 --workers 32 --latency-scale 0
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+from campaign import build_payload
+from http_api import HttpTikTokAPI, start_background_server
+
+
+class UnpooledHttpTikTokAPI(HttpTikTokAPI):
+    """Baseline: a fresh TCP connection for every call"""
+
+    def _request(self, method, path, body=None, authorized=True):
+        headers = self._headers() if authorized else {}
+        return requests.request(method, self.base_url + path, json=body, headers=headers,
+                                timeout=self.timeout).json()
+
+
+def run(api, requests_count, workers):
+    api.oauth_authorize("valid_client", "valid_secret")
+    latencies = []
+
+    def one(i):
+        start = time.perf_counter()
+        api.submit_ad(build_payload(f"HTTP Campaign {i}", "Traffic", "Benchmark ad", "Shop Now"))
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(one, range(requests_count)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return requests_count / elapsed, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--latency-scale", type=float, default=0.0,
+                        help="server-side simulated latency multiplier (0 isolates network/serialization cost)")
+    args = parser.parse_args(argv)
+
+    server, url = start_background_server(latency_scale=args.latency_scale)
+    try:
+        for label, api in (("pooled keep-alive", HttpTikTokAPI(url, pool_size=args.workers)),
+                           ("new connection/request", UnpooledHttpTikTokAPI(url))):
+            rate, p50, p99 = run(api, args.requests, args.workers)
+            print(f"{label:24s} {rate:8.0f} req/s   p50 {p50 * 1000:6.1f} ms   p99 {p99 * 1000:6.1f} ms")
+    finally:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""Intent resolution: share of turns each tier resolves, and rules-tier latency.
+
+Replays a generated mix of replies through IntentResolver: mostly distinct names
+and ad texts plus the usual objective/CTA answers, about 10% questions and 10%
+hard cases (typos, vague answers, texts that open like a question). The LLM is a
+counter that never answers (the rules' guess stands); with --llm-answers it gives
+confident verdicts instead. Hard cases repeat across sessions, so after the first
+time they come from the cache either way.
+
+    python benchmarks/intent_tiers.py --turns 100000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intent import IntentResolver
+
+NAMES = ["Summer Sale {}", "Product Launch {}", "Back to School {}", "Black Friday Deals {}", "Brand Week {}"]
+TEXTS = ["Summer Sale - {}% Off!", "New Collection Out Now ({})", "Limited drop #{}, get yours today",
+         "Free shipping on {} items", "Your new favourite sneakers, size {}"]
+OBJECTIVES = ["Traffic", "Conversions", "traffic", "conversions", "1", "2", "Conversion", "traffic please",
+              "I want website visits", "more sales"]
+CTAS = ["Shop Now", "Learn More", "Sign Up", "Download", "Get App", "Watch Now", "shop now", "sign-up", "buy",
+        "install", "learn more please", "watch", "signup", "register"]
+QUESTIONS = ["What is a campaign name?", "what should I write", "why do I need this", "Is music required?",
+             "how long can it be", "what's the difference", "do I need music", "which one is better?",
+             "can you explain", "help"]
+HARD = {
+    "campaign_name": ["Is It Love", "Do More Fitness", "Can We Dance"],
+    "ad_text": ["Do it for the glow", "Is your skin ready for summer", "How to glow up in 7 days",
+                "Can't stop dancing"],
+    "objective": ["trafic", "people buying my stuff", "convresions"],
+    "cta": ["shop or watch", "dunno", "the button that opens the store"]
+}
+STEPS = {"campaign_name": NAMES, "ad_text": TEXTS, "objective": OBJECTIVES, "cta": CTAS}
+
+
+def generate_turns(count, seed=0, question_share=0.1, hard_share=0.1):
+    rng = random.Random(seed)
+    steps = list(STEPS)
+    turns = []
+    for i in range(count):
+        step = rng.choice(steps)
+        roll = rng.random()
+        if roll < question_share:
+            text = rng.choice(QUESTIONS)
+        elif roll < question_share + hard_share:
+            text = rng.choice(HARD[step])
+        else:
+            text = rng.choice(STEPS[step]).format(i)
+        turns.append((step, text))
+    return turns
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--llm-answers", action="store_true",
+                        help="the fake LLM answers confidently, so its verdicts fill the cache")
+    args = parser.parse_args(argv)
+
+    calls = []
+
+    def llm(prompt):
+        calls.append(prompt)
+        if args.llm_answers:
+            return json.dumps({"intent": "answer", "value": None, "confidence": 0.95})
+        return None
+
+    turns = generate_turns(args.turns, args.seed)
+    resolver = IntentResolver()
+    start = time.perf_counter()
+    for step, text in turns:
+        resolver.resolve(step, text, llm)
+    elapsed = time.perf_counter() - start
+
+    stats = resolver.stats()
+    print(f"{stats['total']} turns, {elapsed / stats['total'] * 1e6:.1f} µs per turn (LLM time excluded)")
+    for tier in ("rules", "cache", "llm"):
+        print(f"  {tier:6s} {stats[tier]:8d}  {stats[tier] / stats['total']:6.1%}")
+    print(f"never reached the LLM: {stats['without_llm']:.1%} (target 95%)   LLM prompts: {len(calls)}")
+
+    old_questions = sum(1 for step, text in turns if text not in QUESTIONS and text.lower().split()[0] in
+                        ("what", "why", "how", "when", "where", "who", "is", "are", "can", "should", "do", "does"))
+    print(f"answers the old first-word check took for questions: {old_questions}")
+    return 0 if stats["without_llm"] >= 0.95 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
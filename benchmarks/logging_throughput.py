@@ -0,0 +1,80 @@
+"""Submission throughput by logging mode, with stdout redirected to a file.
+
+Each mode runs in a fresh interpreter whose stdout goes to a temporary file, the
+way batch and server runs are usually launched. API latency is set to zero so the
+cost of the console output is what is being measured.
+
+    python benchmarks/logging_throughput.py --campaigns 5000 --workers 8
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MODES = {
+    "console": {},                                        # every line printed to (redirected) stdout
+    "quiet": {"LOG_QUIET": "1"},                          # nothing on the console
+    "quiet+jsonl": {"LOG_QUIET": "1", "LOG_FILE": "{tmp}/agent.jsonl"}   # background JSON-lines sink
+}
+
+
+def run(campaigns, workers):
+    import mock_tiktok_api
+    from agent import HybridTikTokAgent
+    from scheduler import SubmissionScheduler, TokenBucket
+
+    for endpoint in mock_tiktok_api.LATENCY:
+        mock_tiktok_api.LATENCY[endpoint] = 0
+    mock_tiktok_api.FAILURE_RATE = 0
+    scheduler = SubmissionScheduler(bucket=TokenBucket(rate=1e9, capacity=10 ** 9), max_retries=0)
+
+    def submit(i):
+        agent = HybridTikTokAgent()
+        agent.scheduler = scheduler
+        return agent.run_from_ui(f"Logging bench {i}", "Traffic", f"Ad #{i}", "Shop Now", "No Music")
+
+    submit(-1)  # OAuth + imports out of the way
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(submit, range(campaigns)))
+    elapsed = time.perf_counter() - start
+    created = sum("payload" in result for result in results)
+    return {"created": created, "elapsed": elapsed}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--campaigns", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        sys.stderr.write(json.dumps(run(args.campaigns, args.workers)) + "\n")
+        return 0
+
+    baseline = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode, env in MODES.items():
+            child_env = dict(os.environ, **{key: value.format(tmp=tmp) for key, value in env.items()})
+            with open(os.path.join(tmp, f"{mode}.out"), "w") as out:
+                proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--child",
+                                       "--campaigns", str(args.campaigns), "--workers", str(args.workers)],
+                                      cwd=ROOT, env=child_env, stdout=out, stderr=subprocess.PIPE, text=True, check=True)
+            result = json.loads(proc.stderr.strip().splitlines()[-1])
+            rate = result["created"] / result["elapsed"]
+            baseline = baseline or rate
+            print(f"{mode:12s} {result['created']:6d} created in {result['elapsed']:6.2f}s   "
+                  f"{rate:9.0f} submissions/s   x{rate / baseline:.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
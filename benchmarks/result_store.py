@@ -0,0 +1,85 @@
+"""Result store overhead: raw record() rate, and bulk throughput with and without the store.
+
+API latency defaults to zero, the worst case for the store: the bulk run is then
+pure CPU and the writer thread competes with it for the GIL. With --latency the
+submissions wait on the (mock) network like real ones. Also times an indexed
+lookup against the filled store.
+
+    python benchmarks/result_store.py --rows 200000 --bulk-rows 20000
+    python benchmarks/result_store.py --latency 0.02 --workers 64
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mock_tiktok_api
+from bulk import BulkCampaignRunner
+from campaign import build_payload
+from mock_tiktok_api import MockTikTokAPI
+from scheduler import SubmissionScheduler, TokenBucket
+from store import CampaignStore
+
+
+def record_rate(path, rows):
+    payload = build_payload("Store bench", "Traffic", "Summer sale", "Shop Now")
+    results = [{"success": True, "campaign_id": f"campaign_{i}", "ad_id": f"ad_{i}", "status": "ACTIVE",
+                "attempts": 1, "idempotency_key": f"{i:064x}"} for i in range(rows)]
+    with CampaignStore(path) as store:
+        start = time.perf_counter()
+        for result in results:
+            store.record(payload, result)
+        enqueued = time.perf_counter() - start
+        store.flush()
+        written = time.perf_counter() - start
+
+        lookups = 1000
+        start = time.perf_counter()
+        for i in range(0, rows, max(1, rows // lookups)):
+            store.get(f"campaign_{i}")
+        lookup = (time.perf_counter() - start) / min(rows, lookups)
+    print(f"record() x {rows}: enqueued {rows / enqueued:12,.0f}/s   written {rows / written:10,.0f}/s")
+    print(f"get(campaign_id) at {rows} records: {lookup * 1e6:8.1f} µs")
+
+
+def bulk_rate(path, rows, workers):
+    api = MockTikTokAPI(quiet=True)
+    api.access_token = api.oauth_authorize("valid_client", "valid_secret")["access_token"]
+    rows_in = [{"campaign_name": f"Store bench {i}", "objective": "Traffic", "ad_text": "Summer sale",
+                "cta": "Shop Now"} for i in range(rows)]
+    for label, store in (("without store", None), ("with store", CampaignStore(path))):
+        scheduler = SubmissionScheduler(bucket=TokenBucket(rate=1e9, capacity=10 ** 9), max_retries=0, store=store)
+        runner = BulkCampaignRunner(api=api, workers=workers, scheduler=scheduler)
+        stats = runner.run(rows_in, io.StringIO())
+        if store:
+            start = time.perf_counter()
+            store.close()
+            print(f"  (store drained {store.written} rows {time.perf_counter() - start:.3f}s after the run)")
+        print(f"bulk {label:14s} {stats['total']:8d} rows   {stats['rows_per_sec']:10,.0f} rows/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000, help="records for the raw record() run")
+    parser.add_argument("--bulk-rows", type=int, default=20_000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per submit_ad call")
+    args = parser.parse_args(argv)
+
+    for endpoint in mock_tiktok_api.LATENCY:
+        mock_tiktok_api.LATENCY[endpoint] = 0
+    mock_tiktok_api.LATENCY["submit_ad"] = args.latency
+    mock_tiktok_api.FAILURE_RATE = 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        record_rate(os.path.join(tmp, "record.sqlite3"), args.rows)
+        bulk_rate(os.path.join(tmp, "bulk.sqlite3"), args.bulk_rows, args.workers)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""Per-session memory at scale: slotted draft + bounded history vs the old dict/list layout.
+
+    python benchmarks/session_memory.py --sessions 10000 --turns 40
+"""
+import argparse
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent import HybridTikTokAgent
+from config import MAX_AD_TEXT_LENGTH
+from memsize import deep_sizeof, session_memory_bytes
+
+
+def legacy_bytes(agent, transcript):
+    """What the same session cost with the ad_data dict and an unbounded list of dicts"""
+    draft = {name: getattr(agent.ad_data, name) for name in type(agent.ad_data).__slots__}
+    history = [dict(message) for message in transcript]
+    return deep_sizeof(draft) + deep_sizeof(history) - deep_sizeof(agent.ad_data) - deep_sizeof(agent.conversation_history)
+
+
+SAMPLE = 500  # sessions whose full transcript is kept for the legacy comparison
+
+
+def run_session(index, turns):
+    agent = HybridTikTokAgent()
+    agent.chat("start")
+    agent.chat(f"Campaign {index}")
+    agent.chat("Traffic")
+    transcript = list(agent.conversation_history)
+    # keep answering with an over-long ad text so the transcript keeps growing
+    for _ in range(turns):
+        message = "x" * (MAX_AD_TEXT_LENGTH + 1)
+        response = agent.chat(message)
+        if index < SAMPLE:
+            transcript += [{"role": "user", "content": message}, {"role": "assistant", "content": response}]
+    return agent, transcript
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--turns", type=int, default=40, help="extra turns per session")
+    args = parser.parse_args(argv)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sessions = [run_session(i, args.turns) for i in range(args.sessions)]
+    traced = (tracemalloc.get_traced_memory()[0] - before) / args.sessions
+    tracemalloc.stop()
+
+    sample = sessions[:SAMPLE]
+    current = sum(session_memory_bytes(agent) for agent, _ in sample) / len(sample)
+    legacy = current + sum(legacy_bytes(agent, transcript) for agent, transcript in sample) / len(sample)
+
+    print(f"sessions: {args.sessions}, turns per session: {args.turns + 3}")
+    print(f"per-session (session_memory_bytes): {current / 1024:8.1f} KiB")
+    print(f"per-session (tracemalloc):          {traced / 1024:8.1f} KiB")
+    print(f"per-session, dict draft + unbounded list history: {legacy / 1024:8.1f} KiB")
+    print(f"reduction: {(1 - current / legacy) * 100:.0f}%  "
+          f"({(legacy - current) * args.sessions / 1024 / 1024:.1f} MiB saved at {args.sessions} sessions)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""Sharded runner scaling: rows/s with 1, 2, 4, ... worker processes.
+
+API latency is zeroed in every worker so the run is CPU-bound (payload building,
+validation, JSON), which is what sharding across cores is for. Expect close to
+linear scaling up to the number of physical cores.
+
+    python benchmarks/sharded_throughput.py --rows 200000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sharded import run_sharded
+
+
+def no_latency():
+    # runs in each worker process (spawned, so the parent's patches would not carry over)
+    import mock_tiktok_api
+    for endpoint in mock_tiktok_api.LATENCY:
+        mock_tiktok_api.LATENCY[endpoint] = 0
+    mock_tiktok_api.FAILURE_RATE = 0
+
+
+def write_rows(path, count):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(count):
+            f.write(json.dumps({"campaign_name": f"Sharded bench {i}", "objective": "Traffic",
+                                "ad_text": f"Summer sale {i % 100}% off", "cta": "Shop Now"}) + "\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--max-shards", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--workers", type=int, default=8, help="threads per shard")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("LOG_QUIET", "1")
+    os.environ["RESULT_STORE_PATH"] = ""  # measure the runner, see benchmarks/result_store.py for the store
+    counts, shards = [], 1
+    while shards < args.max_shards:
+        counts.append(shards)
+        shards *= 2
+    counts.append(args.max_shards)
+
+    print(f"{os.cpu_count()} CPUs, {args.rows} rows")
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, "rows.jsonl")
+        write_rows(input_path, args.rows)
+        baseline = None
+        for shards in counts:
+            merged = run_sharded(input_path, os.path.join(tmp, f"run-{shards}"), shards, workers=args.workers,
+                                 rate=1e9, retries=0, initializer=no_latency)["merged"]
+            baseline = baseline or merged["rows_per_sec"]
+            print(f"{shards:3d} shards   {merged['rows']:8d} rows in {merged['elapsed']:7.2f}s   "
+                  f"{merged['rows_per_sec']:9,.0f} rows/s   x{merged['rows_per_sec'] / baseline:.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""Simulated load test: N campaigns through the submission scheduler against SimulatedTikTokAPI.
+
+Runs on virtual time, so 10k campaigns take seconds, and a given --seed always
+produces identical results.
+
+    python benchmarks/simulate_load.py --campaigns 10000 --concurrency 200 --max-qps 100
+    python benchmarks/simulate_load.py --guard   # adaptive limit + circuit breakers in front of the API
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from campaign import build_payload
+from resilience import ApiGuard
+from scheduler import SubmissionScheduler, TokenBucket
+from simulation import SimulatedTikTokAPI, VirtualTimeEventLoop
+
+
+async def drive(api, scheduler, campaigns, concurrency):
+    slots = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+    results = [None] * campaigns
+    latencies = []
+
+    async def one(i):
+        async with slots:
+            payload = build_payload(f"Sim Campaign {i}", "Traffic", f"Simulated ad #{i}", "Shop Now")
+            start = loop.time()
+            results[i] = await scheduler.asubmit(api, payload)
+            latencies.append(loop.time() - start)
+
+    await asyncio.gather(*(one(i) for i in range(campaigns)))
+    return results, latencies
+
+
+def simulate(args):
+    loop = VirtualTimeEventLoop()
+    guard = ApiGuard(clock=loop.time) if args.guard else None
+    api = SimulatedTikTokAPI(seed=args.seed, max_concurrency=args.server_concurrency, max_qps=args.max_qps,
+                             guard=guard)
+    api.set_access_token("simulated_token")
+    scheduler = SubmissionScheduler(bucket=TokenBucket(rate=args.rate, capacity=args.rate, clock=loop.time),
+                                    rng=random.Random(args.seed), max_retries=args.retries)
+
+    wall_start = time.perf_counter()
+    try:
+        results, latencies = loop.run_until_complete(drive(api, scheduler, args.campaigns, args.concurrency))
+    finally:
+        loop.close()
+    wall = time.perf_counter() - wall_start
+
+    latencies.sort()
+    outcome = {}
+    for result in results:
+        key = "created" if result["success"] else result["error"]
+        outcome[key] = outcome.get(key, 0) + 1
+    digest = hashlib.sha256(json.dumps(results, sort_keys=True).encode()).hexdigest()[:16]
+    return {
+        "virtual_seconds": loop.clock.now,
+        "wall_seconds": wall,
+        "outcome": dict(sorted(outcome.items())),
+        "p50": latencies[len(latencies) // 2],
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        "retries": scheduler.retries,
+        "api": api.stats(),
+        "guard": guard.state() if guard else None,
+        "digest": digest
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--campaigns", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=200, help="client-side submissions in flight")
+    parser.add_argument("--rate", type=float, default=100.0, help="client token bucket, submissions/sec")
+    parser.add_argument("--retries", type=int, default=5)
+    parser.add_argument("--server-concurrency", type=int, default=150, help="server in-flight cap")
+    parser.add_argument("--max-qps", type=float, default=120.0, help="server QPS cap")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--guard", action="store_true", help="adaptive concurrency + circuit breakers (resilience.py)")
+    args = parser.parse_args(argv)
+
+    first = simulate(args)
+    second = simulate(args)
+
+    print(f"campaigns: {args.campaigns}  seed: {args.seed}")
+    print(f"virtual time: {first['virtual_seconds']:.1f}s  wall time: {first['wall_seconds']:.2f}s "
+          f"({args.campaigns / first['virtual_seconds']:.1f} campaigns/virtual-sec)")
+    print(f"latency p50: {first['p50'] * 1000:.0f} ms  p99: {first['p99'] * 1000:.0f} ms (virtual)")
+    print(f"outcome: {first['outcome']}  client retries: {first['retries']}")
+    print(f"server: {first['api']}")
+    if first["guard"]:
+        print(f"guard: {first['guard']}")
+    reproducible = first["digest"] == second["digest"]
+    print(f"reproducible: {'yes' if reproducible else 'NO'} (digest {first['digest']})")
+    return 0 if reproducible else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+"""Startup benchmark: import cost and time until the CLI can show its first prompt.
+
+Each sample runs in a fresh interpreter so nothing is already imported.
+
+    python benchmarks/startup.py --runs 10 --budget-ms 100
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SNIPPET = """
+import json, time
+t0 = time.perf_counter()
+import agent
+t1 = time.perf_counter()
+bot = agent.HybridTikTokAgent()
+bot.chat("start")
+t2 = time.perf_counter()
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "first_prompt_ms": (t2 - t0) * 1000}))
+"""
+
+
+def sample():
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    out = subprocess.run([sys.executable, "-c", SNIPPET], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=100.0,
+                        help="fail (exit 1) if the median time to first prompt exceeds this")
+    args = parser.parse_args(argv)
+
+    sample()  # warm the OS file cache / bytecode
+    samples = [sample() for _ in range(args.runs)]
+    import_ms = statistics.median(s["import_ms"] for s in samples)
+    first_prompt_ms = statistics.median(s["first_prompt_ms"] for s in samples)
+
+    print(f"import agent:     {import_ms:7.1f} ms (median of {args.runs})")
+    print(f"to first prompt:  {first_prompt_ms:7.1f} ms (budget {args.budget_ms:.0f} ms)")
+    if first_prompt_ms > args.budget_ms:
+        print("❌ startup regression")
+        return 1
+    print("✅ within budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
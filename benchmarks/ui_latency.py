@@ -0,0 +1,84 @@
+"""Latency of one Streamlit form submission (run_from_ui) with an existing music ID.
+
+Each case is checked against what the API calls on its path add up to, using the
+mock latencies. Every remote call needs the token, so with a cold token OAuth is
+paid before the music check, not alongside it; only the local work (form rules,
+the music cache lookup) overlaps it.
+
+    python benchmarks/ui_latency.py --runs 3 --tolerance-ms 250
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MUSIC_ID = "music_12345"
+
+
+def cases(latency):
+    oauth, validate, submit = latency["oauth_authorize"], latency["validate_music_id"], latency["submit_ad"]
+    # name -> (token cold, music cache cold, expected seconds)
+    return {
+        "cold token, uncached ID": (True, True, oauth + validate + submit),
+        "cold token, cached ID": (True, False, oauth + submit),
+        "warm token, uncached ID": (False, True, validate + submit)
+    }
+
+
+def run(bot, cold_token, cold_cache, use_async, n):
+    from auth import get_token_manager
+    from cache import get_music_cache
+
+    tokens = get_token_manager()
+    if cold_token:
+        tokens.invalidate()
+    else:
+        tokens.get_token()
+    if cold_cache:
+        get_music_cache().cache.clear()
+    else:
+        get_music_cache().validate(bot.api, MUSIC_ID)
+
+    # a new name every run, a repeated payload would be answered from the idempotency cache
+    args = (f"UI latency bench {n}", "Conversions", "Summer sale on now", "Shop Now", "Use Existing Music", MUSIC_ID)
+    start = time.perf_counter()
+    result = asyncio.run(bot.arun_from_ui(*args)) if use_async else bot.run_from_ui(*args)
+    elapsed = time.perf_counter() - start
+    if "error" in result:
+        raise SystemExit(f"submission failed: {result['error']}")
+    return elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--tolerance-ms", type=float, default=250.0,
+                        help="fail (exit 1) if a median is further than this from the expected time")
+    args = parser.parse_args(argv)
+
+    import mock_tiktok_api
+    from agent import HybridTikTokAgent
+
+    mock_tiktok_api.FAILURE_RATE = 0
+    bot = HybridTikTokAgent()
+
+    runs = itertools.count()
+    failed = False
+    for use_async in (False, True):
+        print("arun_from_ui" if use_async else "run_from_ui")
+        for name, (cold_token, cold_cache, expected) in cases(mock_tiktok_api.LATENCY).items():
+            median = statistics.median(run(bot, cold_token, cold_cache, use_async, next(runs)) for _ in range(args.runs))
+            ok = abs(median - expected) * 1000 <= args.tolerance_ms
+            failed = failed or not ok
+            print(f"  {'✅' if ok else '❌'} {name:<24} {median:5.2f}s (expected {expected:.2f}s)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""Campaign validation throughput: per-payload rules vs the columnar batch validator.
+
+Generates a mix of valid and invalid payloads, checks that both paths report the
+same errors, and times each.
+
+    python benchmarks/validation.py --rows 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from campaign import build_payload, validate_payload
+from rules import FIELDS, payload_values, validate_batch, validate_columns
+
+
+def generate_payloads(count, seed=0):
+    rng = random.Random(seed)
+    names = [f"Campaign {i}" for i in range(count // 100 + 1)] + ["ab", ""]
+    objectives = ["Traffic", "Conversions", "Awareness", ""]
+    texts = [f"Summer sale {i}% off" for i in range(100)] + ["", "x" * 120]
+    ctas = ["Shop Now", "Learn More", "Sign Up", "Buy"]
+    music_ids = [None] + [f"music_{i}" for i in range(1000)] + ["not a music id!"]
+    return [build_payload(rng.choice(names), rng.choice(objectives), rng.choice(texts),
+                          rng.choice(ctas), rng.choice(music_ids)) for _ in range(count)]
+
+
+def timed(label, fn, rows):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:32s} {elapsed:8.3f} s   {rows / elapsed:12,.0f} rows/s")
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--scalar-rows", type=int, default=100_000, help="rows for the slow per-payload baseline")
+    args = parser.parse_args(argv)
+
+    payloads = generate_payloads(args.rows)
+    values = [payload_values(payload) for payload in payloads]
+    columns = {field: [row[field] for row in values] for field in FIELDS}
+    print(f"{args.rows} payloads generated")
+
+    sample = payloads[:args.scalar_rows]
+    scalar = timed(f"validate_payload x {len(sample)}", lambda: [validate_payload(p) for p in sample], len(sample))
+    batch = timed("validate_batch (payload dicts)", lambda: validate_batch(payloads), args.rows)
+    checked = timed("validate_columns (columns)", lambda: validate_columns(columns), args.rows)
+
+    mismatches = sum(batch.errors(row) != errors for row, errors in enumerate(scalar))
+    print(f"invalid rows: {len(checked.invalid_rows())}, mismatches vs scalar: {mismatches}")
+    for name, count in checked.counts().items():
+        print(f"  {name:20s} {count}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
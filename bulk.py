@@ -0,0 +1,257 @@
+import argparse
+import csv
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from auth import get_token_manager
+from batcher import MicroBatcher
+from campaign import fingerprint, normalize_campaign, validate_payload
+from config import SUBMIT_RATE_LIMIT, SUBMIT_MAX_RETRIES, RESULT_STORE_PATH
+from metrics import get_metrics
+from mock_tiktok_api import create_api, MAX_BATCH_SIZE
+from rules import validate_batch
+from scheduler import SubmissionScheduler, TokenBucket
+from store import CampaignStore
+
+DEFAULT_WORKERS = 16
+
+
+def read_rows(path):
+    """Yield campaign rows from a CSV or JSONL file"""
+    if path.endswith((".jsonl", ".ndjson", ".json")):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+    else:
+        with open(path, newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
+
+
+class BulkCampaignRunner:
+    """Validate and submit many campaigns with a bounded worker pool.
+
+    With batch_size > 1 valid rows are coalesced into submit_ads calls instead, and
+    `workers` is the number of batches in flight. Rows whose fingerprint is in `skip`
+    (e.g. store.created_fingerprints()) are reported as skipped, not submitted.
+    """
+
+    def __init__(self, api=None, workers=DEFAULT_WORKERS, scheduler=None, batch_size=1, skip=None):
+        self.workers = max(1, workers)
+        self.scheduler = scheduler or SubmissionScheduler()
+        self.batch_size = max(1, batch_size)
+        self.skip = skip or set()
+        self.api_calls = 0  # submit_ads round trips in batched mode
+
+        if api is None:
+            tokens = get_token_manager()
+            if not tokens.get_token():
+                raise RuntimeError(f"OAuth failed: {(tokens.last_error or {}).get('message')}")
+            api = create_api(quiet=True)  # one result line per row is the output, not a banner per call
+            api.token_provider = tokens.get_token
+            api.on_unauthorized = tokens.invalidate
+        self.api = api
+
+    def _prepare(self, index, row):
+        """Returns (record, payload); payload is None when the row is invalid"""
+        payload = normalize_campaign(row)
+        record = {"row": index, "campaign_name": payload["campaign_name"]}
+
+        errors = validate_payload(payload)
+        if errors:
+            record.update(status="invalid", errors=errors)
+            return record, None
+        if self.skip:
+            key = fingerprint(payload)
+            if key in self.skip:
+                record.update(status="skipped", fingerprint=key)
+                return record, None
+        return record, payload
+
+    def process_row(self, index, row):
+        """Validate one row and submit it if valid, returns a result record"""
+        record, payload = self._prepare(index, row)
+        if payload is None:
+            return record
+        return self._record_result(record, self.scheduler.submit(self.api, payload))
+
+    def _record_result(self, record, result):
+        record.update(fingerprint=result["idempotency_key"], attempts=result["attempts"])
+        if result["success"]:
+            record.update(status="created", campaign_id=result["campaign_id"], ad_id=result["ad_id"])
+        else:
+            record.update(status="failed", error=result.get("error"), message=result.get("message"))
+        return record
+
+    def run(self, rows, out, on_result=None, keyed=False):
+        """Process rows concurrently, writing one JSON line to `out` per finished row.
+
+        With keyed=True, `rows` yields (row id, row) pairs and the id is reported as
+        "row" instead of the position. With out=None only on_result() sees the records.
+        """
+        stats = {"total": 0, "created": 0, "invalid": 0, "failed": 0, "skipped": 0}
+        write_lock = threading.Lock()
+        # keep at most a couple of rows per worker queued so huge files stream
+        slots = threading.BoundedSemaphore(self.workers * 2)
+
+        def emit(record):
+            with write_lock:
+                stats["total"] += 1
+                stats[record["status"]] += 1
+                if out is not None:
+                    out.write(json.dumps(record) + "\n")
+                    out.flush()
+            if on_result:
+                on_result(record)
+
+        def work(index, row):
+            try:
+                try:
+                    record = self.process_row(index, row)
+                except Exception as e:
+                    record = {"row": index, "status": "failed", "error": "exception", "message": str(e)}
+                emit(record)
+            finally:
+                slots.release()
+
+        start = time.perf_counter()
+        rows = rows if keyed else enumerate(rows)
+        if self.batch_size > 1:
+            self._run_batched(rows, emit)
+        else:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                for index, row in rows:
+                    slots.acquire()
+                    pool.submit(work, index, row)
+
+        stats["elapsed"] = time.perf_counter() - start
+        stats["rows_per_sec"] = stats["total"] / stats["elapsed"] if stats["elapsed"] else 0.0
+        return stats
+
+    def _run_batched(self, rows, emit):
+        # enough rows queued to keep every in-flight batch full
+        slots = threading.BoundedSemaphore(self.workers * self.batch_size * 2)
+        batcher = MicroBatcher(self.api, self.scheduler, batch_size=self.batch_size, max_in_flight=self.workers)
+
+        def done(record, future):
+            try:
+                record = self._record_result(record, future.result())
+            except Exception as e:
+                record.update(status="failed", error="exception", message=str(e))
+            try:
+                emit(record)
+            finally:
+                slots.release()
+
+        with batcher:
+            for index, row in rows:
+                slots.acquire()
+                try:
+                    record, payload = self._prepare(index, row)
+                except Exception as e:
+                    record, payload = {"row": index, "status": "failed", "error": "exception", "message": str(e)}, None
+                if payload is None:
+                    try:
+                        emit(record)
+                    finally:
+                        slots.release()
+                    continue
+                batcher.submit(payload).add_done_callback(lambda future, record=record: done(record, future))
+        self.api_calls = batcher.batches
+
+
+def check_rows(rows, out):
+    """Pre-flight: validate every row in one vectorized pass without submitting anything.
+
+    Writes one JSON line per invalid row to `out`, returns {"total", "invalid", "rules", "elapsed"}.
+    """
+    start = time.perf_counter()
+    payloads = [normalize_campaign(row) for row in rows]
+    checked = validate_batch(payloads)
+    for index in checked.invalid_rows():
+        index = int(index)
+        out.write(json.dumps({"row": index, "campaign_name": payloads[index]["campaign_name"],
+                              "status": "invalid", "errors": checked.errors(index)}) + "\n")
+    return {
+        "total": len(checked),
+        "invalid": len(checked.invalid_rows()),
+        "rules": checked.counts(),
+        "elapsed": time.perf_counter() - start
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk-create TikTok ad campaigns from a CSV or JSONL file")
+    parser.add_argument("input", help="CSV or JSONL file with campaign_name, objective, ad_text, cta, music_id")
+    parser.add_argument("-o", "--output", default="results.jsonl", help="where to stream per-row results (JSONL)")
+    parser.add_argument("-w", "--workers", type=int, default=DEFAULT_WORKERS, help="concurrent submissions")
+    parser.add_argument("--rate", type=float, default=SUBMIT_RATE_LIMIT, help="max submissions per second")
+    parser.add_argument("--retries", type=int, default=SUBMIT_MAX_RETRIES, help="retries per row on rate_limit")
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help=f"ads per submit_ads call (1 = one call per ad, max {MAX_BATCH_SIZE}); "
+                             "--rate then paces batches")
+    parser.add_argument("--check", action="store_true",
+                        help="only validate the file (no OAuth, nothing submitted), invalid rows go to --output")
+    parser.add_argument("--store", default=RESULT_STORE_PATH, metavar="DB",
+                        help="record every submission in this result store (see store.py, '' = off)")
+    parser.add_argument("--skip-existing", action="store_true",
+                        help="skip rows already created according to --store (re-running a file)")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="record per-stage latency and write it here (.prom = Prometheus text, else JSON)")
+    args = parser.parse_args(argv)
+
+    if args.metrics:
+        get_metrics().enabled = True
+
+    if args.check:
+        with open(args.output, "w", encoding="utf-8") as out:
+            stats = check_rows(read_rows(args.input), out)
+        print("\n" + "="*50)
+        print("🔎 PRE-FLIGHT CHECK")
+        print("="*50)
+        print(f"Rows: {stats['total']} (valid {stats['total'] - stats['invalid']}, invalid {stats['invalid']})")
+        for name, count in stats["rules"].items():
+            if count:
+                print(f"  ✗ {name}: {count}")
+        print(f"Elapsed: {stats['elapsed']:.2f}s")
+        print(f"Invalid rows: {args.output}")
+        print("="*50)
+        return 0 if stats["invalid"] == 0 else 1
+
+    store = CampaignStore(args.store) if args.store else None
+    scheduler = SubmissionScheduler(bucket=TokenBucket(rate=args.rate, capacity=max(1, int(args.rate))),
+                                    max_retries=args.retries, store=store)
+    skip = store.created_fingerprints() if store and args.skip_existing else None
+    runner = BulkCampaignRunner(workers=args.workers, scheduler=scheduler, batch_size=args.batch_size, skip=skip)
+    with open(args.output, "w", encoding="utf-8") as out:
+        stats = runner.run(read_rows(args.input), out)
+    if store:
+        store.close()
+
+    print("\n" + "="*50)
+    print("📦 BULK RUN COMPLETE")
+    print("="*50)
+    print(f"Rows: {stats['total']} (created {stats['created']}, invalid {stats['invalid']}, failed {stats['failed']}"
+          + (f", skipped {stats['skipped']})" if stats["skipped"] else ")"))
+    print(f"Elapsed: {stats['elapsed']:.2f}s")
+    print(f"Throughput: {stats['rows_per_sec']:.1f} rows/sec")
+    print(f"Retries: {scheduler.retries}, duplicates skipped: {scheduler.deduplicated}")
+    if runner.batch_size > 1:
+        print(f"API calls: {runner.api_calls} batches of up to {runner.batch_size}")
+    print(f"Results: {args.output}")
+    if store:
+        print(f"Stored: {store.written} records in {args.store}")
+    if args.metrics:
+        metrics = get_metrics()
+        with open(args.metrics, "w", encoding="utf-8") as f:
+            f.write(metrics.to_prometheus() if args.metrics.endswith(".prom") else metrics.to_json(indent=2))
+        print(f"Metrics: {args.metrics}")
+    print("="*50)
+    return 0 if stats["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import OrderedDict
+from config import MUSIC_CACHE_SIZE, MUSIC_CACHE_TTL, MUSIC_NOT_FOUND_TTL
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache where every entry carries its own expiry"""
+
+    def __init__(self, maxsize, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.clock = clock
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at is not None and self.clock() >= expires_at:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Store value for `ttl` seconds (None = until evicted)"""
+        expires_at = self.clock() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+            return default if entry is _MISSING else entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+class MusicValidationCache:
+    """Caches validate_music_id results; found and not-found answers get separate TTLs"""
+
+    def __init__(self, maxsize=MUSIC_CACHE_SIZE, ttl=MUSIC_CACHE_TTL, not_found_ttl=MUSIC_NOT_FOUND_TTL,
+                 clock=time.monotonic):
+        self.ttl = ttl
+        self.not_found_ttl = not_found_ttl
+        self.cache = TTLCache(maxsize, clock=clock)
+
+    def validate(self, api, music_id):
+        """Cached api.validate_music_id(music_id)"""
+        result = self.cache.get(music_id)
+        if result is None:
+            result = api.validate_music_id(music_id)
+            self._store(music_id, result)
+        return result
+
+    async def avalidate(self, async_api, music_id):
+        """Async variant of validate()"""
+        result = self.cache.get(music_id)
+        if result is None:
+            result = await async_api.validate_music_id(music_id)
+            self._store(music_id, result)
+        return result
+
+    def _store(self, music_id, result):
+        if result["success"]:
+            self.cache.set(music_id, result, self.ttl)
+        elif result.get("error") == "music_not_found":
+            self.cache.set(music_id, result, self.not_found_ttl)
+        # anything else (unauthorized, transient failures) says nothing about the track
+
+    def stats(self):
+        return self.cache.stats()
+
+
+_music_cache = None
+_music_cache_lock = threading.Lock()
+
+
+def get_music_cache():
+    """Shared MusicValidationCache for the whole process"""
+    global _music_cache
+    with _music_cache_lock:
+        if _music_cache is None:
+            _music_cache = MusicValidationCache()
+        return _music_cache
@@ -0,0 +1,80 @@
+import hashlib
+import json
+from config import VALID_CTAS
+from rules import check_payload
+
+
+def build_payload(campaign_name, objective, ad_text, cta, music_id=None):
+    """Build the TikTok ad payload"""
+    return {
+        "campaign_name": campaign_name,
+        "objective": objective,
+        "creative": {
+            "text": ad_text,
+            "cta": cta,
+            "music_id": music_id
+        }
+    }
+
+
+class CampaignDraft:
+    """Fields collected so far in a conversation (slotted: one of these lives in every session)"""
+
+    __slots__ = ("campaign_name", "objective", "ad_text", "cta", "music_option", "music_id")
+
+    def __init__(self):
+        self.campaign_name = None
+        self.objective = None
+        self.ad_text = None
+        self.cta = None
+        self.music_option = None
+        self.music_id = None
+
+    def to_payload(self):
+        return build_payload(self.campaign_name, self.objective, self.ad_text, self.cta, self.music_id)
+
+
+def fingerprint(payload):
+    """Stable hash of the fields that define a campaign, used as the idempotency key"""
+    canonical = json.dumps(
+        {
+            "campaign_name": payload.get("campaign_name"),
+            "objective": payload.get("objective"),
+            "creative": payload.get("creative") or {}
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def normalize_campaign(row):
+    """Turn a raw input row (CSV/JSONL/UI) into a payload, same cleanup as run_from_ui"""
+
+    def clean(key):
+        value = row.get(key)
+        return str(value).strip() if value is not None else ""
+
+    # accept CTAs regardless of case, keep canonical spelling
+    cta = clean("cta")
+    for valid_cta in VALID_CTAS:
+        if cta.lower() == valid_cta.lower():
+            cta = valid_cta
+            break
+
+    return build_payload(
+        campaign_name=clean("campaign_name"),
+        objective=clean("objective").capitalize(),
+        ad_text=clean("ad_text") or clean("text"),
+        cta=cta,
+        music_id=clean("music_id") or None
+    )
+
+
+def validate_payload(payload, known_music=None):
+    """Deterministic business rules, returns a list of errors (empty when valid).
+
+    The rules themselves live in rules.py; use rules.validate_batch for many payloads.
+    """
+    return check_payload(payload, known_music)
@@ -0,0 +1,473 @@
+import argparse
+import bisect
+import collections
+import csv
+import heapq
+import io
+import itertools
+import json
+import mmap
+import re
+import string
+import struct
+import sys
+import threading
+import zlib
+from array import array
+from config import MUSIC_CATALOG_PATH, VALID_MUSIC_IDS
+
+# On-disk layout: header, then these sections (8-byte aligned). Strings live in heaps
+# addressed by offset arrays; every other section is a flat array of fixed-size ints.
+MAGIC = b"TTMCAT01"
+SECTIONS = (
+    ("id_offsets", "Q"),        # count + 1 offsets into id_heap
+    ("id_heap", None),
+    ("title_offsets", "Q"),     # count + 1 offsets into title_heap
+    ("title_heap", None),
+    ("durations", "I"),         # seconds
+    ("id_table", "I"),          # open addressing on crc32(id), record index + 1, 0 = empty
+    ("title_order", "I"),       # record indexes sorted by normalized title
+    ("vocab_offsets", "Q"),     # sorted distinct title words
+    ("vocab_heap", None),
+    ("postings_offsets", "Q"),  # per word: record indexes whose title contains it
+    ("postings", "I"),
+)
+_HEADER = struct.Struct("<8sQ" + "QQ" * len(SECTIONS))
+
+_WORD = re.compile(r"[^\W_]+")
+_ID_ALPHABET = string.ascii_lowercase + string.digits + "_"
+_PREFIX_EXPANSION = 50  # vocabulary words a trailing partial word may stand for
+
+
+def normalize(text):
+    """Case- and punctuation-insensitive form used for title search"""
+    return " ".join(_WORD.findall(text.casefold()))
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance (typos incl. swapped letters), or limit + 1 once above limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before, previous = None, list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, char_b in enumerate(b, 1):
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b))
+            if i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                value = min(value, before[j - 2] + 1)
+            current[j] = value
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+def _max_typos(word):
+    return 0 if len(word) < 3 else 1 if len(word) < 8 else 2
+
+
+def _offsets(items):
+    offsets, total = array("Q", [0]), 0
+    for item in items:
+        total += len(item)
+        offsets.append(total)
+    return offsets
+
+
+def build_catalog(tracks, path=None):
+    """Build a catalog from (music_id, title, duration) tuples; writes `path` or returns the bytes"""
+    ids, titles, durations, seen = [], [], array("I"), set()
+    for music_id, title, duration in tracks:
+        if music_id in seen:
+            continue
+        seen.add(music_id)
+        ids.append(music_id.encode("utf-8"))
+        titles.append(title.encode("utf-8"))
+        durations.append(int(duration))
+    del seen
+    count = len(ids)
+
+    capacity = 8
+    while capacity < count * 2:  # load factor <= 0.5 keeps probes short
+        capacity *= 2
+    table, mask = array("I", bytes(4 * capacity)), capacity - 1
+    for index, key in enumerate(ids):
+        slot = zlib.crc32(key) & mask
+        while table[slot]:
+            slot = (slot + 1) & mask
+        table[slot] = index + 1
+
+    normalized = [normalize(title.decode("utf-8")) for title in titles]
+    order = array("I", sorted(range(count), key=normalized.__getitem__))
+
+    postings = {}
+    for index, title in enumerate(normalized):
+        for word in set(title.split()):
+            postings.setdefault(word, array("I")).append(index)
+    del normalized
+    vocab = sorted(postings)
+    postings_offsets, flat = array("Q", [0]), array("I")
+    for word in vocab:
+        flat.extend(postings.pop(word))
+        postings_offsets.append(len(flat))
+    vocab = [word.encode("utf-8") for word in vocab]
+
+    sections = [_offsets(ids), b"".join(ids), _offsets(titles), b"".join(titles), durations, table,
+                order, _offsets(vocab), b"".join(vocab), postings_offsets, flat]
+    spans, position = [], _HEADER.size
+    for data in sections:
+        position += -position % 8
+        length = len(memoryview(data).cast("B"))
+        spans += [position, length]
+        position += length
+
+    out = open(path, "wb") if path else io.BytesIO()
+    out.write(_HEADER.pack(MAGIC, count, *spans))
+    for data, offset in zip(sections, spans[::2]):
+        out.write(bytes(offset - out.tell()))
+        out.write(data)
+    if not path:
+        return out.getvalue()
+    out.close()
+    return path
+
+
+class MusicCatalog:
+    """Read-only track library over a memory-mapped (or in-memory) catalog file.
+
+    Nothing is parsed up front: lookups read straight from the mapped arrays, so a
+    multi-million-track library opens instantly and shares pages between processes.
+    """
+
+    def __init__(self, buffer, mapping=None):
+        self._mapping = mapping
+        self._view = memoryview(buffer)
+        magic, self.count, *spans = _HEADER.unpack_from(self._view)
+        if magic != MAGIC:
+            raise ValueError("Not a music catalog file")
+        for (name, fmt), offset, length in zip(SECTIONS, spans[::2], spans[1::2]):
+            section = self._view[offset:offset + length]
+            setattr(self, "_" + name, section.cast(fmt) if fmt else section)
+        self._mask = len(self._id_table) - 1
+        self._vocab = None  # decoded words + trigram index, built on the first fuzzy search
+        self._vocab_lock = threading.Lock()
+
+    @classmethod
+    def open(cls, path):
+        with open(path, "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mapping, mapping)
+
+    @classmethod
+    def from_tracks(cls, tracks):
+        """Small in-memory catalog, e.g. the built-in sample library"""
+        return cls(build_catalog(tracks))
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, music_id):
+        return self._find(music_id) is not None
+
+    def get(self, music_id):
+        """Track dict for an exact ID, or None"""
+        index = self._find(music_id)
+        return None if index is None else self._track(index)
+
+    def prefix_search(self, prefix, limit=10):
+        """Tracks whose normalized title starts with `prefix`, in title order"""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        start = bisect.bisect_left(self._title_order, prefix, key=self._title_key)
+        results = []
+        for position in range(start, min(start + limit, self.count)):
+            index = self._title_order[position]
+            if not self._title_key(index).startswith(prefix):
+                break
+            results.append(self._track(index))
+        return results
+
+    def fuzzy_search(self, query, limit=10):
+        """Tracks containing every query word, allowing typos; the last word may be partial"""
+        words = normalize(query).split()
+        if not words:
+            return []
+        tiers = [self._records_matching(word, partial=position == len(words) - 1)
+                 for position, word in enumerate(words)]
+        if not all(tiers):
+            return []
+
+        # Records matching every word in any way, then each word adds the score of
+        # the best tier the record appears in
+        candidates = _intersect([[records for _, postings in word for records in postings] for word in tiers])
+        scores = dict.fromkeys(candidates, 0)
+        for word in tiers:
+            remaining = set(candidates)
+            for score, postings in word:
+                for records in postings:
+                    hits = _probe(remaining, records)
+                    remaining -= hits
+                    if score:
+                        for index in hits:
+                            scores[index] += score
+        best = heapq.nsmallest(limit, scores.items(), key=lambda item: (item[1], item[0]))
+        return [self._track(index) for index, _ in best]
+
+    def search(self, query, limit=10):
+        """Prefix matches first, then typo-tolerant ones"""
+        results = self.prefix_search(query, limit)
+        if len(results) < limit:
+            seen = {track["music_id"] for track in results}
+            results += [track for track in self.fuzzy_search(query, limit) if track["music_id"] not in seen]
+        return results[:limit]
+
+    def suggest(self, text, limit=3):
+        """"Did you mean" candidates: IDs one typo away first, then title matches"""
+        text = text.strip()
+        results = [self._track(index) for index in self._near_ids(text.lower())]
+        seen = {track["music_id"] for track in results}
+        if len(results) < limit:
+            results += [track for track in self.search(text, limit) if track["music_id"] not in seen]
+        return results[:limit]
+
+    def close(self):
+        for name, _ in SECTIONS:
+            getattr(self, "_" + name).release()
+        self._view.release()
+        if self._mapping is not None:
+            self._mapping.close()
+
+    # -- internals -----------------------------------------------------------
+
+    def _find(self, music_id):
+        key = music_id.encode("utf-8")
+        slot = zlib.crc32(key) & self._mask
+        while True:
+            entry = self._id_table[slot]
+            if not entry:
+                return None
+            if self._id_heap[self._id_offsets[entry - 1]:self._id_offsets[entry]] == key:
+                return entry - 1
+            slot = (slot + 1) & self._mask
+
+    def _track(self, index):
+        return {
+            "music_id": str(self._id_heap[self._id_offsets[index]:self._id_offsets[index + 1]], "utf-8"),
+            "title": self._title(index),
+            "duration": self._durations[index]
+        }
+
+    def _title(self, index):
+        return str(self._title_heap[self._title_offsets[index]:self._title_offsets[index + 1]], "utf-8")
+
+    def _title_key(self, index):
+        return normalize(self._title(index))
+
+    def _near_ids(self, text):
+        """Record indexes of IDs one edit (insert, delete, substitute, swap) away from `text`"""
+        if not text or len(text) > 40 or " " in text:
+            return []
+        variants = set()
+        for i in range(len(text) + 1):
+            head, tail = text[:i], text[i:]
+            if tail:
+                variants.add(head + tail[1:])
+            if len(tail) > 1:
+                variants.add(head + tail[1] + tail[0] + tail[2:])
+            for char in _ID_ALPHABET:
+                variants.add(head + char + tail)
+                if tail:
+                    variants.add(head + char + tail[1:])
+        variants.discard(text)
+        found = (self._find(variant) for variant in sorted(variants))
+        return [index for index in found if index is not None]
+
+    def _word_records(self, word_index):
+        return self._postings[self._postings_offsets[word_index]:self._postings_offsets[word_index + 1]]
+
+    def _load_vocab(self):
+        with self._vocab_lock:
+            if self._vocab is None:
+                words = [str(self._vocab_heap[self._vocab_offsets[i]:self._vocab_offsets[i + 1]], "utf-8")
+                         for i in range(len(self._vocab_offsets) - 1)]
+                trigrams, by_length = {}, {}
+                for index, word in enumerate(words):
+                    by_length.setdefault(len(word), []).append(index)
+                    for gram in _trigrams(word):
+                        trigrams.setdefault(gram, []).append(index)
+                self._vocab = (words, trigrams, by_length)
+        return self._vocab
+
+    def _similar_words(self, word, partial):
+        """(vocabulary index, score) for words matching `word`: exact 0, completion 0.5, typos by distance"""
+        words, trigrams, by_length = self._load_vocab()
+        found = {}
+        start = bisect.bisect_left(words, word)
+        if partial and len(word) >= 2:
+            for index in range(start, min(start + _PREFIX_EXPANSION, len(words))):
+                if not words[index].startswith(word):
+                    break
+                found[index] = 0.5
+        if start < len(words) and words[start] == word:
+            found[start] = 0
+            return found  # spelled right: typo variants would only add noise
+
+        limit = _max_typos(word)
+        if limit:
+            grams = _trigrams(word)
+            needed = len(grams) - 3 * limit
+            if needed > 0:
+                shared = collections.Counter(itertools.chain.from_iterable(trigrams.get(gram, ()) for gram in grams))
+                candidates = [index for index, hits in shared.items() if hits >= needed]
+            else:  # short word: too few trigrams to filter on, compare by length instead
+                candidates = [index for length in range(len(word) - limit, len(word) + limit + 1)
+                              for index in by_length.get(length, ())]
+            for index in candidates:
+                if index not in found:
+                    distance = edit_distance(word, words[index], limit)
+                    if distance <= limit:
+                        found[index] = distance
+        return found
+
+    def _records_matching(self, word, partial):
+        """[(score, [postings, ...])] for one query word, best score first"""
+        tiers = {}
+        for word_index, score in self._similar_words(word, partial).items():
+            tiers.setdefault(score, []).append(self._word_records(word_index))
+        return sorted(tiers.items(), key=lambda tier: tier[0])
+
+
+def _probe(matched, records):
+    """matched & records, for a set and a sorted postings array"""
+    if len(matched) * 32 < len(records):
+        # few candidates vs a long list: binary search beats reading the whole list
+        found = set()
+        for index in matched:
+            position = bisect.bisect_left(records, index)
+            if position < len(records) and records[position] == index:
+                found.add(index)
+        return found
+    return matched.intersection(records)
+
+
+def _intersect(words):
+    """Records present for every word, each word given as a list of postings arrays.
+
+    Only the rarest word becomes a set; the others are probed against it.
+    """
+    words = sorted(words, key=lambda postings: sum(map(len, postings)))
+    matched = set().union(*words[0])
+    for postings in words[1:]:
+        matched = set().union(*(_probe(matched, records) for records in postings))
+        if not matched:
+            break
+    return matched
+
+
+def _trigrams(word):
+    padded = f"^{word}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    """Process-wide catalog: MUSIC_CATALOG_PATH if set, else the built-in sample tracks"""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            if MUSIC_CATALOG_PATH:
+                _catalog = MusicCatalog.open(MUSIC_CATALOG_PATH)
+            else:
+                _catalog = MusicCatalog.from_tracks(
+                    (music_id, f"Sample Track {music_id.split('_')[1]}", 30) for music_id in VALID_MUSIC_IDS)
+        return _catalog
+
+
+# ---------------------------------------------------------------------------
+# CLI: build / generate / search
+
+_ADJECTIVES = ("Summer", "Midnight", "Golden", "Electric", "Neon", "Velvet", "Wild", "Lonely", "Crystal", "Silver",
+               "Broken", "Burning", "Frozen", "Hidden", "Endless", "Sweet", "Dark", "Bright", "Lucky", "Restless",
+               "Quiet", "Loud", "Cosmic", "Urban", "Tropical", "Dusty", "Secret", "Sunny", "Rainy", "Savage")
+_NOUNS = ("Vibes", "Dreams", "Nights", "Hearts", "Roads", "Waves", "Lights", "Skies", "Echoes", "Drums",
+          "Rivers", "Cities", "Shadows", "Flames", "Memories", "Streets", "Stars", "Rhythm", "Fever", "Paradise",
+          "Thunder", "Horizon", "Sunset", "Groove", "Anthem", "Motion", "Garden", "Mirage", "Signal", "Highway")
+_SYLLABLES = ("ka", "lo", "mi", "ra", "ze", "tan", "vel", "so", "ri", "don", "mar", "li", "ne", "ko", "sha",
+              "ty", "bel", "ro", "jin", "ax", "lu", "ven", "da", "mo", "ry", "kai", "el", "nor", "pi", "zu")
+_EXTRAS = ("", "", "", "Remix", "Acoustic", "Live", "Radio Edit", "Extended Mix", "Instrumental", "Slowed",
+           "Sped Up", "Reprise", "Demo", "Lofi", "Club Mix")
+
+
+def generate_tracks(count, seed=0):
+    """Synthetic library for benchmarks: `count` tracks plus the sample IDs from config.
+
+    Titles mix a small set of very common words with a long tail of made-up artist
+    names, roughly like a real library's vocabulary.
+    """
+    import random
+    rng = random.Random(seed)
+
+    def name():
+        return "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+
+    artists = [f"{name()} {name()}" for _ in range(max(1, count // 20))]
+    for music_id in VALID_MUSIC_IDS:
+        yield music_id, f"Sample Track {music_id.split('_')[1]}", 30
+    for i in range(count - len(VALID_MUSIC_IDS)):
+        title = f"{rng.choice(_ADJECTIVES)} {' '.join(rng.sample(_NOUNS, 2))}"
+        extra = rng.choice(_EXTRAS)
+        if extra:
+            title += f" ({extra})"
+        title += f" - {rng.choice(artists)}"
+        yield f"music_{i:07d}", title, rng.randint(8, 240)
+
+
+def read_tracks(path):
+    """(music_id, title, duration) rows from a CSV or JSONL file"""
+    if path.endswith((".jsonl", ".ndjson", ".json")):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    yield row["music_id"], row.get("title", ""), row.get("duration") or 0
+    else:
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                yield row["music_id"], row.get("title", ""), row.get("duration") or 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and query the memory-mapped music catalog")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="build a catalog from a CSV/JSONL file (music_id, title, duration)")
+    build.add_argument("input")
+    build.add_argument("-o", "--output", default="music.catalog")
+    generate = commands.add_parser("generate", help="build a synthetic catalog for benchmarks")
+    generate.add_argument("-n", "--count", type=int, default=1_000_000)
+    generate.add_argument("-o", "--output", default="music.catalog")
+    generate.add_argument("--seed", type=int, default=0)
+    search = commands.add_parser("search", help="look up an ID or search titles")
+    search.add_argument("catalog")
+    search.add_argument("query")
+    search.add_argument("-n", "--limit", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    if args.command == "search":
+        catalog = MusicCatalog.open(args.catalog)
+        track = catalog.get(args.query)
+        for track in [track] if track else catalog.search(args.query, args.limit) or catalog.suggest(args.query):
+            print(f"{track['music_id']}\t{track['duration']}s\t{track['title']}")
+        return 0
+
+    tracks = read_tracks(args.input) if args.command == "build" else generate_tracks(args.count, args.seed)
+    build_catalog(tracks, args.output)
+    print(f"📀 Wrote {len(MusicCatalog.open(args.output))} tracks to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,14 +4,108 @@ from dotenv import load_dotenv
 load_dotenv()
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash-exp")
+GEMINI_TIMEOUT_MS = int(os.getenv("GEMINI_TIMEOUT_MS", "30000"))
+
+# LLM backend ("gemini", "stub" for offline/CI, "fake" for offline ad-text benchmarks) and response cache
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".llm_cache.sqlite3")  # empty disables the disk tier
+LLM_MEMORY_CACHE_SIZE = 1024
+LLM_DISK_CACHE_SIZE = 50000
 
 MOCK_MODE = True
 
+# TikTok OAuth
+TIKTOK_CLIENT_ID = os.getenv("TIKTOK_CLIENT_ID", "valid_client")
+TIKTOK_CLIENT_SECRET = os.getenv("TIKTOK_CLIENT_SECRET", "valid_secret")
+TOKEN_REFRESH_MARGIN = 300  # refresh this many seconds before the token expires
+
+# TikTok API backend: "mock" (in-process) or "http" (python http_api.py serves a local stand-in)
+TIKTOK_API_BACKEND = os.getenv("TIKTOK_API_BACKEND", "mock")
+TIKTOK_API_URL = os.getenv("TIKTOK_API_URL", "http://127.0.0.1:8765")
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "32"))  # keep-alive connections
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+
 # Business Rules
 VALID_OBJECTIVES = ["Traffic", "Conversions"]
 VALID_CTAS = ["Shop Now", "Learn More", "Sign Up", "Download", "Get App", "Watch Now"]
 MAX_AD_TEXT_LENGTH = 100
 MIN_CAMPAIGN_NAME_LENGTH = 3
+MUSIC_ID_PATTERN = r"[A-Za-z0-9_\-]{1,64}"
 
 # Mock Music IDs
-VALID_MUSIC_IDS = ["music_12345", "music_67890", "music_11111"]
\ No newline at end of file
+VALID_MUSIC_IDS = ["music_12345", "music_67890", "music_11111"]
+
+# Music catalog: file built with `python catalog.py build`, empty = the sample IDs above
+MUSIC_CATALOG_PATH = os.getenv("MUSIC_CATALOG_PATH", "")
+
+# Music validation cache
+MUSIC_CACHE_SIZE = int(os.getenv("MUSIC_CACHE_SIZE", "1024"))
+MUSIC_CACHE_TTL = float(os.getenv("MUSIC_CACHE_TTL", "3600"))  # seconds, for music IDs that exist
+MUSIC_NOT_FOUND_TTL = float(os.getenv("MUSIC_NOT_FOUND_TTL", "60"))  # seconds, for music_not_found answers
+
+# Music uploads
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))  # bytes per chunk
+UPLOAD_PARALLELISM = int(os.getenv("UPLOAD_PARALLELISM", "4"))  # chunks in flight per upload
+UPLOAD_CHUNK_RETRIES = 3
+UPLOAD_SESSION_TTL = 3600  # seconds the mock server keeps an unfinished upload resumable
+UPLOADED_MUSIC_LIMIT = 10000  # tracks the mock server remembers (the oldest are forgotten first)
+
+# Ad submission pacing & retries
+SUBMIT_RATE_LIMIT = float(os.getenv("SUBMIT_RATE_LIMIT", "50"))  # submissions per second
+SUBMIT_BURST = int(os.getenv("SUBMIT_BURST", "50"))
+SUBMIT_MAX_RETRIES = int(os.getenv("SUBMIT_MAX_RETRIES", "5"))
+SUBMIT_BACKOFF_BASE = 0.5  # seconds, doubled on each retry
+SUBMIT_BACKOFF_MAX = 30.0
+IDEMPOTENCY_CACHE_SIZE = 100000  # fingerprints of created campaigns remembered client-side
+IDEMPOTENCY_RETENTION = float(os.getenv("IDEMPOTENCY_RETENTION", str(24 * 3600)))  # seconds the mock server replays a key
+IDEMPOTENCY_SERVER_SIZE = 100000  # keys the mock server replays at most (the oldest are forgotten first)
+SUBMIT_BATCH_SIZE = int(os.getenv("SUBMIT_BATCH_SIZE", "50"))  # ads per submit_ads call (server max 50)
+SUBMIT_BATCH_MAX_WAIT = float(os.getenv("SUBMIT_BATCH_MAX_WAIT", "0.05"))  # seconds a partial batch may wait to fill
+
+# Ad-text variants (see variants.py): several AI-written ad texts per campaign
+VARIANT_COUNT = int(os.getenv("VARIANT_COUNT", "5"))  # variants per campaign
+VARIANT_CONCURRENCY = int(os.getenv("VARIANT_CONCURRENCY", "32"))  # LLM prompts in flight
+VARIANT_MAX_ATTEMPTS = 3  # prompts per variant before an over-long text is trimmed or a duplicate dropped
+VARIANT_SIMILARITY = 0.8  # word overlap (Jaccard) from which two variants count as the same
+
+# Intent resolution (see intent.py): rules first, the LLM only for replies they are unsure about
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.8"))
+INTENT_CACHE_SIZE = 4096  # LLM verdicts kept per process, keyed by step + normalized reply
+
+# Result store (see store.py): every finished submission, appended to SQLite by a background writer
+RESULT_STORE_PATH = os.getenv("RESULT_STORE_PATH", "campaigns.sqlite3")  # empty disables it
+RESULT_STORE_BATCH = 512  # rows per insert transaction
+RESULT_STORE_INTERVAL = 0.05  # seconds the writer waits for more rows after a partial batch
+
+# API guard (see resilience.py): adaptive concurrency limit + circuit breakers around every API call
+API_GUARD_ENABLED = os.getenv("API_GUARD_ENABLED", "1").lower() in ("1", "true", "yes")
+API_CONCURRENCY_INITIAL = int(os.getenv("API_CONCURRENCY_INITIAL", "16"))  # in-flight calls before any feedback
+API_CONCURRENCY_MIN = 1
+API_CONCURRENCY_MAX = int(os.getenv("API_CONCURRENCY_MAX", "256"))
+API_LATENCY_TOLERANCE = 2.0  # a call slower than this x its endpoint's usual latency counts as congestion
+API_MAX_ERROR_RATE = 0.25  # stop growing the limit while more calls than this fail
+API_OVERLOAD_THRESHOLD = 0.2  # share of rate_limit answers that cuts the limit (isolated ones do not)
+API_BREAKER_THRESHOLDS = {  # consecutive errors of one class (per endpoint) that open its circuit
+    "unauthorized": 3,
+    "geo_restriction": 5,
+    "insufficient_permissions": 5,
+    "rate_limit": 20
+}
+API_BREAKER_COOLDOWN = float(os.getenv("API_BREAKER_COOLDOWN", "30"))  # seconds an open circuit fails fast
+
+# Logging (see log.py): console lines for the CLI, optional JSON-lines file written in the background
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FILE = os.getenv("LOG_FILE", "")  # empty = no file
+LOG_QUIET = os.getenv("LOG_QUIET", "").lower() in ("1", "true", "yes")  # nothing from the agent/API on the console
+
+# Metrics & profiling (see metrics.py): off by default, spans cost one attribute check then
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "").lower() in ("1", "true", "yes")
+METRICS_PROFILE = os.getenv("METRICS_PROFILE", "").lower() in ("1", "true", "yes")  # cProfile from startup
+
+# Conversation server
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "10000"))
+SESSION_TTL = float(os.getenv("SESSION_TTL", "1800"))  # idle seconds
+SESSION_MAX_MEMORY_MB = float(os.getenv("SESSION_MAX_MEMORY_MB", "512"))
+HISTORY_MAX_TURNS = int(os.getenv("HISTORY_MAX_TURNS", "50"))  # messages kept in memory per conversation
@@ -0,0 +1,66 @@
+import json
+from config import HISTORY_MAX_TURNS
+
+
+class ConversationHistory:
+    """Ring buffer of the last `maxlen` messages; older ones are appended to `spill_path` (JSONL) if set.
+
+    Messages are stored as (role, content) tuples and handed out as {"role", "content"} dicts,
+    so it can be used where the plain list of dicts used to be.
+    """
+
+    __slots__ = ("maxlen", "spill_path", "spilled", "chars", "_turns", "_start")
+
+    def __init__(self, maxlen=HISTORY_MAX_TURNS, spill_path=None):
+        self.maxlen = maxlen
+        self.spill_path = spill_path
+        self.spilled = 0
+        self.chars = 0  # total length of the contents held in memory, kept up to date on append
+        self._turns = []
+        self._start = 0  # index of the oldest message once the buffer is full
+
+    def append(self, message):
+        turn = (message["role"], message["content"])
+        self.chars += len(turn[1])
+        if len(self._turns) < self.maxlen:
+            self._turns.append(turn)
+            return
+        oldest = self._turns[self._start]
+        self._turns[self._start] = turn
+        self._start = (self._start + 1) % self.maxlen
+        self.chars -= len(oldest[1])
+        self._spill(oldest)
+
+    def _spill(self, turn):
+        self.spilled += 1
+        if self.spill_path:
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"role": turn[0], "content": turn[1]}) + "\n")
+
+    def _ordered(self):
+        return self._turns[self._start:] + self._turns[:self._start]
+
+    def __iter__(self):
+        for role, content in self._ordered():
+            yield {"role": role, "content": content}
+
+    def __len__(self):
+        return len(self._turns)
+
+    def __getitem__(self, index):
+        role, content = self._ordered()[index]
+        return {"role": role, "content": content}
+
+    def full_transcript(self):
+        """Spilled messages (if they were written to disk) followed by the in-memory ones"""
+        messages = []
+        if self.spill_path and self.spilled:
+            with open(self.spill_path, encoding="utf-8") as f:
+                messages.extend(json.loads(line) for line in f if line.strip())
+        messages.extend(self)
+        return messages
+
+    def clear(self):
+        self.chars = 0
+        self._turns = []
+        self._start = 0
@@ -0,0 +1,366 @@
+import argparse
+import json
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote, urlsplit, parse_qs
+import requests
+from requests.adapters import HTTPAdapter
+from config import TIKTOK_API_URL, HTTP_POOL_SIZE, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT
+from metrics import traced
+from resilience import guarded
+from mock_tiktok_api import MockTikTokAPI, LATENCY, with_token, token_rejected
+from upload import ChunkedUploader
+
+# error type -> HTTP status returned by the stand-in server
+ERROR_STATUS = {
+    "invalid_client": 401,
+    "invalid_secret": 401,
+    "unauthorized": 401,
+    "music_not_found": 404,
+    "missing_music": 400,
+    "invalid_music_id": 400,
+    "rate_limit": 429,
+    "geo_restriction": 403,
+    "insufficient_permissions": 403,
+    "empty_file": 400,
+    "file_too_large": 413,
+    "invalid_chunk_size": 400,
+    "invalid_chunk": 400,
+    "chunk_checksum_mismatch": 400,
+    "chunk_upload_failed": 503,
+    "upload_not_found": 404,
+    "upload_incomplete": 409,
+    "batch_too_large": 413,
+    "invalid_json": 400,
+    "not_found": 404
+}
+
+
+# ---------------------------------------------------------------------------
+# Server: the mock API's endpoint logic behind real HTTP
+
+class TikTokAPIHandler(BaseHTTPRequestHandler):
+    """
+        POST /oauth/token        {"client_id", "client_secret"}
+        GET  /music/<music_id>
+        GET  /search/music?q=<query>&limit=<n>   (not under /music/: "search" is a valid music ID)
+        POST /music/uploads                          {"sha256", "size", "chunk_size", "file_name"}
+        PUT  /music/uploads/<id>/chunks/<index>      raw bytes, X-Chunk-Sha256 header
+        GET  /music/uploads/<id>
+        POST /music/uploads/<id>/complete
+        POST /ads                {"payload", "idempotency_key"}
+        POST /ads/batch          {"payloads": [...], "idempotency_keys": [...]}
+    """
+
+    protocol_version = "HTTP/1.1"  # keep-alive
+    # headers and body leave in one segment, otherwise Nagle + delayed ACK add ~40ms per response
+    wbufsize = -1
+    disable_nagle_algorithm = True
+    latency_scale = 1.0
+    issued_tokens = None  # set by make_server()
+    upload_path = re.compile(r"^/music/uploads/([\w-]+)(?:/chunks/(\d+)|/(complete))?$")
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, result):
+        status = 200 if result.get("success") else ERROR_STATUS.get(result.get("error"), 500)
+        data = json.dumps(result).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _api(self):
+        """Per-request mock core, authorized only if the bearer token was issued by this server"""
+        api = MockTikTokAPI()
+        auth = self.headers.get("Authorization", "")
+        token = auth[len("Bearer "):] if auth.startswith("Bearer ") else None
+        api.set_access_token(token if token in self.issued_tokens else None)
+        return api
+
+    def _simulate_latency(self, endpoint):
+        if self.latency_scale:
+            time.sleep(LATENCY[endpoint] * self.latency_scale)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length)) if length else {}
+
+    def do_GET(self):
+        match = self.upload_path.match(self.path)
+        if match and not match.group(2) and not match.group(3):
+            self._simulate_latency("upload_init")
+            return self._send(self._api()._upload_status(match.group(1)))
+        url = urlsplit(self.path)
+        if url.path == "/search/music":
+            query = parse_qs(url.query)
+            self._simulate_latency("search_music")
+            return self._send(self._api()._search_music(query.get("q", [""])[0], int(query.get("limit", ["10"])[0])))
+        if not self.path.startswith("/music/"):
+            return self._send({"success": False, "error": "not_found", "message": f"No route for GET {self.path}"})
+        self._simulate_latency("validate_music_id")
+        self._send(self._api()._validate_music_id(unquote(self.path[len("/music/"):])))
+
+    def do_POST(self):
+        try:
+            body = self._read_json()
+        except ValueError:
+            return self._send({"success": False, "error": "invalid_json", "message": "Request body must be JSON."})
+
+        if self.path == "/oauth/token":
+            self._simulate_latency("oauth_authorize")
+            api = MockTikTokAPI()
+            result = api._oauth_authorize(body.get("client_id"), body.get("client_secret"))
+            if result["success"]:
+                self.issued_tokens.add(result["access_token"])
+            return self._send(result)
+
+        if self.path == "/music/uploads":
+            self._simulate_latency("upload_init")
+            return self._send(self._api()._upload_init(body.get("sha256"), int(body.get("size") or 0),
+                                                       int(body.get("chunk_size") or 0), body.get("file_name")))
+
+        match = self.upload_path.match(self.path)
+        if match and match.group(3):
+            self._simulate_latency("upload_complete")
+            return self._send(self._api()._upload_complete(match.group(1)))
+
+        if self.path == "/ads":
+            self._simulate_latency("submit_ad")
+            key = body.get("idempotency_key") or self.headers.get("Idempotency-Key")
+            return self._send(self._api()._submit_ad(body.get("payload") or {}, key))
+
+        if self.path == "/ads/batch":
+            self._simulate_latency("submit_ads")
+            return self._send(self._api()._submit_ads(body.get("payloads") or [], body.get("idempotency_keys")))
+
+        self._send({"success": False, "error": "not_found", "message": f"No route for POST {self.path}"})
+
+    def do_PUT(self):
+        match = self.upload_path.match(self.path)
+        data = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if not match or not match.group(2):
+            return self._send({"success": False, "error": "not_found", "message": f"No route for PUT {self.path}"})
+        self._simulate_latency("upload_chunk")
+        self._send(self._api()._upload_chunk(match.group(1), int(match.group(2)), data,
+                                             self.headers.get("X-Chunk-Sha256")))
+
+
+class TikTokAPIServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def make_server(host="127.0.0.1", port=8765, latency_scale=1.0):
+    handler = type("BoundTikTokAPIHandler", (TikTokAPIHandler,),
+                   {"latency_scale": latency_scale, "issued_tokens": set()})
+    return TikTokAPIServer((host, port), handler)
+
+
+def start_background_server(host="127.0.0.1", port=0, latency_scale=1.0):
+    """Serve on a daemon thread (port 0 picks a free port), returns (server, base_url)"""
+    server = make_server(host, port, latency_scale)
+    threading.Thread(target=server.serve_forever, name="tiktok-http-api", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+# ---------------------------------------------------------------------------
+# Client: same interface as MockTikTokAPI, over a pooled keep-alive session
+
+class HttpTikTokAPI:
+    """TikTok Ads API client over HTTP with a pooled, keep-alive requests.Session"""
+
+    def __init__(self, base_url=TIKTOK_API_URL, pool_size=HTTP_POOL_SIZE,
+                 connect_timeout=HTTP_CONNECT_TIMEOUT, read_timeout=HTTP_READ_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.access_token = None
+        self.token_valid = False
+        self.token_provider = None
+        self.on_unauthorized = None  # see _MockTikTokCore
+
+    def set_access_token(self, access_token):
+        self.access_token = access_token
+        self.token_valid = bool(access_token)
+
+    def _resolve_token(self):
+        """Take the current token from token_provider, before the guarded call (see with_token)"""
+        if self.token_provider is not None:
+            self.set_access_token(self.token_provider())
+
+    def _headers(self):
+        return {"Authorization": f"Bearer {self.access_token}"} if self.access_token else {}
+
+    def _request(self, method, path, body=None, authorized=True, data=None, headers=None):
+        try:
+            headers = dict(self._headers() if authorized else {}, **(headers or {}))
+            response = self.session.request(method, self.base_url + path, json=body, data=data,
+                                            headers=headers, timeout=self.timeout)
+            return response.json()
+        except requests.Timeout:
+            return {"success": False, "error": "timeout", "message": f"TikTok API did not answer within {self.timeout[1]}s."}
+        except (requests.RequestException, ValueError) as e:
+            return {"success": False, "error": "network_error", "message": f"Could not reach TikTok API: {e}"}
+
+    @traced("tiktok_api", endpoint="oauth_authorize")
+    @guarded("oauth_authorize")
+    def oauth_authorize(self, client_id, client_secret):
+        """OAuth flow"""
+        # no bearer header here: the token provider may be waiting on this very call
+        result = self._request("POST", "/oauth/token", {"client_id": client_id, "client_secret": client_secret},
+                               authorized=False)
+        if result.get("success"):
+            self.set_access_token(result["access_token"])
+        return result
+
+    @traced("tiktok_api", endpoint="validate_music_id")
+    @with_token
+    @guarded("validate_music_id")
+    def validate_music_id(self, music_id):
+        """Check if music ID exists"""
+        return self._request("GET", f"/music/{quote(music_id, safe='')}")
+
+    @traced("tiktok_api", endpoint="search_music")
+    @with_token
+    @guarded("search_music")
+    def search_music(self, query, limit=10):
+        """Find tracks by title prefix, tolerating typos"""
+        return self._request("GET", f"/search/music?q={quote(query, safe='')}&limit={int(limit)}")
+
+    @traced("tiktok_api", endpoint="upload_music")
+    def upload_music(self, source):
+        """Music upload: a file path, bytes or file object, sent in resumable chunks (see upload.py)"""
+        return ChunkedUploader(self).upload(source)
+
+    @traced("tiktok_api", endpoint="upload_init")
+    @with_token
+    @guarded("upload_init")
+    def upload_init(self, sha256, size, chunk_size, file_name=None):
+        return self._request("POST", "/music/uploads",
+                             {"sha256": sha256, "size": size, "chunk_size": chunk_size, "file_name": file_name})
+
+    @traced("tiktok_api", endpoint="upload_chunk")
+    @with_token
+    @guarded("upload_chunk")
+    def upload_chunk(self, upload_id, index, data, chunk_sha256=None):
+        headers = {"Content-Type": "application/octet-stream"}
+        if chunk_sha256:
+            headers["X-Chunk-Sha256"] = chunk_sha256
+        return self._request("PUT", f"/music/uploads/{upload_id}/chunks/{index}", data=bytes(data), headers=headers)
+
+    @traced("tiktok_api", endpoint="upload_status")
+    @with_token
+    @guarded("upload_status")
+    def upload_status(self, upload_id):
+        return self._request("GET", f"/music/uploads/{upload_id}")
+
+    @traced("tiktok_api", endpoint="upload_complete")
+    @with_token
+    @guarded("upload_complete")
+    def upload_complete(self, upload_id):
+        return self._request("POST", f"/music/uploads/{upload_id}/complete")
+
+    @traced("tiktok_api", endpoint="submit_ad")
+    @with_token
+    @guarded("submit_ad")
+    def submit_ad(self, ad_payload, idempotency_key=None):
+        """Create the ad campaign"""
+        return self._request("POST", "/ads", {"payload": ad_payload, "idempotency_key": idempotency_key})
+
+    @traced("tiktok_api", endpoint="submit_ads")
+    @with_token
+    @guarded("submit_ads")
+    def submit_ads(self, ad_payloads, idempotency_keys=None):
+        """Create many ad campaigns in one round trip, one result per payload"""
+        return self._request("POST", "/ads/batch", {"payloads": ad_payloads, "idempotency_keys": idempotency_keys})
+
+    def close(self):
+        self.session.close()
+
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+
+def get_shared_client():
+    """One pooled HttpTikTokAPI per process, so every agent reuses the same keep-alive connections"""
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = HttpTikTokAPI()
+        return _shared_client
+
+
+class AsyncHttpTikTokAPI:
+    """Awaitable facade over HttpTikTokAPI; requests is blocking, so calls run on worker threads"""
+
+    def __init__(self, http_api=None):
+        self.http_api = http_api or get_shared_client()
+        # may return an awaitable (e.g. TokenManager.aget_token): it is awaited on the loop,
+        # the request then goes out on a worker thread with that token
+        self.token_provider = None
+        self.on_unauthorized = None
+
+    def set_access_token(self, access_token):
+        self.http_api.set_access_token(access_token)
+
+    async def _run(self, method, *args, authorized=True):
+        import asyncio  # lazy, see AsyncMockTikTokAPI
+        token = None
+        if authorized and self.token_provider is not None:
+            token = self.token_provider()
+            token = await token if hasattr(token, "__await__") else token
+            self.set_access_token(token)
+        result = await asyncio.to_thread(method, *args)
+        token_rejected(self, token, result)
+        return result
+
+    async def oauth_authorize(self, client_id, client_secret):
+        return await self._run(self.http_api.oauth_authorize, client_id, client_secret, authorized=False)
+
+    async def validate_music_id(self, music_id):
+        return await self._run(self.http_api.validate_music_id, music_id)
+
+    async def search_music(self, query, limit=10):
+        return await self._run(self.http_api.search_music, query, limit)
+
+    async def upload_music(self, source):
+        return await self._run(self.http_api.upload_music, source)
+
+    async def submit_ad(self, ad_payload, idempotency_key=None):
+        return await self._run(self.http_api.submit_ad, ad_payload, idempotency_key)
+
+    async def submit_ads(self, ad_payloads, idempotency_keys=None):
+        return await self._run(self.http_api.submit_ads, ad_payloads, idempotency_keys)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local HTTP stand-in for the TikTok Ads API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="multiplier on the mock's simulated latency (0 = answer immediately)")
+    args = parser.parse_args(argv)
+
+    server = make_server(args.host, args.port, args.latency_scale)
+    print(f"🌐 Mock TikTok Ads API listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Shutting down")
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,249 @@
+import json
+import re
+import threading
+from cache import TTLCache
+from config import VALID_OBJECTIVES, VALID_CTAS, INTENT_CACHE_SIZE, INTENT_CONFIDENCE_THRESHOLD
+from metrics import count
+
+QUESTION, ANSWER = "question", "answer"
+TIERS = ("rules", "cache", "llm")
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+# Openers that make a question whatever follows. Bare auxiliaries ("is", "do", "can" ...)
+# are not in here: "Do it now" or "Can't stop dancing" are perfectly good ad texts and names
+QUESTION_OPENERS = [
+    "what", "whats", "why", "how", "when", "where", "who", "which", "explain", "help", "tell me",
+    "not sure", "i don t know", "i dont know", "idk",
+    "is it", "is this", "is that", "is there", "is music", "are there", "are they",
+    "do i", "do you", "do we", "does it", "does this", "does that",
+    "can i", "can you", "can we", "could you", "should i", "should we", "must i", "would you"
+]
+AUXILIARIES = {"is", "are", "do", "does", "can", "could", "should", "would", "will", "must"}
+
+# Choice steps: normalized exact answers first, then keywords anywhere in the reply
+OBJECTIVE_EXACT = dict({objective.lower(): objective for objective in VALID_OBJECTIVES},
+                       **{"1": "Traffic", "2": "Conversions", "conversion": "Conversions"})
+OBJECTIVE_KEYWORDS = {
+    "traffic": "Traffic", "visits": "Traffic", "website visits": "Traffic", "clicks": "Traffic",
+    "conversion": "Conversions", "conversions": "Conversions", "sales": "Conversions", "purchases": "Conversions"
+}
+CTA_EXACT = dict({cta.lower(): cta for cta in VALID_CTAS}, **{"signup": "Sign Up", "getapp": "Get App"})
+CTA_KEYWORDS = {
+    "shop": "Shop Now", "buy": "Shop Now", "purchase": "Shop Now",
+    "learn": "Learn More", "more": "Learn More", "info": "Learn More",
+    "signup": "Sign Up", "sign up": "Sign Up", "register": "Sign Up",
+    "download": "Download", "install": "Download",
+    "get": "Get App", "app": "Get App",
+    "watch": "Watch Now", "view": "Watch Now", "play": "Watch Now"
+}
+
+# confidence of each kind of rule match; below INTENT_CONFIDENCE_THRESHOLD the LLM gets a say
+SURE = 1.0
+KEYWORD = 0.9
+FREE_TEXT_OPENER = 0.7  # "How to glow up in 7 days" may be a question or the ad text itself
+AMBIGUOUS = 0.5
+LLM_RETRY_AFTER = 60  # seconds before a reply the LLM failed on (no answer at all) is sent again
+
+LLM_PROMPT = """You classify one reply in a chat that sets up a TikTok ad campaign.
+The assistant just asked for the {field}.{options}
+User reply: {text}
+
+Is the reply a question about the {field}, or an answer to it?
+Respond with JSON only: {{"intent": "question" or "answer", "value": {value_hint}, "confidence": 0 to 1}}"""
+
+
+def normalize(text):
+    """Lowercase words only: "Sign-up!" -> "sign up\""""
+    return " ".join(_WORD.findall(text.lower()))
+
+
+class KeywordTrie:
+    """Word-level trie: finds every known phrase in a reply in one pass over its words"""
+
+    def __init__(self, phrases=None):
+        self.root = {}
+        for phrase, value in (phrases or {}).items():
+            self.add(phrase, value)
+
+    def add(self, phrase, value):
+        node = self.root
+        for word in phrase.split():
+            node = node.setdefault(word, {})
+        node[None] = value  # None marks the end of a phrase
+
+    def prefix(self, words):
+        """Value of the longest phrase the words start with, or None"""
+        node, found = self.root, None
+        for word in words:
+            node = node.get(word)
+            if node is None:
+                break
+            found = node.get(None, found)
+        return found
+
+    def scan(self, words):
+        """Values of all phrases found, in order of position"""
+        values = []
+        for start in range(len(words)):
+            value = self.prefix(words[start:start + 4])
+            if value is not None:
+                values.append(value)
+        return values
+
+
+class Intent:
+    """What a reply means at one step: a question, or an answer (with the canonical value for choice steps)"""
+
+    __slots__ = ("kind", "value", "confidence", "tier")
+
+    def __init__(self, kind, value=None, confidence=SURE, tier="rules"):
+        self.kind = kind
+        self.value = value
+        self.confidence = confidence
+        self.tier = tier
+
+    @property
+    def is_question(self):
+        return self.kind == QUESTION
+
+    def __repr__(self):
+        return f"Intent({self.kind!r}, {self.value!r}, confidence={self.confidence}, tier={self.tier!r})"
+
+
+class IntentResolver:
+    """Three tiers per reply: precompiled rules, then a cache of earlier LLM verdicts, then the LLM.
+
+    Only replies the rules are unsure about (confidence below the threshold) go further,
+    and without a usable LLM answer the rules' best guess stands.
+    """
+
+    FIELDS = {
+        "campaign_name": ("campaign name", None),
+        "objective": ("campaign objective", VALID_OBJECTIVES),
+        "ad_text": ("ad text", None),
+        "cta": ("call-to-action button", VALID_CTAS)
+    }
+
+    def __init__(self, cache_size=INTENT_CACHE_SIZE, threshold=INTENT_CONFIDENCE_THRESHOLD):
+        self.threshold = threshold
+        self.cache = TTLCache(cache_size)
+        self.openers = KeywordTrie({phrase: True for phrase in QUESTION_OPENERS})
+        self.exact = {"objective": OBJECTIVE_EXACT, "cta": CTA_EXACT}
+        self.keywords = {"objective": KeywordTrie(OBJECTIVE_KEYWORDS), "cta": KeywordTrie(CTA_KEYWORDS)}
+        self.resolved = dict.fromkeys(TIERS, 0)
+        self._lock = threading.Lock()
+
+    def resolve(self, step, text, llm=None):
+        """Intent of `text` at `step`; llm(prompt) -> str or None is only called for unsure replies"""
+        intent, key = self._without_llm(step, text, llm is not None)
+        if key is not None:
+            intent = self._verdict(step, key, intent, llm(self._prompt(step, text)))
+        return self._resolved(intent)
+
+    async def aresolve(self, step, text, allm=None):
+        """resolve() for the asyncio path: allm(prompt) is awaited, so the LLM tier never blocks the loop"""
+        intent, key = self._without_llm(step, text, allm is not None)
+        if key is not None:
+            intent = self._verdict(step, key, intent, await allm(self._prompt(step, text)))
+        return self._resolved(intent)
+
+    def _without_llm(self, step, text, llm_available):
+        """(intent from the rules or the cache, cache key when the LLM should still be asked)"""
+        intent = self.rules(step, text)
+        if intent.confidence >= self.threshold or not llm_available:
+            return intent, None
+        key = (step, normalize(text))
+        cached = self.cache.get(key)
+        if cached is not None:
+            return Intent(cached.kind, cached.value, cached.confidence, "cache"), None
+        return intent, key
+
+    def _verdict(self, step, key, intent, reply):
+        verdict = self._parse(step, reply) if reply else None
+        if verdict is None:
+            # unsure or unusable answer: the rules' guess stands, and is remembered so the
+            # same reply is not sent again (only briefly when there was no answer at all)
+            verdict = Intent(intent.kind, intent.value, intent.confidence, "llm")
+            self.cache.set(key, verdict, None if reply else LLM_RETRY_AFTER)
+        else:
+            self.cache.set(key, verdict)
+        return verdict
+
+    def _resolved(self, intent):
+        with self._lock:
+            self.resolved[intent.tier] += 1
+        count("intent_resolved_total", tier=intent.tier)
+        return intent
+
+    def rules(self, step, text):
+        """Tier 1: question openers, exact answers and keywords, no I/O"""
+        stripped = text.strip()
+        words = normalize(stripped).split()
+        if stripped.endswith("?"):
+            return Intent(QUESTION)
+
+        choices = self.exact.get(step)
+        if self.openers.prefix(words):
+            # a question opener; on free-text steps it might just as well be the text itself
+            return Intent(QUESTION, confidence=KEYWORD if choices else FREE_TEXT_OPENER)
+
+        if choices is None:
+            # a bare auxiliary ("Do it now", "Is summer here") is far more often an answer
+            return Intent(ANSWER, confidence=AMBIGUOUS if words and words[0] in AUXILIARIES else SURE)
+
+        joined = "".join(words)
+        value = choices.get(" ".join(words)) or choices.get(joined)
+        if value is not None:
+            return Intent(ANSWER, value)
+        found = self.keywords[step].scan(words)
+        if found:
+            # several different options named ("shop or watch") is a guess, first one mentioned wins
+            return Intent(ANSWER, found[0], KEYWORD if len(set(found)) == 1 else AMBIGUOUS)
+        # nothing recognised: a typo or a description the LLM may map to an option
+        return Intent(ANSWER, None, AMBIGUOUS if words else SURE)
+
+    def _prompt(self, step, text):
+        field, options = self.FIELDS.get(step, (str(step).replace("_", " "), None))
+        return LLM_PROMPT.format(
+            field=field, text=json.dumps(text),
+            options=f" Valid options: {', '.join(options)}." if options else "",
+            value_hint="one of the valid options or null" if options else "null"
+        )
+
+    def _parse(self, step, reply):
+        """The LLM's verdict as an Intent, None when it is malformed or below the threshold"""
+        options = self.FIELDS.get(step, (None, None))[1]
+        start, end = reply.find("{"), reply.rfind("}")
+        try:
+            verdict = json.loads(reply[start:end + 1])
+            kind, value = verdict["intent"], verdict.get("value")
+            confidence = float(verdict.get("confidence", 0))
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return None
+        if kind not in (QUESTION, ANSWER) or confidence < self.threshold:
+            return None
+        if options is not None and value not in options:
+            value = None
+        return Intent(kind, value if kind == ANSWER else None, confidence, "llm")
+
+    def stats(self):
+        with self._lock:
+            resolved = dict(self.resolved)
+        total = sum(resolved.values())
+        return dict(resolved, total=total,
+                    without_llm=(total - resolved["llm"]) / total if total else 1.0,
+                    verdict_cache=self.cache.stats())
+
+
+_resolver = None
+_resolver_lock = threading.Lock()
+
+
+def get_intent_resolver():
+    """Process-wide resolver, so every session shares the cache of LLM verdicts"""
+    global _resolver
+    with _resolver_lock:
+        if _resolver is None:
+            _resolver = IntentResolver()
+        return _resolver
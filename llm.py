@@ -0,0 +1,248 @@
+import hashlib
+import random
+import re
+import sqlite3
+import threading
+import time
+from cache import TTLCache
+from config import (GEMINI_API_KEY, GEMINI_MODEL, GEMINI_TIMEOUT_MS, LLM_BACKEND, LLM_CACHE_PATH,
+                    LLM_MEMORY_CACHE_SIZE, LLM_DISK_CACHE_SIZE)
+
+
+class GeminiBackend:
+    """Google Gemini via the google-genai SDK, imported and connected on first use"""
+
+    name = "gemini"
+
+    def __init__(self, api_key=GEMINI_API_KEY, timeout_ms=GEMINI_TIMEOUT_MS):
+        self.api_key = api_key
+        self.timeout_ms = timeout_ms
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        # importing google.genai alone takes longer than the whole deterministic flow
+        with self._lock:
+            if self._client is None:
+                from google import genai
+                from google.genai import types
+                self._client = genai.Client(api_key=self.api_key, http_options=types.HttpOptions(timeout=self.timeout_ms))
+            return self._client
+
+    def generate(self, model, prompt):
+        response = self.client.models.generate_content(model=model, contents=prompt)
+        return response.text
+
+
+class StubBackend:
+    """Deterministic offline backend for CI and load tests (no network)"""
+
+    name = "stub"
+
+    def __init__(self, responses=None, latency=0.0):
+        # responses: {substring: reply}, first substring found in the prompt wins
+        self.responses = responses or {}
+        self.latency = latency
+        self.calls = 0
+
+    def generate(self, model, prompt):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        for needle, reply in self.responses.items():
+            if needle in prompt:
+                return reply
+        digest = hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).hexdigest()[:12]
+        return f"stub response {digest}"
+
+
+class FakeAdBackend:
+    """Offline stand-in for ad-copy prompts (see variants.py): seeded latency and plausible texts.
+
+    Like a real model it sometimes runs long or repeats itself (`long_rate`, `repeat_rate`),
+    less so when the prompt asks for something shorter or different. The same prompt
+    always gets the same answer.
+    """
+
+    name = "fake"
+
+    TEMPLATES = [
+        "{subject}: the deal you have been waiting for",
+        "Meet {subject}. Made for your everyday",
+        "{subject} is here, grab yours before it is gone",
+        "Why everyone is talking about {subject}",
+        "Upgrade your routine with {subject} today",
+        "{subject}, now with free shipping",
+        "Don't scroll past {subject}",
+        "Your feed needed {subject}",
+        "Tired of the same old? Try {subject}",
+        "{subject}: small change, big difference",
+        "Say hello to {subject}",
+        "The secret behind the glow-up: {subject}",
+        "{subject} just dropped and it is selling fast",
+        "Treat yourself to {subject} this week",
+        "Real people, real results with {subject}",
+        "One tap away from {subject}",
+    ]
+    LONG_TAIL = (" and honestly you will wonder how you ever lived without it, so tap now, tell your friends"
+                 " and join thousands of happy customers")
+
+    def __init__(self, latency=0.3, jitter=0.5, seed=0, long_rate=0.15, repeat_rate=0.15):
+        self.latency = latency
+        self.jitter = jitter
+        self.seed = seed
+        self.long_rate = long_rate
+        self.repeat_rate = repeat_rate
+        self.calls = 0
+
+    def generate(self, model, prompt):
+        self.calls += 1
+        rng = random.Random(f"{self.seed}\0{model}\0{prompt}")
+        if self.latency:
+            time.sleep(self.latency * rng.lognormvariate(0, self.jitter))
+        quoted = re.search(r'"([^"]+)"', prompt)
+        subject = quoted.group(1) if quoted else "your brand"
+        retry = "previous" in prompt.lower()
+        template = self.TEMPLATES[0] if rng.random() < self.repeat_rate / (3 if retry else 1) else rng.choice(self.TEMPLATES)
+        text = template.format(subject=subject)
+        if rng.random() < self.long_rate / (3 if retry else 1):
+            text += self.LONG_TAIL
+        return text
+
+
+class DiskCache:
+    """SQLite tier of the response cache, survives restarts, trimmed LRU-style to max_entries"""
+
+    def __init__(self, path, max_entries=LLM_DISK_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, model TEXT, response TEXT, created_at REAL, last_used REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used)")
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            return row[0]
+
+    def set(self, key, model, response):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, model, response, now, now)
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    """Content-addressed (model + prompt) cache: in-memory LRU in front of an optional SQLite tier"""
+
+    def __init__(self, path=LLM_CACHE_PATH, memory_size=LLM_MEMORY_CACHE_SIZE, disk_size=LLM_DISK_CACHE_SIZE):
+        self.memory = TTLCache(memory_size)
+        self.disk = DiskCache(path, disk_size) if path else None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model, prompt):
+        return hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def get(self, model, prompt):
+        key = self.key(model, prompt)
+        response = self.memory.get(key)
+        if response is not None:
+            self.memory_hits += 1
+            return response
+        if self.disk is not None:
+            response = self.disk.get(key)
+            if response is not None:
+                self.disk_hits += 1
+                self.memory.set(key, response)
+                return response
+        self.misses += 1
+        return None
+
+    def set(self, model, prompt, response):
+        key = self.key(model, prompt)
+        self.memory.set(key, response)
+        if self.disk is not None:
+            self.disk.set(key, model, response)
+
+    def stats(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_size": len(self.memory),
+            "disk_size": len(self.disk) if self.disk is not None else 0
+        }
+
+
+class LLMClient:
+    """Cached text generation on top of a pluggable backend"""
+
+    def __init__(self, backend, cache=None, model=GEMINI_MODEL):
+        self.backend = backend
+        self.cache = cache
+        self.model = model
+
+    def generate(self, prompt):
+        if self.cache is not None:
+            response = self.cache.get(self.model, prompt)
+            if response is not None:
+                return response
+        response = self.backend.generate(self.model, prompt)
+        # errors raise before this point, so only real answers are cached
+        if self.cache is not None and response:
+            self.cache.set(self.model, prompt, response)
+        return response
+
+
+def create_backend(name=LLM_BACKEND):
+    if name == "stub":
+        return StubBackend()
+    if name == "gemini":
+        return GeminiBackend()
+    if name == "fake":
+        return FakeAdBackend()
+    raise ValueError(f"Unknown LLM backend '{name}' (expected 'gemini', 'stub' or 'fake')")
+
+
+_llm = None
+_llm_lock = threading.Lock()
+
+
+def get_llm():
+    """Shared LLMClient, backend chosen by LLM_BACKEND"""
+    global _llm
+    with _llm_lock:
+        if _llm is None:
+            _llm = LLMClient(create_backend(), ResponseCache())
+        return _llm
@@ -0,0 +1,195 @@
+import atexit
+import json
+import logging
+import sys
+import threading
+import time
+from config import LOG_LEVEL, LOG_FILE, LOG_QUIET
+
+ROOT_LOGGER = "tiktok_ads"
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, message plus the event's fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage().strip()
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info or record.exc_text:
+            entry["exception"] = record.exc_text or self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _ConsoleFilter(logging.Filter):
+    # events from quiet components still reach the log file, just not the terminal
+    def filter(self, record):
+        return getattr(record, "console", True)
+
+
+class EventLogger:
+    """Structured events for one component.
+
+    `message` is the human line the CLI shows; keyword fields travel as data to the
+    JSON sink. A quiet logger never writes to the console. Calls below the configured
+    level return before a record is built.
+    """
+
+    __slots__ = ("logger", "quiet")
+
+    def __init__(self, name, quiet=False):
+        self.logger = logging.getLogger(f"{ROOT_LOGGER}.{name}")
+        self.quiet = quiet
+
+    @property
+    def console(self):
+        """Whether events end up on the terminal (not quiet, and LOG_QUIET / configure() allow it)"""
+        return _console and not self.quiet
+
+    def enabled(self, level=logging.INFO):
+        """Whether an event at `level` would go anywhere (skip building long messages when not)"""
+        return self.logger.isEnabledFor(level) and (self.console or _sink is not None)
+
+    def log(self, level, message, **fields):
+        if self.enabled(level):
+            # makeRecord + handle rather than logger.log(): skips the stack walk for caller info
+            logger = self.logger
+            logger.handle(logger.makeRecord(logger.name, level, "", 0, message, (), None,
+                                            extra={"fields": fields, "console": self.console}))
+
+    def debug(self, message, **fields):
+        self.log(logging.DEBUG, message, **fields)
+
+    def info(self, message, **fields):
+        self.log(logging.INFO, message, **fields)
+
+    def warning(self, message, **fields):
+        self.log(logging.WARNING, message, **fields)
+
+    def error(self, message, **fields):
+        self.log(logging.ERROR, message, **fields)
+
+
+class JsonLinesSink(logging.Handler):
+    """Buffered background sink: emit() only enqueues, a thread formats and appends JSON lines.
+
+    Lines are written and flushed once per drained batch rather than once per event,
+    so busy workers never wait on the disk. Between batches the thread sleeps for
+    `interval` instead of waking (and taking the GIL) for every single event.
+    """
+
+    BATCH = 1024
+
+    def __init__(self, path, interval=0.05):
+        super().__init__()
+        self.interval = interval
+        import queue  # lazy: only needed with a file sink
+        self.setFormatter(JsonFormatter())
+        self._empty = queue.Empty
+        self._queue = queue.SimpleQueue()
+        self._file = open(path, "a", encoding="utf-8")
+        self._thread = threading.Thread(target=self._drain, name="log-sink", daemon=True)
+        self._thread.start()
+
+    def handle(self, record):
+        # SimpleQueue is thread-safe, skip the handler lock
+        if self.filter(record):
+            self.emit(record)
+        return True
+
+    def emit(self, record):
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        self._queue.put(record)
+
+    def _drain(self):
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            while len(batch) < self.BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except self._empty:
+                    break
+            if None in batch:  # close() was called
+                running = False
+                batch = batch[:batch.index(None)]
+            if batch:
+                self._file.write("".join(self.format(record) + "\n" for record in batch))
+                self._file.flush()
+            if running and len(batch) < self.BATCH:
+                time.sleep(self.interval)
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+            self._file.close()
+        super().close()
+
+
+_sink = None
+_console = False
+_configure_lock = threading.Lock()
+
+
+def configure(level=LOG_LEVEL, path=LOG_FILE, quiet=LOG_QUIET):
+    """(Re)build the handlers of the package logger.
+
+    The console gets plain messages synchronously, so they stay in order with the
+    CLI's own output (skipped when `quiet`). With `path`, every event is also
+    appended there as JSON lines by a background thread: callers only pay for a
+    queue put.
+    """
+    global _sink, _console
+    with _configure_lock:
+        root = logging.getLogger(ROOT_LOGGER)
+        root.propagate = False
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        if _sink is not None:
+            _sink.close()  # writes what is still queued
+            _sink = None
+
+        _console = not quiet
+        if _console:
+            console = logging.StreamHandler(sys.stdout)
+            console.setFormatter(logging.Formatter("%(message)s"))
+            console.addFilter(_ConsoleFilter())
+            root.addHandler(console)
+
+        if path:
+            _sink = JsonLinesSink(path)
+            root.addHandler(_sink)
+
+        # nowhere to write: raise the level so disabled calls stay a single isEnabledFor()
+        root.setLevel(level if root.handlers else logging.CRITICAL + 1)
+
+
+def shutdown():
+    """Flush and stop the background sink"""
+    global _sink
+    with _configure_lock:
+        if _sink is not None:
+            _sink.close()
+            _sink = None
+
+
+_loggers = {}
+
+
+def get_logger(name, quiet=False):
+    """Shared EventLogger for a component (one per name and quiet flag)"""
+    logger = _loggers.get((name, quiet))
+    if logger is None:
+        logger = _loggers.setdefault((name, quiet), EventLogger(name, quiet))
+    return logger
+
+
+configure()
+atexit.register(shutdown)
@@ -1,5 +1,6 @@
 import sys
 from agent import HybridTikTokAgent
+from metrics import get_metrics
 
 def main():
     print("\n" + "="*60)
@@ -58,6 +59,16 @@ def main():
         import json
         print(json.dumps(agent.get_payload(), indent=2))
         print("="*60 + "\n")
+    
+    # METRICS_ENABLED=1 / METRICS_PROFILE=1: show where the time went
+    metrics = get_metrics()
+    if metrics.enabled:
+        print("⏱️  LATENCY BREAKDOWN")
+        print("="*60)
+        print(metrics.summary())
+        print("="*60 + "\n")
+    if metrics.profiling:
+        print(metrics.stop_profiling())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,38 @@
+import sys
+import types
+
+# Objects shared by every session; their size isn't a per-session cost
+_SHARED_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType)
+
+
+def deep_sizeof(obj, exclude=(), _seen=None):
+    """Bytes reachable from obj (containers, __dict__, __slots__), not counting ids in `exclude`"""
+    seen = _seen if _seen is not None else set(exclude)
+    if id(obj) in seen or isinstance(obj, _SHARED_TYPES):
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, int, float, bool)) or obj is None:
+        return size
+    if isinstance(obj, types.MethodType):
+        # a bound method pins its instance; only the method object belongs to the caller
+        return size
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, _seen=seen) + deep_sizeof(v, _seen=seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, _seen=seen) for item in obj)
+
+    if hasattr(obj, "__dict__"):
+        size += deep_sizeof(vars(obj), _seen=seen)
+    for cls in type(obj).__mro__:
+        for slot in getattr(cls, "__slots__", ()):
+            if slot not in ("__dict__", "__weakref__") and hasattr(obj, slot):
+                size += deep_sizeof(getattr(obj, slot), _seen=seen)
+    return size
+
+
+def session_memory_bytes(agent):
+    """Memory owned by one conversation, excluding process-wide singletons (token manager, caches, LLM)"""
+    shared = [getattr(agent, name, None) for name in ("tokens", "music_cache", "scheduler", "_llm")]
+    return deep_sizeof(agent, exclude=[id(obj) for obj in shared if obj is not None])
@@ -0,0 +1,356 @@
+import functools
+import json
+import threading
+import time
+from bisect import bisect_left
+from config import METRICS_ENABLED, METRICS_PROFILE
+
+# Latency histogram bucket bounds in seconds (Prometheus `le` labels, +Inf is implied)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = key + tuple(extra)
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count", "min", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # per bucket, last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Estimated from the buckets, interpolating inside one (like Prometheus' histogram_quantile)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                # the observed min/max narrow the outer buckets (and make one sample exact)
+                lower = max(BUCKETS[i - 1] if i else 0.0, self.min)
+                upper = min(BUCKETS[i] if i < len(BUCKETS) else self.max, self.max)
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.max
+
+
+class Span:
+    """Times a block into the `<name>_seconds` histogram; failures go to `<name>_errors_total`"""
+
+    __slots__ = ("metrics", "name", "labels", "start", "error")
+
+    def __init__(self, metrics, name, labels):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+        self.error = None
+
+    def fail(self, error):
+        """Mark the span failed with an error code (an exception does this on its own)"""
+        self.error = error
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and self.error is None:
+            self.error = exc_type.__name__
+        self.metrics._finish(self.name, self.labels, time.perf_counter() - self.start, self.error)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def fail(self, error):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class Metrics:
+    """Process-wide latency histograms and counters.
+
+    While disabled, span() hands back a shared no-op and count() returns straight
+    away, so instrumented code pays one attribute check.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._histograms = {}  # (name, label key) -> _Histogram
+        self._counters = {}    # (name, label key) -> number
+        self._collectors = []  # callables returning [(name, labels, value)] gauges, read at export
+        self._profilers = None  # cProfile.Profile per thread while profiling is on
+        self._local = threading.local()
+
+    def span(self, name, **labels):
+        if not self.enabled:
+            return _NOOP
+        return Span(self, name, labels)
+
+    def count(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        """Record a duration measured elsewhere into `<name>_seconds`"""
+        if self.enabled:
+            self._finish(name, labels, seconds, None)
+
+    def _finish(self, name, labels, elapsed, error):
+        key = _label_key(labels)
+        with self._lock:
+            histogram = self._histograms.get((name, key))
+            if histogram is None:
+                histogram = self._histograms[(name, key)] = _Histogram()
+            histogram.observe(elapsed)
+            if error is not None:
+                error_key = (name + "_errors_total", key + (("error", str(error)),))
+                self._counters[error_key] = self._counters.get(error_key, 0) + 1
+
+    def add_collector(self, fn):
+        """Register fn() -> [(name, labels dict, value)]: gauges read whenever metrics are exported"""
+        self._collectors.append(fn)
+
+    def _gauges(self):
+        gauges = []
+        for collect in self._collectors:
+            gauges.extend((name, _label_key(labels), value) for name, labels, value in collect())
+        return sorted(gauges, key=lambda gauge: gauge[:2])
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self.started = time.time()
+
+    # -- export --------------------------------------------------------------
+
+    def snapshot(self):
+        """JSON-friendly view: per series count, sum, p50/p95/p99 and counter values"""
+        with self._lock:
+            histograms = {key: (h.count, h.sum, h.min, h.max, h.quantile(0.5), h.quantile(0.95), h.quantile(0.99))
+                          for key, h in self._histograms.items()}
+            counters = dict(self._counters)
+
+        body = {"enabled": self.enabled, "uptime": time.time() - self.started, "histograms": {}, "counters": {},
+                "gauges": {}}
+        for (name, key), (count, total, low, high, p50, p95, p99) in sorted(histograms.items()):
+            body["histograms"].setdefault(name + "_seconds", []).append({
+                "labels": dict(key), "count": count, "sum": total, "mean": total / count,
+                "min": low, "max": high, "p50": p50, "p95": p95, "p99": p99
+            })
+        for (name, key), value in sorted(counters.items()):
+            body["counters"].setdefault(name, []).append({"labels": dict(key), "value": value})
+        for name, key, value in self._gauges():
+            body["gauges"].setdefault(name, []).append({"labels": dict(key), "value": value})
+        return body
+
+    def summary(self):
+        """Plain-text latency table for the CLI"""
+        body = self.snapshot()
+        lines = [f"{'span':60s} {'count':>7s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s}"]
+        for name, series in body["histograms"].items():
+            for entry in series:
+                label = name + _format_labels(tuple(entry["labels"].items()))
+                lines.append(f"{label[:60]:60s} {entry['count']:7d} {entry['p50'] * 1000:9.1f} "
+                             f"{entry['p95'] * 1000:9.1f} {entry['p99'] * 1000:9.1f}")
+        for name, series in list(body["counters"].items()) + list(body["gauges"].items()):
+            for entry in series:
+                value = entry["value"]
+                value = f"{value:.3f}" if isinstance(value, float) else value
+                lines.append(f"{name + _format_labels(tuple(entry['labels'].items()))}: {value}")
+        return "\n".join(lines)
+
+    def to_json(self, indent=None):
+        return json.dumps(self.snapshot(), indent=indent)
+
+    def to_prometheus(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            histograms = {key: (list(h.counts), h.sum, h.count) for key, h in self._histograms.items()}
+            counters = dict(self._counters)
+
+        lines = []
+        declared = set()
+        for (name, key), (counts, total, count) in sorted(histograms.items()):
+            metric = name + "_seconds"
+            if metric not in declared:
+                declared.add(metric)
+                lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, n in zip(BUCKETS + ("+Inf",), counts):
+                cumulative += n
+                lines.append(f"{metric}_bucket{_format_labels(key, [('le', str(bound))])} {cumulative}")
+            lines.append(f"{metric}_sum{_format_labels(key)} {total}")
+            lines.append(f"{metric}_count{_format_labels(key)} {count}")
+        for (name, key), value in sorted(counters.items()):
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{_format_labels(key)} {value}")
+        for name, key, value in self._gauges():
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name}{_format_labels(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+    # -- profiling -----------------------------------------------------------
+
+    @property
+    def profiling(self):
+        return self._profilers is not None
+
+    def start_profiling(self):
+        """Turn on cProfile for every profiled() section from now on (entry points such as chat())"""
+        with self._lock:
+            if self._profilers is None:
+                self._profilers = []
+
+    def stop_profiling(self, sort="cumulative", limit=30):
+        """Turn profiling off, returns the merged pstats report ("" if nothing ran)"""
+        with self._lock:
+            profilers, self._profilers = self._profilers or [], None
+        if not profilers:
+            return ""
+        import io, pstats  # lazy, only needed for the report
+        out = io.StringIO()
+        stats = pstats.Stats(profilers[0], stream=out)
+        for profiler in profilers[1:]:
+            stats.add(profiler)
+        stats.sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    def profiled(self):
+        """Context manager: run the block under this thread's profiler while profiling is on"""
+        if self._profilers is None:
+            return _NOOP
+        return _Profiled(self)
+
+    def _thread_profiler(self):
+        local = self._local
+        profilers = self._profilers
+        if getattr(local, "owner", None) is not profilers:
+            # first section on this thread since start_profiling()
+            import cProfile
+            local.owner, local.profiler, local.depth = profilers, cProfile.Profile(), 0
+            with self._lock:
+                if profilers is not None:
+                    profilers.append(local.profiler)
+        return local
+
+
+class _Profiled:
+    __slots__ = ("metrics", "local")
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    def __enter__(self):
+        # one profiler per thread (cProfile only sees the thread that enabled it), nested and
+        # interleaved sections (several achat() tasks on one loop) share it
+        self.local = self.metrics._thread_profiler()
+        if self.local.depth == 0:
+            self.local.profiler.enable()
+        self.local.depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.local.depth -= 1
+        if self.local.depth == 0:
+            self.local.profiler.disable()
+        return False
+
+
+def _record_result(span, result):
+    # API results are dicts: a failed call carries its error code, a batch its per-item errors
+    if isinstance(result, dict):
+        if result.get("success") is False:
+            span.fail(result.get("error") or "unknown")
+        elif "results" in result and span is not _NOOP:
+            for item in result["results"]:
+                if not item.get("success", True):
+                    span.metrics.count(span.name + "_item_errors_total", error=item.get("error") or "unknown", **span.labels)
+
+
+def traced(name, **labels):
+    """Decorator: time every call of a function as span(name, **labels)"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _metrics.enabled:
+                return fn(*args, **kwargs)
+            with _metrics.span(name, **labels) as span:
+                result = fn(*args, **kwargs)
+                _record_result(span, result)
+                return result
+        return wrapper
+    return decorate
+
+
+def atraced(name, **labels):
+    """traced() for coroutine functions"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            if not _metrics.enabled:
+                return await fn(*args, **kwargs)
+            with _metrics.span(name, **labels) as span:
+                result = await fn(*args, **kwargs)
+                _record_result(span, result)
+                return result
+        return wrapper
+    return decorate
+
+
+# Created at import (it is only a few dicts) so decorators and hot paths can use it directly
+_metrics = Metrics(enabled=METRICS_ENABLED)
+if METRICS_PROFILE:
+    _metrics.start_profiling()
+
+
+def get_metrics():
+    """Shared Metrics for the whole process"""
+    return _metrics
+
+
+# Module-level shortcuts to the shared instance (bound methods: no extra call on the hot path)
+span = _metrics.span
+count = _metrics.count
+profiled = _metrics.profiled
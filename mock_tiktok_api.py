@@ -1,18 +1,138 @@
+import functools
+import hashlib
 import random
+import threading
 import time
-from config import VALID_MUSIC_IDS
+from config import (TIKTOK_API_BACKEND, IDEMPOTENCY_RETENTION, IDEMPOTENCY_SERVER_SIZE,
+                    UPLOAD_SESSION_TTL, UPLOADED_MUSIC_LIMIT)
+from cache import TTLCache
+from log import get_logger
+from metrics import traced, atraced
+from resilience import guarded, aguarded
+from catalog import get_catalog
+from upload import ChunkedUploader, source_name
 
-class MockTikTokAPI:
+# Simulated round-trip time per endpoint (seconds)
+LATENCY = {
+    "oauth_authorize": 1,
+    "validate_music_id": 0.5,
+    "search_music": 0.3,
+    "upload_init": 0.3,
+    "upload_chunk": 0.2,
+    "upload_complete": 0.5,
+    "submit_ad": 1,
+    "submit_ads": 1.5
+}
+
+MAX_BATCH_SIZE = 50  # payloads per submit_ads call
+
+# Chunked music uploads
+MAX_UPLOAD_SIZE = 50 * 1024 * 1024
+MAX_CHUNK_SIZE = 8 * 1024 * 1024
+CHUNK_FAILURE_RATE = 0.02  # share of chunks dropped in transit; the client retries or resumes
+
+# Share of submit_ad calls that fail at random, and what they fail with
+FAILURE_RATE = 0.1
+SUBMIT_ERRORS = {
+    "rate_limit": "Rate limit exceeded. Please try again in 60 seconds.",
+    "geo_restriction": "Ad creation is restricted in your geographic region (403 Forbidden).",
+    "insufficient_permissions": "Your app doesn't have 'Ads Management' permission. Please update scopes in TikTok Developer portal."
+}
+
+def _chunk_count(session):
+    return -(-session["size"] // session["chunk_size"])
+
+
+_LOG = get_logger("api")
+_QUIET_LOG = get_logger("api", quiet=True)
+
+
+def with_token(fn):
+    """Decorator: pick up the current token before the guarded call (see resilience.py).
+
+    A cold or expired token waits on OAuth; waiting while holding a limiter slot
+    would keep the slot from everyone else, the token refresh included. So every
+    call, music validation and upload steps too, starts only once OAuth is done.
+    """
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        self._resolve_token()
+        token = self.access_token
+        result = fn(self, *args, **kwargs)
+        token_rejected(self, token, result)
+        return result
+    return wrapper
+
+
+def awith_token(fn):
+    """with_token() for coroutine methods"""
+    @functools.wraps(fn)
+    async def wrapper(self, *args, **kwargs):
+        await self._aresolve_token()
+        token = self.access_token
+        result = await fn(self, *args, **kwargs)
+        token_rejected(self, token, result)
+        return result
+    return wrapper
+
+
+def token_rejected(api, token, result):
+    """Tell on_unauthorized (e.g. TokenManager.invalidate) when the API refused `token`,
+    so the next call re-authorizes instead of reusing it until the refresh timer fires"""
+    if token and api.on_unauthorized is not None and result.get("error") == "unauthorized":
+        api.on_unauthorized(token)
+
+
+class _MockTikTokCore:
+    """Endpoint behaviour shared by the sync and async clients (no I/O, no sleeping)"""
     
-    def __init__(self):
+    # every session holds a client, keep them small
+    __slots__ = ("access_token", "token_valid", "token_provider", "on_unauthorized", "log")
+    
+    # source of randomness for IDs and failures (the simulator swaps in a seeded Random)
+    rng = random
+    
+    # "Server-side" record of successful submissions per idempotency key, shared by all clients,
+    # and the keys being created right now (key -> threading.Event set when that attempt is over).
+    # A key is replayed for IDEMPOTENCY_RETENTION seconds, or until IDEMPOTENCY_SERVER_SIZE newer
+    # keys push it out; a repeat after that creates a new campaign
+    _idempotent_results = TTLCache(IDEMPOTENCY_SERVER_SIZE)
+    _idempotent_pending = {}
+    _idempotency_lock = threading.Lock()
+    
+    # "Server-side" upload state: sessions in progress (dropped UPLOAD_SESSION_TTL seconds after
+    # the last upload_init) and the last UPLOADED_MUSIC_LIMIT finished tracks by content hash
+    _uploads = TTLCache(UPLOADED_MUSIC_LIMIT)  # upload_id -> {"sha256", "size", "chunk_size", "file_name", "chunks": {index: sha256}}
+    _uploads_by_hash = TTLCache(UPLOADED_MUSIC_LIMIT)  # sha256 -> upload_id still in progress
+    _music_by_hash = TTLCache(UPLOADED_MUSIC_LIMIT)  # sha256 -> music_id
+    _uploaded_music = TTLCache(UPLOADED_MUSIC_LIMIT)  # music_id -> file name ("" if unknown)
+    _upload_lock = threading.Lock()
+    
+    def __init__(self, quiet=False):
         self.access_token = None
         self.token_valid = False
+        # optional callable returning the current token (e.g. TokenManager.get_token,
+        # or TokenManager.aget_token for the async client)
+        self.token_provider = None
+        # optional callable given a token the API answered `unauthorized` to (e.g. TokenManager.invalidate)
+        self.on_unauthorized = None
+        # quiet clients (bulk, server) keep the call log out of the terminal
+        self.log = _QUIET_LOG if quiet else _LOG
     
-    def oauth_authorize(self, client_id, client_secret):
-        """OAuth flow"""
-        print("\n🔐 Simulating OAuth Authorization...")
-        time.sleep(1)
-        
+    def set_access_token(self, access_token):
+        """Reuse a token obtained elsewhere (e.g. by another client instance)"""
+        self.access_token = access_token
+        self.token_valid = bool(access_token)
+    
+    def _resolve_token(self):
+        """Take the current token from token_provider, done once per call before any I/O (see with_token)"""
+        if self.token_provider is not None:
+            self.set_access_token(self.token_provider())
+    
+    def _authorized(self):
+        return self.token_valid
+    
+    def _oauth_authorize(self, client_id, client_secret):
         # Invalid
         if client_id == "invalid":
             return {
@@ -29,7 +149,7 @@ class MockTikTokAPI:
             }
         
         # Successful
-        self.access_token = f"mock_token_{random.randint(1000, 9999)}"
+        self.access_token = f"mock_token_{self.rng.randint(1000, 9999)}"
         self.token_valid = True
         
         return {
@@ -39,46 +159,216 @@ class MockTikTokAPI:
             "expires_in": 3600
         }
     
-    def validate_music_id(self, music_id):
-        """Check if music ID exists"""
-        print(f"\n🎵 Validating Music ID: {music_id}")
-        time.sleep(0.5)
-        
-        if not self.token_valid:
+    def _validate_music_id(self, music_id):
+        if not self._authorized():
             return {
                 "success": False,
                 "error": "unauthorized",
                 "message": "Access token is invalid or expired. Please re-authenticate."
             }
         
-        if music_id in VALID_MUSIC_IDS:
+        track = get_catalog().get(music_id)
+        file_name = self._uploaded_music.get(music_id)
+        if track:
+            return dict(track, success=True)
+        elif file_name is not None:
             return {
                 "success": True,
                 "music_id": music_id,
-                "title": f"Sample Track {music_id.split('_')[1]}",
+                "title": file_name or f"Custom Track {music_id.split('_')[1]}",
                 "duration": 30
             }
         else:
             return {
                 "success": False,
                 "error": "music_not_found",
-                "message": f"Music ID '{music_id}' not found in TikTok library. It may have been removed or is unavailable in your region."
+                "message": f"Music ID '{music_id}' not found in TikTok library. It may have been removed or is unavailable in your region.",
+                "suggestions": get_catalog().suggest(music_id)
+            }
+    
+    def _search_music(self, query, limit=10):
+        if not self._authorized():
+            return {
+                "success": False,
+                "error": "unauthorized",
+                "message": "Access token is invalid or expired. Please re-authenticate."
+            }
+        
+        return {
+            "success": True,
+            "results": get_catalog().search(query, limit)
+        }
+    
+    def _upload_init(self, sha256, size, chunk_size, file_name=None):
+        if not self._authorized():
+            return {
+                "success": False,
+                "error": "unauthorized",
+                "message": "Access token is invalid or expired."
+            }
+        
+        if not size:
+            return {
+                "success": False,
+                "error": "empty_file",
+                "message": "The music file is empty."
+            }
+        
+        if size > MAX_UPLOAD_SIZE:
+            return {
+                "success": False,
+                "error": "file_too_large",
+                "message": f"Music files may be at most {MAX_UPLOAD_SIZE // (1024 * 1024)} MB."
+            }
+        
+        if not 0 < chunk_size <= MAX_CHUNK_SIZE:
+            return {
+                "success": False,
+                "error": "invalid_chunk_size",
+                "message": f"Chunk size must be between 1 byte and {MAX_CHUNK_SIZE} bytes."
+            }
+        
+        with self._upload_lock:
+            # Same track uploaded before: no transfer needed
+            music_id = self._music_by_hash.get(sha256)
+            if music_id and self._uploaded_music.get(music_id) is not None:
+                return {
+                    "success": True,
+                    "music_id": music_id,
+                    "deduplicated": True,
+                    "message": "Identical track already uploaded"
+                }
+            
+            # Same track half uploaded: resume that session
+            upload_id = self._uploads_by_hash.get(sha256)
+            session = self._uploads.get(upload_id)
+            if session is None or session["size"] != size:
+                upload_id = f"upload_{self.rng.randint(10000000, 99999999)}"
+                session = {"sha256": sha256, "size": size, "chunk_size": chunk_size,
+                           "file_name": file_name, "chunks": {}}
+            # (re)starting an upload keeps it resumable for another UPLOAD_SESSION_TTL
+            self._uploads.set(upload_id, session, UPLOAD_SESSION_TTL)
+            self._uploads_by_hash.set(sha256, upload_id, UPLOAD_SESSION_TTL)
+            
+            return {
+                "success": True,
+                "upload_id": upload_id,
+                "chunk_size": session["chunk_size"],
+                "chunk_count": _chunk_count(session),
+                "received": sorted(session["chunks"])
+            }
+    
+    def _upload_chunk(self, upload_id, index, data, chunk_sha256=None):
+        if not self._authorized():
+            return {
+                "success": False,
+                "error": "unauthorized",
+                "message": "Access token is invalid or expired."
+            }
+        
+        session = self._uploads.get(upload_id)
+        if session is None:
+            return {
+                "success": False,
+                "error": "upload_not_found",
+                "message": f"Upload '{upload_id}' does not exist or has already completed."
+            }
+        
+        expected = min(session["chunk_size"], session["size"] - index * session["chunk_size"])
+        if not 0 <= index < _chunk_count(session) or len(data) != expected:
+            return {
+                "success": False,
+                "error": "invalid_chunk",
+                "message": f"Chunk {index} should be {max(expected, 0)} bytes, got {len(data)}."
+            }
+        
+        # dropped connections
+        if self.rng.random() < CHUNK_FAILURE_RATE:
+            return {
+                "success": False,
+                "error": "chunk_upload_failed",
+                "message": f"Connection reset while receiving chunk {index}. Please retry it."
+            }
+        
+        digest = hashlib.sha256(data).hexdigest()
+        if chunk_sha256 and digest != chunk_sha256:
+            return {
+                "success": False,
+                "error": "chunk_checksum_mismatch",
+                "message": f"Chunk {index} was corrupted in transit. Please retry it."
             }
+        
+        with self._upload_lock:
+            session["chunks"][index] = digest
+            received = len(session["chunks"])
+        
+        return {
+            "success": True,
+            "upload_id": upload_id,
+            "index": index,
+            "received": received
+        }
     
-    def upload_music(self, file_path):
-        """Music upload"""
-        print(f"\n⬆️  Uploading custom music: {file_path}")
-        time.sleep(1)
+    def _upload_status(self, upload_id):
+        if not self._authorized():
+            return {
+                "success": False,
+                "error": "unauthorized",
+                "message": "Access token is invalid or expired."
+            }
+        
+        session = self._uploads.get(upload_id)
+        if session is None:
+            return {
+                "success": False,
+                "error": "upload_not_found",
+                "message": f"Upload '{upload_id}' does not exist or has already completed."
+            }
         
-        if not self.token_valid:
+        with self._upload_lock:
+            return {
+                "success": True,
+                "upload_id": upload_id,
+                "chunk_size": session["chunk_size"],
+                "chunk_count": _chunk_count(session),
+                "received": sorted(session["chunks"])
+            }
+    
+    def _upload_complete(self, upload_id):
+        if not self._authorized():
             return {
                 "success": False,
                 "error": "unauthorized",
                 "message": "Access token is invalid or expired."
             }
         
-        #Upload success
-        new_music_id = f"music_{random.randint(20000, 99999)}"
+        with self._upload_lock:
+            session = self._uploads.get(upload_id)
+            if session is None:
+                return {
+                    "success": False,
+                    "error": "upload_not_found",
+                    "message": f"Upload '{upload_id}' does not exist or has already completed."
+                }
+            
+            missing = [i for i in range(_chunk_count(session)) if i not in session["chunks"]]
+            if missing:
+                return {
+                    "success": False,
+                    "error": "upload_incomplete",
+                    "message": f"{len(missing)} chunk(s) still missing.",
+                    "missing": missing
+                }
+            
+            #Upload success
+            new_music_id = f"music_{self.rng.randint(20000, 99999)}"
+            while self._music_exists(new_music_id):
+                new_music_id = f"music_{self.rng.randint(20000, 99999)}"
+            
+            self._uploaded_music.set(new_music_id, session["file_name"] or "")
+            self._music_by_hash.set(session["sha256"], new_music_id)
+            self._uploads.pop(upload_id)
+            self._uploads_by_hash.pop(session["sha256"], None)
         
         return {
             "success": True,
@@ -86,12 +376,62 @@ class MockTikTokAPI:
             "message": "Music uploaded successfully"
         }
     
-    def submit_ad(self, ad_payload):
+    def _music_exists(self, music_id):
+        return music_id in get_catalog() or self._uploaded_music.get(music_id) is not None
+    
+    def _submit_ad(self, ad_payload, idempotency_key=None):
+        if idempotency_key is None:
+            return self._create_ad(ad_payload)
+        
+        # Repeats of a key that already succeeded get the original campaign back. The lock only
+        # covers the lookup and the publish: a repeat arriving while the key is being created
+        # waits for that attempt alone, submissions with other keys never wait
+        while True:
+            with self._idempotency_lock:
+                previous = self._idempotent_results.get(idempotency_key)
+                if previous is not None:
+                    return dict(previous, idempotent_replay=True)
+                pending = self._idempotent_pending.get(idempotency_key)
+                if pending is None:
+                    reserved = self._idempotent_pending[idempotency_key] = threading.Event()
+                    break
+            pending.wait()  # if that attempt failed, this one gets to try
+        
+        result = None
+        try:
+            result = self._create_ad(ad_payload)
+            return result
+        finally:
+            with self._idempotency_lock:
+                if result is not None and result["success"]:
+                    self._idempotent_results.set(idempotency_key, dict(result), IDEMPOTENCY_RETENTION)
+                del self._idempotent_pending[idempotency_key]
+            reserved.set()
+    
+    def _submit_ads(self, ad_payloads, idempotency_keys=None):
+        if not self._authorized():
+            return {
+                "success": False,
+                "error": "unauthorized",
+                "message": "Access token is invalid or expired. Please re-authenticate."
+            }
         
-        print("\n📤 Submitting ad to TikTok Ads API...")
-        time.sleep(1)
+        if len(ad_payloads) > MAX_BATCH_SIZE:
+            return {
+                "success": False,
+                "error": "batch_too_large",
+                "message": f"A batch may contain at most {MAX_BATCH_SIZE} ads (got {len(ad_payloads)})."
+            }
         
-        if not self.token_valid:
+        # Each item is checked (and may fail) on its own
+        keys = idempotency_keys or [None] * len(ad_payloads)
+        return {
+            "success": True,
+            "results": [self._submit_ad(payload, key) for payload, key in zip(ad_payloads, keys)]
+        }
+    
+    def _create_ad(self, ad_payload):
+        if not self._authorized():
             return {
                 "success": False,
                 "error": "unauthorized",
@@ -110,7 +450,7 @@ class MockTikTokAPI:
             }
         
         # Check music ID if provided
-        if music_id and music_id not in VALID_MUSIC_IDS:
+        if music_id and not self._music_exists(music_id):
             return {
                 "success": False,
                 "error": "invalid_music_id",
@@ -118,31 +458,17 @@ class MockTikTokAPI:
             }
         
         # random API failures
-        if random.random() < 0.1:
-            errors = [
-                {
-                    "error": "rate_limit",
-                    "message": "Rate limit exceeded. Please try again in 60 seconds."
-                },
-                {
-                    "error": "geo_restriction",
-                    "message": "Ad creation is restricted in your geographic region (403 Forbidden)."
-                },
-                {
-                    "error": "insufficient_permissions",
-                    "message": "Your app doesn't have 'Ads Management' permission. Please update scopes in TikTok Developer portal."
-                }
-            ]
-            error = random.choice(errors)
+        error = self._random_failure()
+        if error:
             return {
                 "success": False,
-                "error": error["error"],
-                "message": error["message"]
+                "error": error,
+                "message": SUBMIT_ERRORS[error]
             }
         
         # Success!
-        ad_id = f"ad_{random.randint(100000, 999999)}"
-        campaign_id = f"campaign_{random.randint(100000, 999999)}"
+        ad_id = f"ad_{self.rng.randint(100000, 999999)}"
+        campaign_id = f"campaign_{self.rng.randint(100000, 999999)}"
         
         return {
             "success": True,
@@ -150,4 +476,221 @@ class MockTikTokAPI:
             "campaign_id": campaign_id,
             "message": "Ad campaign created successfully!",
             "status": "ACTIVE"
-        }
\ No newline at end of file
+        }
+    
+    def _random_failure(self):
+        """Error type for this call, or None"""
+        if self.rng.random() < FAILURE_RATE:
+            return self.rng.choice(list(SUBMIT_ERRORS))
+        return None
+
+
+class MockTikTokAPI(_MockTikTokCore):
+    """Blocking client, used by the CLI and Streamlit UI"""
+    
+    __slots__ = ()
+    
+    @traced("tiktok_api", endpoint="oauth_authorize")
+    @guarded("oauth_authorize")
+    def oauth_authorize(self, client_id, client_secret):
+        """OAuth flow"""
+        self.log.info("\n🔐 Simulating OAuth Authorization...", endpoint="oauth_authorize")
+        time.sleep(LATENCY["oauth_authorize"])
+        return self._oauth_authorize(client_id, client_secret)
+    
+    @traced("tiktok_api", endpoint="validate_music_id")
+    @with_token
+    @guarded("validate_music_id")
+    def validate_music_id(self, music_id):
+        """Check if music ID exists"""
+        self.log.info(f"\n🎵 Validating Music ID: {music_id}", endpoint="validate_music_id", music_id=music_id)
+        time.sleep(LATENCY["validate_music_id"])
+        return self._validate_music_id(music_id)
+    
+    @traced("tiktok_api", endpoint="search_music")
+    @with_token
+    @guarded("search_music")
+    def search_music(self, query, limit=10):
+        """Find tracks by title prefix, tolerating typos"""
+        time.sleep(LATENCY["search_music"])
+        return self._search_music(query, limit)
+    
+    @traced("tiktok_api", endpoint="upload_music")
+    def upload_music(self, source):
+        """Music upload: a file path, bytes or file object, sent in resumable chunks (see upload.py)"""
+        self.log.info(f"\n⬆️  Uploading custom music: {source_name(source)}", endpoint="upload_music",
+                      file=source_name(source))
+        return ChunkedUploader(self).upload(source)
+    
+    @traced("tiktok_api", endpoint="upload_init")
+    @with_token
+    @guarded("upload_init")
+    def upload_init(self, sha256, size, chunk_size, file_name=None):
+        time.sleep(LATENCY["upload_init"])
+        return self._upload_init(sha256, size, chunk_size, file_name)
+    
+    @traced("tiktok_api", endpoint="upload_chunk")
+    @with_token
+    @guarded("upload_chunk")
+    def upload_chunk(self, upload_id, index, data, chunk_sha256=None):
+        time.sleep(LATENCY["upload_chunk"])
+        return self._upload_chunk(upload_id, index, data, chunk_sha256)
+    
+    @traced("tiktok_api", endpoint="upload_status")
+    @with_token
+    @guarded("upload_status")
+    def upload_status(self, upload_id):
+        time.sleep(LATENCY["upload_init"])
+        return self._upload_status(upload_id)
+    
+    @traced("tiktok_api", endpoint="upload_complete")
+    @with_token
+    @guarded("upload_complete")
+    def upload_complete(self, upload_id):
+        time.sleep(LATENCY["upload_complete"])
+        return self._upload_complete(upload_id)
+    
+    @traced("tiktok_api", endpoint="submit_ad")
+    @with_token
+    @guarded("submit_ad")
+    def submit_ad(self, ad_payload, idempotency_key=None):
+        """Create the ad campaign"""
+        self.log.info("\n📤 Submitting ad to TikTok Ads API...", endpoint="submit_ad", idempotency_key=idempotency_key)
+        time.sleep(LATENCY["submit_ad"])
+        return self._submit_ad(ad_payload, idempotency_key)
+    
+    @traced("tiktok_api", endpoint="submit_ads")
+    @with_token
+    @guarded("submit_ads")
+    def submit_ads(self, ad_payloads, idempotency_keys=None):
+        """Create up to MAX_BATCH_SIZE ad campaigns in one round trip, one result per payload"""
+        self.log.info(f"\n📤 Submitting {len(ad_payloads)} ads to TikTok Ads API...", endpoint="submit_ads",
+                      count=len(ad_payloads))
+        time.sleep(LATENCY["submit_ads"])
+        return self._submit_ads(ad_payloads, idempotency_keys)
+
+
+class AsyncMockTikTokAPI(_MockTikTokCore):
+    """asyncio client, one event loop can keep many calls in flight"""
+    
+    __slots__ = ()
+    
+    # asyncio is imported inside the coroutines: by the time they run an event loop
+    # has already loaded it, and importing it up front adds ~50ms to CLI startup
+    
+    async def _aresolve_token(self):
+        """_resolve_token() without blocking the loop: token_provider may return an awaitable
+        (e.g. TokenManager.aget_token), which is awaited before the simulated I/O"""
+        if self.token_provider is not None:
+            token = self.token_provider()
+            if hasattr(token, "__await__"):
+                token = await token
+            self.set_access_token(token)
+    
+    @atraced("tiktok_api", endpoint="oauth_authorize")
+    @aguarded("oauth_authorize")
+    async def oauth_authorize(self, client_id, client_secret):
+        """OAuth flow"""
+        self.log.info("\n🔐 Simulating OAuth Authorization...", endpoint="oauth_authorize")
+        import asyncio
+        await asyncio.sleep(LATENCY["oauth_authorize"])
+        return self._oauth_authorize(client_id, client_secret)
+    
+    @atraced("tiktok_api", endpoint="validate_music_id")
+    @awith_token
+    @aguarded("validate_music_id")
+    async def validate_music_id(self, music_id):
+        """Check if music ID exists"""
+        self.log.info(f"\n🎵 Validating Music ID: {music_id}", endpoint="validate_music_id", music_id=music_id)
+        import asyncio
+        await asyncio.sleep(LATENCY["validate_music_id"])
+        return self._validate_music_id(music_id)
+    
+    @atraced("tiktok_api", endpoint="search_music")
+    @awith_token
+    @aguarded("search_music")
+    async def search_music(self, query, limit=10):
+        """Find tracks by title prefix, tolerating typos"""
+        import asyncio
+        await asyncio.sleep(LATENCY["search_music"])
+        return self._search_music(query, limit)
+    
+    @atraced("tiktok_api", endpoint="upload_music")
+    async def upload_music(self, source):
+        """Music upload: a file path, bytes or file object, sent in resumable chunks (see upload.py)"""
+        self.log.info(f"\n⬆️  Uploading custom music: {source_name(source)}", endpoint="upload_music",
+                      file=source_name(source))
+        return await ChunkedUploader(self).aupload(source)
+    
+    @atraced("tiktok_api", endpoint="upload_init")
+    @awith_token
+    @aguarded("upload_init")
+    async def upload_init(self, sha256, size, chunk_size, file_name=None):
+        import asyncio
+        await asyncio.sleep(LATENCY["upload_init"])
+        return self._upload_init(sha256, size, chunk_size, file_name)
+    
+    @atraced("tiktok_api", endpoint="upload_chunk")
+    @awith_token
+    @aguarded("upload_chunk")
+    async def upload_chunk(self, upload_id, index, data, chunk_sha256=None):
+        import asyncio
+        await asyncio.sleep(LATENCY["upload_chunk"])
+        return self._upload_chunk(upload_id, index, data, chunk_sha256)
+    
+    @atraced("tiktok_api", endpoint="upload_status")
+    @awith_token
+    @aguarded("upload_status")
+    async def upload_status(self, upload_id):
+        import asyncio
+        await asyncio.sleep(LATENCY["upload_init"])
+        return self._upload_status(upload_id)
+    
+    @atraced("tiktok_api", endpoint="upload_complete")
+    @awith_token
+    @aguarded("upload_complete")
+    async def upload_complete(self, upload_id):
+        import asyncio
+        await asyncio.sleep(LATENCY["upload_complete"])
+        return self._upload_complete(upload_id)
+    
+    @atraced("tiktok_api", endpoint="submit_ad")
+    @awith_token
+    @aguarded("submit_ad")
+    async def submit_ad(self, ad_payload, idempotency_key=None):
+        """Create the ad campaign"""
+        self.log.info("\n📤 Submitting ad to TikTok Ads API...", endpoint="submit_ad", idempotency_key=idempotency_key)
+        import asyncio
+        await asyncio.sleep(LATENCY["submit_ad"])
+        return self._submit_ad(ad_payload, idempotency_key)
+    
+    @atraced("tiktok_api", endpoint="submit_ads")
+    @awith_token
+    @aguarded("submit_ads")
+    async def submit_ads(self, ad_payloads, idempotency_keys=None):
+        """Create up to MAX_BATCH_SIZE ad campaigns in one round trip, one result per payload"""
+        import asyncio
+        self.log.info(f"\n📤 Submitting {len(ad_payloads)} ads to TikTok Ads API...", endpoint="submit_ads",
+                      count=len(ad_payloads))
+        await asyncio.sleep(LATENCY["submit_ads"])
+        return self._submit_ads(ad_payloads, idempotency_keys)
+
+
+def create_api(backend=TIKTOK_API_BACKEND, quiet=False):
+    """Blocking client for the configured backend: "mock" (in-process) or "http" (see http_api.py)"""
+    if backend == "http":
+        from http_api import get_shared_client
+        return get_shared_client()  # logs nothing itself
+    if backend == "mock":
+        return MockTikTokAPI(quiet=quiet)
+    raise ValueError(f"Unknown TikTok API backend '{backend}' (expected 'mock' or 'http')")
+
+
+def create_async_api(backend=TIKTOK_API_BACKEND, quiet=False):
+    """asyncio counterpart of create_api()"""
+    if backend == "http":
+        from http_api import AsyncHttpTikTokAPI
+        return AsyncHttpTikTokAPI()
+    if backend == "mock":
+        return AsyncMockTikTokAPI(quiet=quiet)
+    raise ValueError(f"Unknown TikTok API backend '{backend}' (expected 'mock' or 'http')")
@@ -0,0 +1,379 @@
+import functools
+import threading
+import time
+from collections import deque
+from config import (API_GUARD_ENABLED, API_CONCURRENCY_INITIAL, API_CONCURRENCY_MIN, API_CONCURRENCY_MAX,
+                    API_LATENCY_TOLERANCE, API_MAX_ERROR_RATE, API_OVERLOAD_THRESHOLD, API_BREAKER_THRESHOLDS,
+                    API_BREAKER_COOLDOWN)
+from log import get_logger
+from metrics import get_metrics, count
+
+OVERLOAD_ERROR = "rate_limit"
+ERROR_ALPHA = 0.05      # smoothing of the error / overload rates (about the last 20 calls)
+BASELINE_ALPHA = 0.01   # long-run latency of each endpoint (about the last 100 calls)
+RECENT_ALPHA = 0.1      # its recent latency: compared to the baseline, so one slow call is not congestion
+SPIKE_CLIP = 3.0        # samples count as at most this x the baseline in the recent latency
+SLOW_BACKOFF = 0.9      # gentle cut when latency degrades, rate_limit cuts by `backoff`
+LATENCY_SLACK = 0.05    # seconds: jitter below this never counts as slow (matters for near-zero latencies)
+
+# Endpoints that only pass the breakers, never the limiter: any other call may be waiting
+# for the OAuth token, so a token refresh queued for a slot behind them would never get one
+UNLIMITED_ENDPOINTS = frozenset({"oauth_authorize"})
+
+_LOG = get_logger("resilience")
+
+
+class AdaptiveLimiter:
+    """AIMD limit on concurrent calls to one service.
+
+    Starts in slow start (+1 per call that found the limit full), then grows by 1
+    per limit's worth of calls while each endpoint's recent latency stays near its
+    long-run baseline and the error rate stays under `max_error_rate`. A burst of
+    rate_limit answers cuts the limit by `backoff`, rising latency by 10%, at most
+    once per round trip.
+    Blocking and asyncio callers share the same slots.
+    """
+
+    def __init__(self, initial=API_CONCURRENCY_INITIAL, minimum=API_CONCURRENCY_MIN, maximum=API_CONCURRENCY_MAX,
+                 backoff=0.5, latency_tolerance=API_LATENCY_TOLERANCE, max_error_rate=API_MAX_ERROR_RATE,
+                 overload_threshold=API_OVERLOAD_THRESHOLD, clock=time.monotonic):
+        self.limit = float(max(minimum, min(maximum, initial)))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.max_error_rate = max_error_rate
+        self.overload_threshold = overload_threshold
+        self.clock = clock
+        self.in_flight = 0
+        self.slow_start = True
+        self.error_rate = 0.0     # share of calls answered with a breaker-class error
+        self.overload_rate = 0.0  # share of calls answered with rate_limit
+        self.decreases = 0
+        self._latency = {}  # endpoint -> [baseline, recent] smoothed latency of answered calls
+        self._last_decrease = float("-inf")
+        self._cond = threading.Condition()
+        self._async_waiters = deque()  # (loop, future), first come first served
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    async def aacquire(self):
+        import asyncio  # lazy, see AsyncMockTikTokAPI
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            await waiter
+
+    def release(self, endpoint, latency, errors=0.0, overloaded=0.0):
+        """Give the slot back with what the call saw: `errors` / `overloaded` are shares (0..1) of its items"""
+        with self._cond:
+            saturated = self.in_flight >= int(self.limit)
+            self.in_flight -= 1
+            self.error_rate += ERROR_ALPHA * (errors - self.error_rate)
+            self.overload_rate += ERROR_ALPHA * (overloaded - self.overload_rate)
+
+            stats = self._latency.get(endpoint)
+            if stats is None:
+                stats = self._latency[endpoint] = [latency, latency]
+            elif not overloaded:  # a rejection's latency says nothing about the service time
+                stats[0] += BASELINE_ALPHA * (latency - stats[0])
+                # a lone spike (GC pause, cold cache) may move the recent average only so far
+                stats[1] += RECENT_ALPHA * (min(latency, SPIKE_CLIP * stats[0]) - stats[1])
+            baseline, recent = stats
+            if overloaded and self.overload_rate >= self.overload_threshold:
+                self._decrease(self.backoff, "rate_limit", baseline)
+            elif recent > max(baseline * self.latency_tolerance, baseline + LATENCY_SLACK):
+                self._decrease(SLOW_BACKOFF, "latency", baseline)
+            elif saturated and not overloaded and self.error_rate <= self.max_error_rate:
+                self.limit = min(self.maximum, self.limit + (1.0 if self.slow_start else 1.0 / self.limit))
+
+            free = int(self.limit) - self.in_flight
+            waiters = []
+            if free > 0:
+                self._cond.notify(free)
+                while len(waiters) < free and self._async_waiters:
+                    loop, waiter = self._async_waiters.popleft()
+                    if not waiter.done():  # skip callers that were cancelled while waiting
+                        waiters.append((loop, waiter))
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(_wake, waiter)
+
+    def _decrease(self, factor, reason, round_trip):
+        # one cut per round trip: the calls already in flight were sent under the old limit
+        now = self.clock()
+        if now - self._last_decrease < round_trip:
+            return
+        self._last_decrease = now
+        self.limit = max(self.minimum, self.limit * factor)
+        self.slow_start = False
+        self.decreases += 1
+        count("api_concurrency_decreases_total", reason=reason)
+
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures of one kind and fails fast for `cooldown` seconds.
+
+    After the cooldown one probe call is let through (half-open): success closes the
+    breaker, another failure opens it again.
+    """
+
+    CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+    def __init__(self, endpoint, error, threshold, cooldown=API_BREAKER_COOLDOWN, clock=time.monotonic):
+        self.endpoint = endpoint
+        self.error = error
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened = 0
+        self.last_message = None
+        self._changed_at = clock()
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a call may go out now (the first call after the cooldown becomes the probe)"""
+        if self.state == self.CLOSED:
+            return True
+        with self._lock:
+            now = self.clock()
+            if self.state == self.CLOSED:
+                return True
+            # a probe that never reported back (its call was stopped by another breaker) is replaced
+            if now - self._changed_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+                self._changed_at = now
+                return True
+            return False
+
+    def retry_after(self):
+        return max(0.0, self.cooldown - (self.clock() - self._changed_at))
+
+    def record(self, failed, message=None):
+        with self._lock:
+            if not failed:
+                self.failures = 0
+                if self.state == self.HALF_OPEN:
+                    self._set(self.CLOSED)
+                return
+            self.failures += 1
+            self.last_message = message
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.threshold):
+                self.opened += 1
+                self._set(self.OPEN)
+
+    def _set(self, state):
+        self.state = state
+        self._changed_at = self.clock()
+        if state == self.OPEN:
+            count("api_circuit_opened_total", endpoint=self.endpoint, error=self.error)
+            _LOG.warning(f"⚡ Circuit open: {self.failures} '{self.error}' errors in a row from {self.endpoint}, "
+                         f"failing fast for {self.cooldown:.0f}s", event="circuit_open",
+                         endpoint=self.endpoint, error=self.error)
+        else:
+            _LOG.info(f"✅ Circuit closed: {self.endpoint} is answering without '{self.error}' again",
+                      event="circuit_closed", endpoint=self.endpoint, error=self.error)
+
+
+class ApiGuard:
+    """Adaptive concurrency + per-endpoint, per-error-class circuit breakers around API calls"""
+
+    def __init__(self, limiter=None, thresholds=API_BREAKER_THRESHOLDS, cooldown=API_BREAKER_COOLDOWN,
+                 clock=time.monotonic):
+        self.limiter = limiter or AdaptiveLimiter(clock=clock)
+        self.thresholds = thresholds
+        self.cooldown = cooldown
+        self.clock = clock
+        self.rejected = 0
+        self._breakers = {}  # endpoint -> [CircuitBreaker per error class]
+        self._watched = set()  # breakers that are not closed or have failures counted: the rest need no look
+        self._lock = threading.Lock()
+
+    def breakers(self, endpoint):
+        breakers = self._breakers.get(endpoint)
+        if breakers is None:
+            with self._lock:
+                breakers = self._breakers.setdefault(endpoint, [
+                    CircuitBreaker(endpoint, error, threshold, self.cooldown, self.clock)
+                    for error, threshold in self.thresholds.items()
+                ])
+        return breakers
+
+    def check(self, endpoint):
+        """None if the call may go out, else the fail-fast result of the open breaker"""
+        if not self._watched:
+            return None
+        for breaker in self.breakers(endpoint):
+            if not breaker.allow():
+                with self._lock:
+                    self.rejected += 1
+                count("api_circuit_rejected_total", endpoint=endpoint, error=breaker.error)
+                return {
+                    "success": False,
+                    "error": breaker.error,
+                    "message": f"{breaker.last_message or breaker.error} (not sent: too many '{breaker.error}' "
+                               f"errors in a row, retrying in {breaker.retry_after():.0f}s)",
+                    "circuit_open": True
+                }
+        return None
+
+    def finish(self, endpoint, result, elapsed, limited=True):
+        """Feed a call's result to the limiter (when it held a slot) and the breakers"""
+        if not isinstance(result, dict):
+            items = ()
+        elif result.get("success") is False:
+            items = (result,)  # the whole call was rejected
+        else:
+            items = result.get("results")
+            if not items:
+                # plain success, by far the most common answer
+                if limited:
+                    self.limiter.release(endpoint, elapsed)
+                if self._watched:
+                    self._record(endpoint, {}, 1, None)
+                return
+        total = len(items) or 1
+        errors = {}
+        for item in items:
+            error = item.get("error") if item.get("success") is False else None
+            if error is not None:
+                errors[error] = errors.get(error, 0) + 1
+
+        if limited:
+            self.limiter.release(endpoint, elapsed,
+                                 errors=sum(n for error, n in errors.items() if error in self.thresholds) / total,
+                                 overloaded=errors.get(OVERLOAD_ERROR, 0) / total)
+        if errors or self._watched:
+            self._record(endpoint, errors, total, result.get("message") if total == 1 else None)
+
+    def _record(self, endpoint, errors, total, message):
+        for breaker in self.breakers(endpoint):
+            # batches trip a breaker only when most of their items hit that error
+            failed = errors.get(breaker.error, 0) * 2 > total
+            if not failed and breaker not in self._watched:
+                continue
+            breaker.record(failed, message if failed else None)
+            with self._lock:
+                if breaker.failures or breaker.state != CircuitBreaker.CLOSED:
+                    self._watched.add(breaker)
+                else:
+                    self._watched.discard(breaker)
+
+    def call(self, endpoint, fn, *args, **kwargs):
+        rejected = self.check(endpoint)
+        if rejected:
+            return rejected
+        limited = endpoint not in UNLIMITED_ENDPOINTS
+        if limited:
+            self.limiter.acquire()
+        start = self.clock()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException:
+            if limited:
+                self.limiter.release(endpoint, self.clock() - start)
+            raise
+        self.finish(endpoint, result, self.clock() - start, limited)
+        return result
+
+    async def acall(self, endpoint, fn, *args, **kwargs):
+        rejected = self.check(endpoint)
+        if rejected:
+            return rejected
+        limited = endpoint not in UNLIMITED_ENDPOINTS
+        if limited:
+            await self.limiter.aacquire()
+        start = self.clock()
+        try:
+            result = await fn(*args, **kwargs)
+        except BaseException:
+            if limited:
+                self.limiter.release(endpoint, self.clock() - start)
+            raise
+        self.finish(endpoint, result, self.clock() - start, limited)
+        return result
+
+    def state(self):
+        """Current limit, usage and every breaker that is not closed"""
+        limiter = self.limiter
+        return {
+            "limit": int(limiter.limit),
+            "in_flight": limiter.in_flight,
+            "slow_start": limiter.slow_start,
+            "error_rate": round(limiter.error_rate, 4),
+            "overload_rate": round(limiter.overload_rate, 4),
+            "rejected": self.rejected,
+            "breakers": {f"{breaker.endpoint}/{breaker.error}": breaker.state
+                         for breakers in list(self._breakers.values()) for breaker in breakers
+                         if breaker.state != CircuitBreaker.CLOSED}
+        }
+
+    def collect(self):
+        """Gauges for metrics export: limit, in-flight calls, rates and breaker states (0 closed, 1 half-open, 2 open)"""
+        limiter = self.limiter
+        gauges = [
+            ("api_concurrency_limit", {}, int(limiter.limit)),
+            ("api_in_flight", {}, limiter.in_flight),
+            ("api_error_rate", {}, limiter.error_rate),
+            ("api_overload_rate", {}, limiter.overload_rate)
+        ]
+        levels = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+        for breakers in list(self._breakers.values()):
+            for breaker in breakers:
+                gauges.append(("api_circuit_state", {"endpoint": breaker.endpoint, "error": breaker.error},
+                               levels[breaker.state]))
+        return gauges
+
+
+def guarded(endpoint):
+    """Decorator: run every call of an API method through the shared guard (when API_GUARD_ENABLED).
+
+    The method must not wait for the OAuth token while it holds the slot: resolve the
+    token before the guarded call (see with_token() in mock_tiktok_api.py).
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _guard is None:
+                return fn(*args, **kwargs)
+            return _guard.call(endpoint, fn, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def aguarded(endpoint):
+    """guarded() for coroutine functions"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            if _guard is None:
+                return await fn(*args, **kwargs)
+            return await _guard.acall(endpoint, fn, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# One guard per process: the limit is about the API as a whole, whichever client calls it
+_guard = ApiGuard() if API_GUARD_ENABLED else None
+if _guard is not None:
+    get_metrics().add_collector(_guard.collect)
+
+
+def get_guard():
+    """Shared ApiGuard, or None when API_GUARD_ENABLED is off"""
+    return _guard
@@ -0,0 +1,220 @@
+import re
+from config import VALID_OBJECTIVES, VALID_CTAS, MAX_AD_TEXT_LENGTH, MIN_CAMPAIGN_NAME_LENGTH, MUSIC_ID_PATTERN
+
+
+class Rule:
+    """One business rule: `kind` says how `field` is checked against `param`"""
+
+    __slots__ = ("name", "error", "field", "kind", "param", "message")
+
+    def __init__(self, name, error, field, kind, param, message):
+        self.name = name
+        self.error = error      # error code reported to callers (several rules may share one)
+        self.field = field
+        self.kind = kind        # min_length | max_length | one_of | required_if | pattern | known
+        self.param = param
+        self.message = message
+
+    def describe(self, values):
+        value = values.get(self.field) or ""
+        return self.message.format(
+            value=value,
+            length=len(value),
+            limit=self.param if isinstance(self.param, int) else "",
+            choices=", ".join(self.param) if isinstance(self.param, (list, tuple)) else ""
+        )
+
+
+# The single rule table. A rule's position is its bit in the batch error bitmap.
+RULES = (
+    Rule("name_too_short", "invalid_campaign_name", "campaign_name", "min_length", MIN_CAMPAIGN_NAME_LENGTH,
+         "Campaign name must be at least {limit} characters (got {length})."),
+    Rule("objective_unknown", "invalid_objective", "objective", "one_of", VALID_OBJECTIVES,
+         "Objective '{value}' is not valid. Choose one of: {choices}."),
+    Rule("ad_text_empty", "invalid_ad_text", "text", "min_length", 1,
+         "Ad text cannot be empty."),
+    Rule("ad_text_too_long", "invalid_ad_text", "text", "max_length", MAX_AD_TEXT_LENGTH,
+         "Ad text is {length} characters, maximum is {limit}."),
+    Rule("cta_unknown", "invalid_cta", "cta", "one_of", VALID_CTAS,
+         "CTA '{value}' is not valid. Choose one of: {choices}."),
+    Rule("music_missing", "missing_music", "music_id", "required_if", ("objective", "Conversions"),
+         "Music is mandatory for Conversions campaigns."),
+    Rule("music_id_malformed", "invalid_music_id", "music_id", "pattern", re.compile(MUSIC_ID_PATTERN),
+         "Music ID '{value}' is not a valid music ID."),
+    # only evaluated when a music library is passed in (see check_payload / validate_batch)
+    Rule("music_id_unknown", "invalid_music_id", "music_id", "known", None,
+         "Music ID '{value}' was not found in the music library."),
+)
+
+FIELDS = ("campaign_name", "objective", "text", "cta", "music_id")
+
+
+def payload_values(payload):
+    """Flat field -> string view of a payload (missing values become "")"""
+    creative = payload.get("creative") or {}
+    return {
+        "campaign_name": payload.get("campaign_name") or "",
+        "objective": payload.get("objective") or "",
+        "text": creative.get("text") or "",
+        "cta": creative.get("cta") or "",
+        "music_id": creative.get("music_id") or ""
+    }
+
+
+# ---------------------------------------------------------------------------
+# Scalar evaluation: one campaign (interactive flow, validate_payload)
+
+def _fails(rule, values, known_music):
+    value = values[rule.field]
+    if rule.kind == "min_length":
+        return len(value) < rule.param
+    if rule.kind == "max_length":
+        return len(value) > rule.param
+    if rule.kind == "one_of":
+        return value not in rule.param
+    if rule.kind == "required_if":
+        other, expected = rule.param
+        return values.get(other) == expected and not value
+    if rule.kind == "pattern":
+        return bool(value) and not rule.param.fullmatch(value)
+    if rule.kind == "known":
+        return known_music is not None and bool(value) and value not in known_music
+    raise ValueError(f"Unknown rule kind '{rule.kind}'")
+
+
+def check_payload(payload, known_music=None):
+    """Errors for one payload as [{"error", "message"}] (empty when valid)"""
+    values = payload_values(payload)
+    return [{"error": rule.error, "message": rule.describe(values)}
+            for rule in RULES if _fails(rule, values, known_music)]
+
+
+def field_errors(field, value, **context):
+    """Names of the rules `value` breaks for one field; rules needing other fields use `context`"""
+    values = dict(context, **{field: value or ""})
+    failed = []
+    for rule in RULES:
+        if rule.field != field:
+            continue
+        if rule.kind == "required_if" and rule.param[0] not in values:
+            continue
+        if _fails(rule, values, None):
+            failed.append(rule.name)
+    return failed
+
+
+# ---------------------------------------------------------------------------
+# Columnar evaluation: many campaigns at once with NumPy
+
+def _numpy():
+    import numpy  # lazy: only batch validation needs it, keep it off the CLI's startup path
+    return numpy
+
+
+class _Columns:
+    """Per-field derived arrays, computed once and shared by every rule on that field"""
+
+    def __init__(self, np, columns):
+        self.np = np
+        self.columns = columns
+        self._lengths = {}
+        self._codes = {}
+
+    def lengths(self, field):
+        if field not in self._lengths:
+            column = self.columns[field]
+            self._lengths[field] = self.np.fromiter(map(len, column), dtype=self.np.int64, count=len(column))
+        return self._lengths[field]
+
+    def codes(self, field):
+        """(category code per row, distinct values in code order)"""
+        if field not in self._codes:
+            column = self.columns[field]
+            index = {value: code for code, value in enumerate(set(column))}
+            codes = self.np.fromiter(map(index.__getitem__, column), dtype=self.np.int32, count=len(column))
+            self._codes[field] = (codes, list(index))
+        return self._codes[field]
+
+    def per_value(self, field, predicate):
+        """Evaluate `predicate` once per distinct value, broadcast back to rows"""
+        codes, distinct = self.codes(field)
+        return self.np.fromiter(map(predicate, distinct), dtype=bool, count=len(distinct))[codes]
+
+
+def _fails_vector(rule, data, known_music):
+    if rule.kind == "min_length":
+        return data.lengths(rule.field) < rule.param
+    if rule.kind == "max_length":
+        return data.lengths(rule.field) > rule.param
+    if rule.kind == "one_of":
+        choices = set(rule.param)
+        return data.per_value(rule.field, lambda value: value not in choices)
+    if rule.kind == "required_if":
+        other, expected = rule.param
+        return data.per_value(other, lambda value: value == expected) & data.per_value(rule.field, lambda value: not value)
+    if rule.kind == "pattern":
+        return data.per_value(rule.field, lambda value: bool(value) and not rule.param.fullmatch(value))
+    if rule.kind == "known":
+        return data.per_value(rule.field, lambda value: bool(value) and value not in known_music)
+    raise ValueError(f"Unknown rule kind '{rule.kind}'")
+
+
+class BatchValidation:
+    """Result of validate_batch: a per-row error bitmap (bit i = RULES[i] failed)"""
+
+    def __init__(self, columns, bitmap, checked_known=False):
+        self.columns = columns
+        self.bitmap = bitmap
+        self.checked_known = checked_known  # whether music IDs were looked up in a library
+
+    def __len__(self):
+        return len(self.bitmap)
+
+    @property
+    def valid(self):
+        """Boolean mask of rows that passed every rule"""
+        return self.bitmap == 0
+
+    def invalid_rows(self):
+        return self.bitmap.nonzero()[0]
+
+    def errors(self, row):
+        """Same as check_payload() for one row, messages are built only when asked for"""
+        mask = int(self.bitmap[row])
+        if not mask:
+            return []
+        values = {field: self.columns[field][row] for field in FIELDS}
+        return [{"error": rule.error, "message": rule.describe(values)}
+                for bit, rule in enumerate(RULES) if mask >> bit & 1]
+
+    def counts(self):
+        """Failures per rule name"""
+        np = _numpy()
+        return {rule.name: int(np.count_nonzero(self.bitmap & (1 << bit)))
+                for bit, rule in enumerate(RULES) if rule.kind != "known" or self.checked_known}
+
+
+def validate_columns(columns, known_music=None):
+    """Vectorized rules over columns: {field: list of str} for every name in FIELDS ("" for missing)"""
+    np = _numpy()
+    data = _Columns(np, columns)
+    bitmap = np.zeros(len(columns[FIELDS[0]]), dtype=np.uint16)
+    for bit, rule in enumerate(RULES):
+        if rule.kind == "known" and known_music is None:
+            continue
+        bitmap |= _fails_vector(rule, data, known_music).astype(np.uint16) << np.uint16(bit)
+    return BatchValidation(columns, bitmap, checked_known=known_music is not None)
+
+
+def validate_batch(payloads, known_music=None):
+    """check_payload() for a whole list of payloads at once"""
+    # one pass per field rather than a payload_values() dict per row: this transpose is most of the cost
+    creatives = [payload.get("creative") or {} for payload in payloads]
+    columns = {
+        "campaign_name": [payload.get("campaign_name") or "" for payload in payloads],
+        "objective": [payload.get("objective") or "" for payload in payloads],
+        "text": [creative.get("text") or "" for creative in creatives],
+        "cta": [creative.get("cta") or "" for creative in creatives],
+        "music_id": [creative.get("music_id") or "" for creative in creatives]
+    }
+    return validate_columns(columns, known_music)
@@ -0,0 +1,142 @@
+import random
+import threading
+import time
+from cache import TTLCache
+from campaign import fingerprint
+from config import SUBMIT_RATE_LIMIT, SUBMIT_BURST, SUBMIT_MAX_RETRIES, SUBMIT_BACKOFF_BASE, SUBMIT_BACKOFF_MAX, IDEMPOTENCY_CACHE_SIZE
+from metrics import traced, atraced, count
+from store import get_store
+
+# Errors worth retrying; everything else (geo_restriction, insufficient_permissions,
+# invalid_music_id, missing_music, unauthorized, ...) won't change on a retry
+RETRYABLE_ERRORS = {"rate_limit"}
+
+
+class TokenBucket:
+    """Paces calls to `rate` per second with bursts of up to `capacity`"""
+
+    def __init__(self, rate=SUBMIT_RATE_LIMIT, capacity=SUBMIT_BURST, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self._tokens = float(capacity)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """Take a token (going into debt if needed), returns how long the caller must wait"""
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self):
+        wait = self._reserve()
+        if wait:
+            time.sleep(wait)
+
+    async def aacquire(self):
+        import asyncio  # lazy, see AsyncMockTikTokAPI
+        wait = self._reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+
+class SubmissionScheduler:
+    """Rate-limited, idempotent submit_ad with exponential backoff + full jitter on retryable errors.
+
+    With a `store` (see store.py) every final outcome is recorded there.
+    """
+
+    def __init__(self, bucket=None, max_retries=SUBMIT_MAX_RETRIES, backoff_base=SUBMIT_BACKOFF_BASE,
+                 backoff_max=SUBMIT_BACKOFF_MAX, rng=None, completed_size=IDEMPOTENCY_CACHE_SIZE, store=None):
+        self.bucket = bucket or TokenBucket()
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rng = rng or random.Random()
+        self.store = store
+        self.retries = 0
+        self.deduplicated = 0
+        self._lock = threading.Lock()
+        # fingerprint -> successful result, so known campaigns never hit the API again
+        self.completed = TTLCache(completed_size)
+
+    def backoff(self, attempt):
+        """Delay before retry number `attempt` (0-based)"""
+        return self.rng.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def known(self, key):
+        """Result of an already created campaign (counted as a duplicate), or None"""
+        result = self.completed.get(key)
+        if result is None:
+            return None
+        with self._lock:
+            self.deduplicated += 1
+        count("submit_deduplicated_total")
+        return dict(result, attempts=0, deduplicated=True)
+
+    def finished(self, key, result, attempt, payload=None, submitted_at=None):
+        """Record the outcome of attempt number `attempt`; False means it should be retried"""
+        # circuit_open: the guard refused to send it (resilience.py), a retry within the cooldown would be refused too
+        if (result["success"] or result.get("error") not in RETRYABLE_ERRORS or result.get("circuit_open")
+                or attempt >= self.max_retries):
+            result["attempts"] = attempt + 1
+            result["idempotency_key"] = key
+            if result["success"]:
+                self.completed.set(key, result)
+            if self.store is not None and payload is not None:
+                self.store.record(payload, result, submitted_at)
+            return True
+        with self._lock:
+            self.retries += 1
+        count("submit_retries_total", error=result.get("error"))
+        return False
+
+    @traced("scheduler_submit")
+    def submit(self, api, payload):
+        """api.submit_ad(payload), paced, retried and keyed by the payload fingerprint"""
+        key = fingerprint(payload)
+        known = self.known(key)
+        if known:
+            return known
+        attempt, submitted_at = 0, time.time()
+        while True:
+            self.bucket.acquire()
+            result = api.submit_ad(payload, idempotency_key=key)
+            if self.finished(key, result, attempt, payload, submitted_at):
+                return result
+            time.sleep(self.backoff(attempt))
+            attempt += 1
+
+    @atraced("scheduler_submit")
+    async def asubmit(self, async_api, payload):
+        """Async variant of submit()"""
+        import asyncio  # lazy, see AsyncMockTikTokAPI
+        key = fingerprint(payload)
+        known = self.known(key)
+        if known:
+            return known
+        attempt, submitted_at = 0, time.time()
+        while True:
+            await self.bucket.aacquire()
+            result = await async_api.submit_ad(payload, idempotency_key=key)
+            if self.finished(key, result, attempt, payload, submitted_at):
+                return result
+            await asyncio.sleep(self.backoff(attempt))
+            attempt += 1
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_submission_scheduler():
+    """Shared SubmissionScheduler so every agent in the process draws from one bucket (and records to one store)"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = SubmissionScheduler(store=get_store())
+        return _scheduler
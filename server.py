@@ -0,0 +1,377 @@
+import argparse
+import contextlib
+import functools
+import http.client
+import json
+import os
+import re
+import statistics
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from agent import HybridTikTokAgent
+from config import SESSION_MAX_SESSIONS, SESSION_TTL, SESSION_MAX_MEMORY_MB
+from intent import get_intent_resolver
+from metrics import get_metrics
+
+# rough fixed cost of an idle agent (objects, dicts, API clients), history is counted on top
+SESSION_BASE_BYTES = 4096
+
+
+class Session:
+    __slots__ = ("session_id", "agent", "lock", "last_seen", "counted_bytes")
+
+    def __init__(self, session_id, agent, now):
+        self.session_id = session_id
+        self.agent = agent
+        self.lock = threading.Lock()  # one turn at a time per conversation
+        self.last_seen = now
+        self.counted_bytes = 0  # what the store's running total holds for this session
+
+    def approx_bytes(self):
+        return SESSION_BASE_BYTES + self.agent.conversation_history.chars
+
+
+class SessionStore:
+    """Conversations keyed by session ID, evicted by idle TTL, count and total memory (LRU order)"""
+
+    def __init__(self, max_sessions=SESSION_MAX_SESSIONS, ttl=SESSION_TTL,
+                 max_memory_bytes=SESSION_MAX_MEMORY_MB * 1024 * 1024,
+                 agent_factory=functools.partial(HybridTikTokAgent, quiet=True), clock=time.monotonic):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_memory_bytes = max_memory_bytes
+        self.agent_factory = agent_factory
+        self.clock = clock
+        self._sessions = OrderedDict()  # least recently used first
+        self._lock = threading.Lock()
+        self.memory_bytes = 0  # running sum of counted_bytes, so eviction never walks every session
+        self.created = 0
+        self.evicted = 0
+        self.expired = 0
+
+    def create(self):
+        session = Session(uuid.uuid4().hex, self.agent_factory(), self.clock())
+        with self._lock:
+            self._sessions[session.session_id] = session
+            self._count(session)
+            self.created += 1
+            self._evict()
+        return session
+
+    def record_turn(self, session):
+        """Bring the memory total up to date after a turn added messages to `session`"""
+        with self._lock:
+            if self._sessions.get(session.session_id) is session:  # not evicted in the meantime
+                self._count(session)
+
+    def _count(self, session):
+        # caller holds self._lock
+        size = session.approx_bytes()
+        self.memory_bytes += size - session.counted_bytes
+        session.counted_bytes = size
+
+    def _drop(self, session):
+        # caller holds self._lock, session already out of self._sessions
+        self.memory_bytes -= session.counted_bytes
+        session.counted_bytes = 0
+
+    def get(self, session_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            now = self.clock()
+            if now - session.last_seen > self.ttl:
+                del self._sessions[session_id]
+                self._drop(session)
+                self.expired += 1
+                return None
+            session.last_seen = now
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def delete(self, session_id):
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is None:
+                return False
+            self._drop(session)
+            return True
+
+    def sweep(self):
+        """Drop idle sessions; also runs on every create()"""
+        with self._lock:
+            self._evict()
+
+    def _evict(self):
+        # caller holds self._lock
+        now = self.clock()
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_seen <= self.ttl:
+                break
+            self._sessions.popitem(last=False)
+            self._drop(session)
+            self.expired += 1
+
+        while len(self._sessions) > self.max_sessions:
+            self._drop(self._sessions.popitem(last=False)[1])
+            self.evicted += 1
+
+        while self.max_memory_bytes and self._sessions and self.memory_bytes > self.max_memory_bytes:
+            self._drop(self._sessions.popitem(last=False)[1])
+            self.evicted += 1
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "approx_memory_bytes": self.memory_bytes,
+                "created": self.created,
+                "evicted": self.evicted,
+                "expired": self.expired
+            }
+
+
+class ConversationHandler(BaseHTTPRequestHandler):
+    """JSON API:
+        POST   /sessions                  start a conversation
+        POST   /sessions/<id>/messages    {"message": "..."} -> agent reply
+        GET    /sessions/<id>             current step / payload
+        DELETE /sessions/<id>
+        GET    /stats
+        GET    /metrics                   Prometheus text (METRICS_ENABLED=1)
+        GET    /metrics.json              same as a JSON snapshot
+        POST   /debug/profile             {"enabled": true|false}; turning it off returns the cProfile report
+    """
+
+    protocol_version = "HTTP/1.1"  # keep-alive
+    # headers and body leave in one segment, otherwise Nagle + delayed ACK add ~40ms per response
+    wbufsize = -1
+    disable_nagle_algorithm = True
+    store = None  # set by make_server()
+    session_path = re.compile(r"^/sessions/([0-9a-f]+)(/messages)?$")
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_text(self, status, text, content_type="text/plain; version=0.0.4"):
+        data = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length))
+
+    def _not_found(self):
+        self._send(404, {"error": "session_not_found", "message": "Session does not exist or has expired."})
+
+    def _state(self, session):
+        agent = session.agent
+        body = {"session_id": session.session_id, "step": agent.current_step,
+                "complete": agent.current_step == "complete"}
+        if body["complete"]:
+            body["payload"] = agent.get_payload()
+        if agent.last_reasoning is not None:
+            body["reasoning"] = agent.last_reasoning
+        return body
+
+    def do_POST(self):
+        try:
+            body = self._read_json()
+        except ValueError:
+            return self._send(400, {"error": "invalid_json", "message": "Request body must be JSON."})
+
+        if self.path == "/debug/profile":
+            metrics = get_metrics()
+            if body.get("enabled"):
+                metrics.start_profiling()
+                return self._send(200, {"profiling": True})
+            return self._send(200, {"profiling": False, "report": metrics.stop_profiling()})
+
+        if self.path == "/sessions":
+            session = self.store.create()
+            with session.lock:
+                response = session.agent.chat("start")
+            self.store.record_turn(session)
+            return self._send(201, dict(self._state(session), response=response))
+
+        match = self.session_path.match(self.path)
+        if not match or not match.group(2):
+            return self._send(404, {"error": "not_found", "message": f"No route for POST {self.path}"})
+
+        message = body.get("message")
+        if not isinstance(message, str) or not message.strip():
+            return self._send(400, {"error": "missing_message", "message": "Body must contain a non-empty 'message'."})
+
+        session = self.store.get(match.group(1))
+        if session is None:
+            return self._not_found()
+        with session.lock:
+            response = session.agent.chat(message)
+            self.store.record_turn(session)
+            return self._send(200, dict(self._state(session), response=response))
+
+    def do_GET(self):
+        if self.path == "/stats":
+            return self._send(200, dict(self.store.stats(), intents=get_intent_resolver().stats()))
+        if self.path == "/metrics":
+            return self._send_text(200, get_metrics().to_prometheus())
+        if self.path == "/metrics.json":
+            return self._send(200, get_metrics().snapshot())
+        match = self.session_path.match(self.path)
+        if not match or match.group(2):
+            return self._send(404, {"error": "not_found", "message": f"No route for GET {self.path}"})
+        session = self.store.get(match.group(1))
+        if session is None:
+            return self._not_found()
+        self._send(200, self._state(session))
+
+    def do_DELETE(self):
+        match = self.session_path.match(self.path)
+        if not match or match.group(2):
+            return self._send(404, {"error": "not_found", "message": f"No route for DELETE {self.path}"})
+        if not self.store.delete(match.group(1)):
+            return self._not_found()
+        self._send(200, {"deleted": match.group(1)})
+
+
+class ConversationServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 2048  # the default of 5 refuses connections under load
+
+
+def make_server(host="127.0.0.1", port=8080, store=None):
+    handler = type("BoundConversationHandler", (ConversationHandler,), {"store": store or SessionStore()})
+    return ConversationServer((host, port), handler)
+
+
+def _start_sweeper(store, interval):
+    def loop():
+        while True:
+            time.sleep(interval)
+            store.sweep()
+    threading.Thread(target=loop, name="session-sweeper", daemon=True).start()
+
+
+# ---------------------------------------------------------------------------
+# Load test
+
+LOAD_TEST_SCRIPT = ["Load Test Campaign", "Traffic", "Load test ad text", "Shop Now", "3"]
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def _client_session(host, port, latencies, errors, start_barrier):
+    conn = http.client.HTTPConnection(host, port, timeout=120)
+
+    def call(method, path, body=None):
+        start = time.perf_counter()
+        conn.request(method, path, body=json.dumps(body) if body is not None else None,
+                     headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        data = json.loads(response.read())
+        latencies.append(time.perf_counter() - start)
+        if response.status >= 400:
+            raise RuntimeError(data.get("error"))
+        return data
+
+    try:
+        start_barrier.wait()
+        session_id = call("POST", "/sessions")["session_id"]
+        for message in LOAD_TEST_SCRIPT:
+            call("POST", f"/sessions/{session_id}/messages", {"message": message})
+    except Exception as e:
+        errors.append(str(e))
+    finally:
+        conn.close()
+
+
+def run_load_test(sessions, host="127.0.0.1"):
+    """Drive `sessions` concurrent conversations end to end and report turn latency"""
+    server = make_server(host, 0, SessionStore(max_sessions=max(sessions, SESSION_MAX_SESSIONS)))
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    latencies, errors = [], []
+    barrier = threading.Barrier(sessions)
+    threading.stack_size(256 * 1024)
+    clients = [threading.Thread(target=_client_session, args=(host, port, latencies, errors, barrier))
+               for _ in range(sessions)]
+
+    start = time.perf_counter()
+    # the agent's console trace would dominate the measurement
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    print("\n" + "="*50)
+    print(f"🧪 LOAD TEST: {sessions} concurrent sessions")
+    print("="*50)
+    print(f"Turns: {len(latencies)} in {elapsed:.2f}s ({len(latencies) / elapsed:.0f} turns/sec)")
+    if latencies:
+        print(f"Turn latency p50: {_percentile(latencies, 50) * 1000:.1f} ms")
+        print(f"Turn latency p99: {_percentile(latencies, 99) * 1000:.1f} ms")
+        print(f"Turn latency mean: {statistics.mean(latencies) * 1000:.1f} ms")
+    print(f"Errors: {len(errors)}")
+    print("="*50)
+    return 0 if not errors else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Multi-session TikTok ad agent over HTTP/JSON")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-sessions", type=int, default=SESSION_MAX_SESSIONS)
+    parser.add_argument("--ttl", type=float, default=SESSION_TTL, help="idle seconds before a session is dropped")
+    parser.add_argument("--max-memory-mb", type=float, default=SESSION_MAX_MEMORY_MB)
+    parser.add_argument("--load-test", type=int, metavar="SESSIONS",
+                        help="run N concurrent scripted conversations against an in-process server and exit")
+    args = parser.parse_args(argv)
+
+    if args.load_test:
+        return run_load_test(args.load_test, args.host)
+
+    store = SessionStore(args.max_sessions, args.ttl, int(args.max_memory_mb * 1024 * 1024))
+    _start_sweeper(store, interval=max(1.0, args.ttl / 10))
+    server = make_server(args.host, args.port, store)
+    print(f"🚀 Agent server listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Shutting down")
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,350 @@
+import argparse
+import collections
+import csv
+import io
+import json
+import os
+import sys
+import threading
+import time
+from config import SUBMIT_RATE_LIMIT, SUBMIT_MAX_RETRIES
+
+MANIFEST = "manifest.json"
+DEFAULT_CHECKPOINT_EVERY = 1000  # finished rows between checkpoints
+DEFAULT_CHECKPOINT_INTERVAL = 5.0  # seconds, whichever comes first
+COUNTS = ("created", "invalid", "failed", "skipped")
+SCAN_CHUNK_SIZE = 1024 * 1024  # bytes read at a time when looking for CSV shard boundaries
+
+
+def _is_jsonl(path):
+    return path.endswith((".jsonl", ".ndjson", ".json"))
+
+
+def plan_shards(path, shards):
+    """Split a CSV/JSONL file into up to `shards` byte ranges that start on a record: [(start, end)]
+
+    CSV boundaries go only on newlines outside quoted fields (an even number of quotes
+    before them), so a row whose ad text spans lines stays whole; finding them reads
+    the file once.
+    """
+    size = os.path.getsize(path)
+    jsonl = _is_jsonl(path)
+    with open(path, "rb") as f:
+        first = 0 if jsonl else len(_read_record(f, True))  # the CSV header belongs to no shard
+        bounds = [first]
+        position, quotes = first, 0  # where the CSV scan stands, and the quotes seen before it
+        for i in range(1, shards):
+            target = first + (size - first) * i // shards
+            if target <= bounds[-1]:
+                continue
+            if jsonl:
+                f.seek(target - 1)
+                f.readline()  # to the start of the next line (target itself if target - 1 is a newline)
+                boundary = f.tell()
+            else:
+                boundary, quotes = _next_record_start(f, target, position, quotes)
+                position = boundary
+            if bounds[-1] < boundary < size:
+                bounds.append(boundary)
+        bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def _next_record_start(f, target, position, quotes):
+    """First CSV record start at or after `target`, scanning on from `position` with `quotes`
+    quote characters before it. Returns (offset, quotes before it); the file size at the end"""
+    f.seek(position)
+    while True:
+        chunk = f.read(SCAN_CHUNK_SIZE)
+        if not chunk:
+            return position, quotes
+        index = max(0, target - 1 - position)  # a newline at target - 1 makes target itself a start
+        quotes += chunk.count(b'"', 0, index)
+        while True:
+            newline = chunk.find(b"\n", index)
+            if newline < 0:
+                break
+            quotes += chunk.count(b'"', index, newline + 1)
+            index = newline + 1
+            if quotes % 2 == 0:
+                return position + index, quotes
+        quotes += chunk.count(b'"', index)
+        position += len(chunk)
+
+
+def _read_record(f, csv_record):
+    """Next record as bytes: one line, or for CSV as many as it takes to close an open quoted field"""
+    record = f.readline()
+    while csv_record and record.count(b'"') % 2:
+        line = f.readline()
+        if not line:
+            break
+        record += line
+    return record
+
+
+def _parse_csv(record):
+    return next(csv.reader(io.StringIO(record.decode("utf-8"), newline="")))
+
+
+def read_range(path, start, end, skip=()):
+    """Yield (byte offset, row) for the records starting in [start, end), except the offsets in `skip`"""
+    jsonl = _is_jsonl(path)
+    with open(path, "rb") as f:
+        header = None if jsonl else _parse_csv(_read_record(f, True))
+        f.seek(start)
+        offset = start
+        while offset < end:
+            record = _read_record(f, not jsonl)
+            if not record:
+                break
+            row_offset, offset = offset, offset + len(record)
+            if row_offset in skip or not record.strip():
+                continue
+            yield row_offset, json.loads(record) if jsonl else dict(zip(header, _parse_csv(record)))
+
+
+class ShardCheckpoint:
+    """Which rows of one shard are finished, saved atomically next to its results file.
+
+    Rows finish out of order, so progress is a watermark (every row starting before
+    it is done) plus the finished offsets above it. `results_size` is how much of
+    the results file the checkpoint covers; results written after the last save
+    are read back on resume, so no finished row is submitted again.
+    """
+
+    def __init__(self, path, start, end):
+        self.path = path
+        self.start = start
+        self.end = end
+        self.watermark = start
+        self.done = set()
+        self.results_size = 0
+        self.counts = dict.fromkeys(COUNTS, 0)
+        self.unsaved = 0
+        self.lock = threading.Lock()
+        self._issued = collections.deque()  # offsets handed to the runner, oldest unfinished first
+        self._position = start  # the last offset handed out (the shard's end once all were)
+
+    @classmethod
+    def resume(cls, path, results_path, start, end):
+        """Load the checkpoint (if any) and catch up on results written after it"""
+        checkpoint = cls(path, start, end)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                state = json.load(f)
+            if (state["start"], state["end"]) != (start, end):
+                raise ValueError(f"{path} is for bytes {state['start']}-{state['end']}, not {start}-{end}")
+            checkpoint.watermark = checkpoint._position = state["watermark"]
+            checkpoint.done = set(state["done"])
+            checkpoint.results_size = state["results_size"]
+            checkpoint.counts.update(state["counts"])
+
+        if os.path.exists(results_path):
+            with open(results_path, "r+b") as f:
+                f.seek(checkpoint.results_size)
+                tail = f.read()
+                complete = tail.rfind(b"\n") + 1
+                if complete < len(tail):
+                    f.truncate(checkpoint.results_size + complete)  # drop a line cut off by a crash
+                for line in tail[:complete].splitlines():
+                    record = json.loads(line)
+                    checkpoint.done.add(record["row"])
+                    checkpoint.counts[record["status"]] += 1
+                checkpoint.results_size += complete
+        return checkpoint
+
+    @property
+    def finished(self):
+        return sum(self.counts.values())
+
+    def rows(self, input_path):
+        """Rows of the shard that are not finished yet, as (offset, row) pairs"""
+        for offset, row in read_range(input_path, self.watermark, self.end, self.done):
+            with self.lock:
+                self._issued.append(offset)
+                self._position = offset
+            yield offset, row
+        with self.lock:
+            self._position = self.end
+
+    def complete(self, record):
+        """Mark a row finished (call with `lock` held, after its result line is written)"""
+        self.done.add(record["row"])
+        self.counts[record["status"]] += 1
+        self.unsaved += 1
+        issued, done = self._issued, self.done
+        while issued and issued[0] in done:
+            issued.popleft()
+
+    def save(self, results_size):
+        """Write the checkpoint (call with `lock` held, after flushing the results up to `results_size`)"""
+        # with nothing in flight the watermark is the last row handed out, which stays in `done`
+        self.watermark = self._issued[0] if self._issued else self._position
+        self.done = {offset for offset in self.done if offset >= self.watermark}
+        self.results_size = results_size
+        state = {
+            "start": self.start, "end": self.end, "watermark": self.watermark, "done": sorted(self.done),
+            "results_size": results_size, "counts": self.counts, "saved_at": time.time()
+        }
+        temp = self.path + ".tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(temp, self.path)  # atomic: a crash leaves the previous checkpoint intact
+        self.unsaved = 0
+
+
+def run_shard(spec):
+    """Worker process: submit one shard with its own API client, scheduler and thread pool"""
+    from bulk import BulkCampaignRunner  # imported in the worker, the parent only plans
+    from scheduler import SubmissionScheduler, TokenBucket
+    from store import get_store
+
+    checkpoint = ShardCheckpoint.resume(spec["checkpoint"], spec["results"], spec["start"], spec["end"])
+    resumed = checkpoint.finished
+    scheduler = SubmissionScheduler(bucket=TokenBucket(rate=spec["rate"], capacity=max(1, int(spec["rate"]))),
+                                    max_retries=spec["retries"], store=get_store())
+    runner = BulkCampaignRunner(workers=spec["workers"], scheduler=scheduler, batch_size=spec["batch_size"])
+
+    with open(spec["results"], "ab") as out:
+        last_save = time.monotonic()
+
+        def on_result(record):
+            nonlocal last_save
+            with checkpoint.lock:
+                out.write((json.dumps(record) + "\n").encode("utf-8"))
+                checkpoint.complete(record)
+                if checkpoint.unsaved >= spec["checkpoint_every"] or time.monotonic() - last_save >= spec["checkpoint_interval"]:
+                    out.flush()
+                    checkpoint.save(out.tell())
+                    last_save = time.monotonic()
+
+        try:
+            stats = runner.run(checkpoint.rows(spec["input"]), None, on_result, keyed=True)
+        finally:
+            with checkpoint.lock:
+                out.flush()
+                checkpoint.save(out.tell())
+    if scheduler.store is not None:
+        scheduler.store.flush()
+
+    return {
+        "shard": spec["shard"],
+        "rows": stats["total"],
+        "elapsed": stats["elapsed"],
+        "resumed": resumed,
+        "counts": dict(checkpoint.counts),
+        "retries": scheduler.retries,
+        "deduplicated": scheduler.deduplicated,
+        "api_calls": runner.api_calls
+    }
+
+
+def merge_stats(results, elapsed):
+    """Totals over every shard; rows/rows_per_sec count this run only"""
+    merged = {"shards": len(results), "rows": 0, "resumed": 0, "retries": 0, "deduplicated": 0, "api_calls": 0}
+    merged.update(dict.fromkeys(COUNTS, 0))
+    for result in results:
+        for key in ("rows", "resumed", "retries", "deduplicated", "api_calls"):
+            merged[key] += result[key]
+        for key in COUNTS:
+            merged[key] += result["counts"][key]
+    merged["elapsed"] = elapsed
+    merged["rows_per_sec"] = merged["rows"] / elapsed if elapsed else 0.0
+    return merged
+
+
+def _load_manifest(path, input_path, shards, restart):
+    stat = os.stat(input_path)
+    source = {"input": os.path.abspath(input_path), "size": stat.st_size, "mtime": stat.st_mtime}
+    if os.path.exists(path) and not restart:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if {key: manifest[key] for key in source} != source:
+            raise ValueError(f"{input_path} is not the file this run started with, use restart to begin again")
+        return manifest
+    manifest = dict(source, shards=plan_shards(input_path, shards), created_at=time.time())
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def run_sharded(input_path, out_dir, shards=None, workers=16, rate=SUBMIT_RATE_LIMIT, retries=SUBMIT_MAX_RETRIES,
+                batch_size=1, checkpoint_every=DEFAULT_CHECKPOINT_EVERY, checkpoint_interval=DEFAULT_CHECKPOINT_INTERVAL,
+                restart=False, initializer=None, initargs=()):
+    """Submit a CSV/JSONL file across a process pool, one shard per process.
+
+    Results go to `out_dir`/shard-NNN.jsonl ("row" is the line's byte offset in the
+    input). Running again with the same `out_dir` resumes every shard from its
+    checkpoint; the shard plan is kept in the manifest, so `shards` only applies to
+    a new run. `rate` is the total across shards. Returns {"shards": [...], "merged": {...}}.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
+
+    os.makedirs(out_dir, exist_ok=True)
+    if restart:
+        for name in os.listdir(out_dir):
+            if name.startswith("shard-"):
+                os.remove(os.path.join(out_dir, name))
+    manifest = _load_manifest(os.path.join(out_dir, MANIFEST), input_path, shards or os.cpu_count() or 1, restart)
+
+    plan = manifest["shards"]
+    specs = [{
+        "shard": i, "input": manifest["input"], "start": start, "end": end,
+        "results": os.path.join(out_dir, f"shard-{i:03d}.jsonl"),
+        "checkpoint": os.path.join(out_dir, f"shard-{i:03d}.checkpoint.json"),
+        "workers": workers, "rate": rate / len(plan), "retries": retries, "batch_size": batch_size,
+        "checkpoint_every": checkpoint_every, "checkpoint_interval": checkpoint_interval
+    } for i, (start, end) in enumerate(plan)]
+
+    start = time.perf_counter()
+    # spawn: workers start clean instead of inheriting the parent's threads and open handles
+    with ProcessPoolExecutor(max_workers=max(1, len(specs)), mp_context=multiprocessing.get_context("spawn"),
+                             initializer=initializer, initargs=initargs) as pool:
+        results = list(pool.map(run_shard, specs))
+    return {"shards": results, "merged": merge_stats(results, time.perf_counter() - start)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk-create campaigns from a large CSV/JSONL file on every core, resumable")
+    parser.add_argument("input", help="CSV or JSONL file, one campaign per line (same columns as bulk.py)")
+    parser.add_argument("-o", "--output", default="sharded_run", help="directory for results, checkpoints and the manifest")
+    parser.add_argument("-s", "--shards", type=int, default=os.cpu_count(), help="worker processes (new runs only)")
+    parser.add_argument("-w", "--workers", type=int, default=16, help="concurrent submissions per shard")
+    parser.add_argument("--rate", type=float, default=SUBMIT_RATE_LIMIT, help="max submissions per second, all shards")
+    parser.add_argument("--retries", type=int, default=SUBMIT_MAX_RETRIES, help="retries per row on rate_limit")
+    parser.add_argument("--batch-size", type=int, default=1, help="ads per submit_ads call, as in bulk.py")
+    parser.add_argument("--checkpoint-every", type=int, default=DEFAULT_CHECKPOINT_EVERY, help="rows between checkpoints")
+    parser.add_argument("--restart", action="store_true", help="discard earlier results and checkpoints in --output")
+    args = parser.parse_args(argv)
+
+    try:
+        report = run_sharded(args.input, args.output, args.shards, args.workers, args.rate, args.retries,
+                             args.batch_size, args.checkpoint_every, restart=args.restart)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 2
+
+    merged = report["merged"]
+    print("\n" + "="*50)
+    print("📦 SHARDED RUN COMPLETE")
+    print("="*50)
+    for shard in report["shards"]:
+        counts = shard["counts"]
+        print(f"Shard {shard['shard']:3d}: {shard['rows']:8d} rows in {shard['elapsed']:7.2f}s "
+              f"(created {counts['created']}, invalid {counts['invalid']}, failed {counts['failed']})"
+              + (f", {shard['resumed']} done before" if shard["resumed"] else ""))
+    print(f"Rows this run: {merged['rows']} across {merged['shards']} shards"
+          + (f" ({merged['resumed']} already done)" if merged["resumed"] else ""))
+    print(f"Totals: created {merged['created']}, invalid {merged['invalid']}, failed {merged['failed']}")
+    print(f"Elapsed: {merged['elapsed']:.2f}s")
+    print(f"Throughput: {merged['rows_per_sec']:.1f} rows/sec")
+    print(f"Retries: {merged['retries']}, duplicates skipped: {merged['deduplicated']}")
+    print(f"Results: {args.output}/shard-*.jsonl")
+    print("="*50)
+    return 0 if merged["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
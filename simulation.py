@@ -0,0 +1,212 @@
+import asyncio
+import math
+import random
+import selectors
+from collections import deque
+from cache import TTLCache
+from config import IDEMPOTENCY_SERVER_SIZE, UPLOADED_MUSIC_LIMIT
+from mock_tiktok_api import AsyncMockTikTokAPI, LATENCY, SUBMIT_ERRORS, token_rejected
+
+
+class VirtualClock:
+    """Simulated time in seconds; only moves when something waits"""
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += max(0.0, seconds)
+
+    def sleep(self, seconds):
+        """Blocking-style sleep for sequential (non-asyncio) simulations"""
+        self.advance(seconds)
+
+
+class _VirtualTimeSelector(selectors.DefaultSelector):
+    """Instead of waiting out the loop's timeout, jump the clock forward by it"""
+
+    def __init__(self, clock):
+        super().__init__()
+        self._clock = clock
+
+    def select(self, timeout=None):
+        ready = super().select(0)
+        if ready or timeout is None:
+            # nothing scheduled: only real I/O (e.g. call_soon_threadsafe) can wake us
+            return ready or super().select(None)
+        self._clock.advance(timeout)
+        return []
+
+
+class VirtualTimeEventLoop(asyncio.SelectorEventLoop):
+    """asyncio loop running on a VirtualClock: asyncio.sleep() returns instantly in real time"""
+
+    def __init__(self, clock=None):
+        self.clock = clock or VirtualClock()
+        super().__init__(_VirtualTimeSelector(self.clock))
+
+    def time(self):
+        return self.clock.now
+
+
+def run_simulation(coro, clock=None):
+    """Run a coroutine to completion on a fresh virtual-time loop, returns its result"""
+    loop = VirtualTimeEventLoop(clock)
+    try:
+        asyncio.set_event_loop(loop)
+        return loop.run_until_complete(coro)
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+class FixedLatency:
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def sample(self, rng):
+        return self.seconds
+
+
+class LogNormalLatency:
+    """Log-normal around `median`, with occasional tail spikes of `spike_multiplier` x"""
+
+    def __init__(self, median, sigma=0.4, spike_probability=0.0, spike_multiplier=10.0):
+        self.median = median
+        self.sigma = sigma
+        self.spike_probability = spike_probability
+        self.spike_multiplier = spike_multiplier
+
+    def sample(self, rng):
+        value = self.median * math.exp(self.sigma * rng.gauss(0.0, 1.0))
+        if self.spike_probability and rng.random() < self.spike_probability:
+            value *= self.spike_multiplier
+        return value
+
+
+# Defaults roughly matching the real mock: same medians, ~10% of submissions fail evenly
+DEFAULT_LATENCY = {endpoint: LogNormalLatency(seconds, spike_probability=0.01)
+                   for endpoint, seconds in LATENCY.items()}
+DEFAULT_ERROR_RATES = {error: 0.1 / len(SUBMIT_ERRORS) for error in SUBMIT_ERRORS}
+
+
+class SimulatedTikTokAPI(AsyncMockTikTokAPI):
+    """Async mock API for load tests: virtual-time latency, seeded RNG, per-error rates and server caps.
+
+    Run it on a VirtualTimeEventLoop (see run_simulation) so waits cost no real time.
+    Calls beyond `max_concurrency` in flight, or beyond `max_qps` started in the last
+    second, are answered with `rate_limit` like a real overloaded server.
+    Pass an ApiGuard built on the loop's clock to put the client-side limiter and
+    breakers (resilience.py) in front of every call.
+    """
+
+    def __init__(self, seed=0, latency=None, error_rates=None, max_concurrency=None, max_qps=None, guard=None):
+        super().__init__()
+        self.rng = random.Random(seed)
+        self.latency = dict(DEFAULT_LATENCY, **(latency or {}))
+        self.error_rates = DEFAULT_ERROR_RATES if error_rates is None else error_rates
+        self.max_concurrency = max_concurrency
+        self.max_qps = max_qps
+        self.guard = guard
+        # private "server" state, so simulations don't see each other's campaigns
+        self._idempotent_results = TTLCache(IDEMPOTENCY_SERVER_SIZE)
+        self._idempotent_pending = {}
+        self._uploads = TTLCache(UPLOADED_MUSIC_LIMIT)
+        self._uploads_by_hash = TTLCache(UPLOADED_MUSIC_LIMIT)
+        self._music_by_hash = TTLCache(UPLOADED_MUSIC_LIMIT)
+        self._uploaded_music = TTLCache(UPLOADED_MUSIC_LIMIT)
+
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.calls = 0
+        self.throttled = 0
+        self.errors = {}
+        self._recent_starts = deque()
+
+    def _random_failure(self):
+        roll = self.rng.random()
+        for error, rate in self.error_rates.items():
+            if roll < rate:
+                return error
+            roll -= rate
+        return None
+
+    def _admit(self, now):
+        if self.max_concurrency is not None and self.in_flight >= self.max_concurrency:
+            return False
+        if self.max_qps is not None:
+            while self._recent_starts and self._recent_starts[0] <= now - 1.0:
+                self._recent_starts.popleft()
+            if len(self._recent_starts) >= self.max_qps:
+                return False
+            self._recent_starts.append(now)
+        return True
+
+    async def _call(self, endpoint, handler, *args):
+        if endpoint != "oauth_authorize":
+            await self._aresolve_token()  # before the guard hands out a slot, see with_token()
+        token = self.access_token
+        if self.guard is not None:
+            result = await self.guard.acall(endpoint, self._serve, endpoint, handler, *args)
+        else:
+            result = await self._serve(endpoint, handler, *args)
+        token_rejected(self, token, result)
+        return result
+
+    async def _serve(self, endpoint, handler, *args):
+        self.calls += 1
+        loop = asyncio.get_running_loop()
+        if not self._admit(loop.time()):
+            self.throttled += 1
+            self.errors["rate_limit"] = self.errors.get("rate_limit", 0) + 1
+            return {"success": False, "error": "rate_limit", "message": SUBMIT_ERRORS["rate_limit"]}
+
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency[endpoint].sample(self.rng))
+            result = handler(*args)
+        finally:
+            self.in_flight -= 1
+        for item in result.get("results", [result]):
+            if not item["success"]:
+                self.errors[item["error"]] = self.errors.get(item["error"], 0) + 1
+        return result
+
+    async def oauth_authorize(self, client_id, client_secret):
+        return await self._call("oauth_authorize", self._oauth_authorize, client_id, client_secret)
+
+    async def validate_music_id(self, music_id):
+        return await self._call("validate_music_id", self._validate_music_id, music_id)
+
+    async def search_music(self, query, limit=10):
+        return await self._call("search_music", self._search_music, query, limit)
+
+    async def upload_init(self, sha256, size, chunk_size, file_name=None):
+        return await self._call("upload_init", self._upload_init, sha256, size, chunk_size, file_name)
+
+    async def upload_chunk(self, upload_id, index, data, chunk_sha256=None):
+        return await self._call("upload_chunk", self._upload_chunk, upload_id, index, data, chunk_sha256)
+
+    async def upload_status(self, upload_id):
+        return await self._call("upload_init", self._upload_status, upload_id)
+
+    async def upload_complete(self, upload_id):
+        return await self._call("upload_complete", self._upload_complete, upload_id)
+
+    async def submit_ad(self, ad_payload, idempotency_key=None):
+        return await self._call("submit_ad", self._submit_ad, ad_payload, idempotency_key)
+
+    async def submit_ads(self, ad_payloads, idempotency_keys=None):
+        return await self._call("submit_ads", self._submit_ads, ad_payloads, idempotency_keys)
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "throttled": self.throttled,
+            "peak_in_flight": self.peak_in_flight,
+            "errors": dict(sorted(self.errors.items()))
+        }
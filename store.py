@@ -0,0 +1,352 @@
+import argparse
+import csv
+import json
+import sqlite3
+import sys
+import threading
+import time
+from config import RESULT_STORE_PATH, RESULT_STORE_BATCH, RESULT_STORE_INTERVAL
+from log import get_logger
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS campaigns ("
+    " id INTEGER PRIMARY KEY,"
+    " fingerprint TEXT NOT NULL,"
+    " campaign_name TEXT,"
+    " objective TEXT,"
+    " status TEXT NOT NULL,"          # created | failed
+    " campaign_id TEXT,"
+    " ad_id TEXT,"
+    " api_status TEXT,"               # status TikTok reported for the ad (ACTIVE, ...)
+    " error TEXT,"                    # error code of a failed submission (rate_limit, geo_restriction, ...)
+    " message TEXT,"
+    " attempts INTEGER,"
+    " payload TEXT NOT NULL,"         # JSON
+    " submitted_at REAL,"             # first attempt
+    " completed_at REAL)",
+    "CREATE INDEX IF NOT EXISTS idx_campaigns_campaign_id ON campaigns(campaign_id)",
+    "CREATE INDEX IF NOT EXISTS idx_campaigns_name ON campaigns(campaign_name)",
+    "CREATE INDEX IF NOT EXISTS idx_campaigns_status ON campaigns(status, completed_at)",
+    "CREATE INDEX IF NOT EXISTS idx_campaigns_fingerprint ON campaigns(fingerprint)",
+)
+COLUMNS = ("id", "fingerprint", "campaign_name", "objective", "status", "campaign_id", "ad_id", "api_status", "error",
+           "message", "attempts", "payload", "submitted_at", "completed_at")
+_INSERT = f"INSERT INTO campaigns ({', '.join(COLUMNS[1:])}) VALUES ({', '.join('?' * (len(COLUMNS) - 1))})"
+FILTERS = ("campaign_id", "campaign_name", "status", "fingerprint", "error")
+_encode = json.JSONEncoder(default=str).encode  # one shared encoder: json.dumps(default=...) builds a new one per call
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)  # sharded runs write from several processes
+    conn.execute("PRAGMA journal_mode=WAL")     # readers (the CLI, the server) never block the writer
+    conn.execute("PRAGMA synchronous=NORMAL")   # WAL stays consistent on a crash, skips an fsync per commit
+    for statement in SCHEMA:
+        conn.execute(statement)
+    conn.commit()
+    return conn
+
+
+def _row(payload, result, submitted_at, completed_at):
+    created = bool(result.get("success"))
+    return (
+        result.get("idempotency_key") or "",
+        payload.get("campaign_name"),
+        payload.get("objective"),
+        "created" if created else "failed",
+        result.get("campaign_id") if created else None,
+        result.get("ad_id") if created else None,
+        result.get("status"),
+        None if created else result.get("error") or "unknown",
+        None if created else result.get("message"),
+        result.get("attempts"),
+        _encode(payload),
+        submitted_at,
+        completed_at
+    )
+
+
+def _record(row):
+    record = dict(zip(COLUMNS, row))
+    record["payload"] = json.loads(record["payload"])
+    return record
+
+
+class CampaignStore:
+    """Append-only SQLite (WAL) record of every finished submission.
+
+    record() only enqueues; a background thread serializes and inserts whole batches
+    in one transaction, so submitting threads never wait on the disk. Rows are never
+    updated: a campaign submitted twice has two records. Reads flush first, so they
+    see everything recorded by this process. Nothing is opened until the first
+    record or read.
+    """
+
+    def __init__(self, path=RESULT_STORE_PATH, batch_size=RESULT_STORE_BATCH, interval=RESULT_STORE_INTERVAL):
+        self.path = path
+        self.batch_size = batch_size
+        self.interval = interval
+        self.written = 0
+        self.log = get_logger("store", quiet=True)
+        self._conn = None  # read connection
+        self._writer = None
+        self._lock = threading.Lock()
+        self._read_lock = threading.Lock()
+
+    def _start(self):
+        with self._lock:
+            if self._writer is None:
+                import queue  # lazy, like the log sink
+                self._empty = queue.Empty
+                self._queue = queue.SimpleQueue()
+                self._wake = threading.Event()
+                self._writer = threading.Thread(target=self._drain, name="result-store", daemon=True)
+                self._writer.start()
+
+    def record(self, payload, result, submitted_at=None):
+        """Queue one finished submission (`result` as returned by the scheduler)"""
+        if self._writer is None:
+            self._start()
+        now = time.time()
+        self._queue.put((payload, result, submitted_at or now, now))
+
+    def _drain(self):
+        conn = _connect(self.path)  # the writer's own connection
+        running = True
+        while running:
+            batch, waiters = [], []
+            item = self._queue.get()
+            while True:
+                if item is None:
+                    running = False
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)  # a flush(): everything queued before it is in this batch
+                else:
+                    batch.append(_row(*item))
+                if not running or waiters or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except self._empty:
+                    break
+            if batch:
+                try:
+                    with conn:
+                        conn.executemany(_INSERT, batch)
+                    self.written += len(batch)
+                except sqlite3.Error as e:
+                    self.log.error(f"❌ Result store write failed: {e}", event="store_error", rows=len(batch))
+            for waiter in waiters:
+                waiter.set()
+            if running and not waiters and len(batch) < self.batch_size:
+                # let rows pile up instead of waking for every single one; flush() cuts this short
+                self._wake.wait(self.interval)
+                self._wake.clear()
+        conn.close()
+
+    def flush(self, timeout=None):
+        """Block until everything recorded so far is written"""
+        if self._writer is None or not self._writer.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        self._wake.set()
+        return done.wait(timeout)
+
+    def close(self):
+        if self._writer is not None and self._writer.is_alive():
+            self._queue.put(None)
+            self._wake.set()
+            self._writer.join()
+        with self._read_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # -- queries -------------------------------------------------------------
+
+    def _query(self, sql, params=()):
+        with self._read_lock:
+            if self._conn is None:
+                self._conn = _connect(self.path)
+            return self._conn.execute(sql, params).fetchall()
+
+    def _select(self, filters, since=None, until=None, limit=None):
+        unknown = set(filters) - set(FILTERS)
+        if unknown:
+            raise ValueError(f"Unknown filter(s): {', '.join(sorted(unknown))} (expected {', '.join(FILTERS)})")
+        where, params = [], []
+        for name, value in filters.items():
+            if value is not None:
+                where.append(f"{name} = ?")
+                params.append(value)
+        if since is not None:
+            where.append("completed_at >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("completed_at < ?")
+            params.append(until)
+        sql = f"SELECT {', '.join(COLUMNS)} FROM campaigns"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY id"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return sql, params
+
+    def iter_records(self, since=None, until=None, limit=None, **filters):
+        """Records matching the filters (exact match on FILTERS, time range on completed_at), oldest first"""
+        self.flush()
+        sql, params = self._select(filters, since, until, limit)
+        # a separate connection per scan: a long export must not hold up other lookups
+        conn = _connect(self.path)
+        try:
+            for row in conn.execute(sql, params):
+                yield _record(row)
+        finally:
+            conn.close()
+
+    def find(self, limit=100, since=None, until=None, **filters):
+        """Like iter_records(), as a list (for lookups, uses the store's own read connection)"""
+        self.flush()
+        sql, params = self._select(filters, since, until, limit)
+        return [_record(row) for row in self._query(sql, params)]
+
+    def get(self, campaign_id):
+        """The created record for a TikTok campaign ID, or None"""
+        records = self.find(limit=1, campaign_id=campaign_id, status="created")
+        return records[0] if records else None
+
+    def stats(self):
+        """{"total", "by_status": {status: n}, "by_error": {error: n}}"""
+        self.flush()
+        by_status = dict(self._query("SELECT status, COUNT(*) FROM campaigns GROUP BY status"))
+        by_error = dict(self._query(
+            "SELECT error, COUNT(*) FROM campaigns WHERE error IS NOT NULL GROUP BY error ORDER BY 2 DESC"))
+        return {"total": sum(by_status.values()), "by_status": by_status, "by_error": by_error}
+
+    def duplicates(self, limit=100):
+        """Same campaign created as several TikTok campaigns: [{"fingerprint", "campaign_name", "count", "campaign_ids"}]"""
+        # records that got the same campaign_id back (the API's idempotency caught it) are not duplicates
+        self.flush()
+        rows = self._query(
+            "SELECT fingerprint, MIN(campaign_name), COUNT(DISTINCT campaign_id), GROUP_CONCAT(DISTINCT campaign_id)"
+            " FROM campaigns WHERE status = 'created' GROUP BY fingerprint HAVING COUNT(DISTINCT campaign_id) > 1"
+            " ORDER BY 3 DESC LIMIT ?",
+            (limit,)
+        )
+        return [{"fingerprint": key, "campaign_name": name, "count": n, "campaign_ids": ids.split(",")}
+                for key, name, n, ids in rows]
+
+    def created_fingerprints(self):
+        """Fingerprints of every campaign already created (to skip them when re-running a file)"""
+        self.flush()
+        return {key for (key,) in self._query("SELECT DISTINCT fingerprint FROM campaigns WHERE status = 'created'")}
+
+    def export(self, out, format="jsonl", **filters):
+        """Write matching records to `out` as JSON lines or CSV (payload as JSON text), returns the count"""
+        written = 0
+        if format == "csv":
+            writer = csv.writer(out)
+            writer.writerow(COLUMNS)
+            for record in self.iter_records(**filters):
+                record["payload"] = json.dumps(record["payload"])
+                writer.writerow([record[column] for column in COLUMNS])
+                written += 1
+        elif format == "jsonl":
+            for record in self.iter_records(**filters):
+                out.write(json.dumps(record) + "\n")
+                written += 1
+        else:
+            raise ValueError(f"Unknown export format '{format}' (expected 'jsonl' or 'csv')")
+        return written
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Shared CampaignStore at RESULT_STORE_PATH, or None when the path is empty"""
+    global _store
+    if not RESULT_STORE_PATH:
+        return None
+    with _store_lock:
+        if _store is None:
+            import atexit
+            _store = CampaignStore()
+            atexit.register(_store.close)
+        return _store
+
+
+def _filters(args):
+    return {name: getattr(args, name) for name in FILTERS if getattr(args, name) is not None}
+
+
+def _timestamp(value):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(value)) if value else ""
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query and export the campaign result store")
+    parser.add_argument("--db", default=RESULT_STORE_PATH or "campaigns.sqlite3", help="store file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    query = commands.add_parser("query", help="list matching records, oldest first")
+    export = commands.add_parser("export", help="write records as JSONL or CSV")
+    for command in (query, export):
+        command.add_argument("--campaign-id", dest="campaign_id")
+        command.add_argument("--name", dest="campaign_name")
+        command.add_argument("--status", choices=["created", "failed"])
+        command.add_argument("--fingerprint")
+        command.add_argument("--error", help="error code, e.g. rate_limit")
+        command.add_argument("--since", type=float, help="unix time, completed at or after")
+    query.add_argument("-n", "--limit", type=int, default=50)
+    query.add_argument("--json", action="store_true", help="full records as JSON lines")
+    export.add_argument("-o", "--output", help="file to write (default stdout)")
+    export.add_argument("--format", choices=["jsonl", "csv"],
+                        help="default from the --output extension, else jsonl")
+    commands.add_parser("stats", help="records by status and error")
+    duplicates = commands.add_parser("duplicates", help="campaigns created more than once")
+    duplicates.add_argument("-n", "--limit", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    with CampaignStore(args.db) as store:
+        if args.command == "stats":
+            stats = store.stats()
+            print(f"Records: {stats['total']}")
+            for status, n in stats["by_status"].items():
+                print(f"  {status}: {n}")
+            for error, n in stats["by_error"].items():
+                print(f"  ✗ {error}: {n}")
+        elif args.command == "duplicates":
+            for entry in store.duplicates(args.limit):
+                print(f"{entry['fingerprint'][:12]}\t{entry['count']}x\t{entry['campaign_name']}\t"
+                      f"{', '.join(entry['campaign_ids'])}")
+        elif args.command == "query":
+            for record in store.iter_records(since=args.since, limit=args.limit, **_filters(args)):
+                if args.json:
+                    print(json.dumps(record))
+                else:
+                    outcome = record["campaign_id"] if record["status"] == "created" else record["error"]
+                    print(f"{_timestamp(record['completed_at'])}\t{record['status']}\t{outcome}\t{record['campaign_name']}")
+        else:
+            format = args.format or ("csv" if (args.output or "").endswith(".csv") else "jsonl")
+            out = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+            try:
+                written = store.export(out, format, since=args.since, **_filters(args))
+            finally:
+                if args.output:
+                    out.close()
+            if args.output:
+                print(f"📦 Exported {written} records to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
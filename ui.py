@@ -1,49 +1,168 @@
+import csv
+import io
+import json
+import queue
+import threading
+import time
 import streamlit as st
 from agent import HybridTikTokAgent
+from auth import get_token_manager
+from bulk import BulkCampaignRunner
+from mock_tiktok_api import create_api, create_async_api
+from scheduler import get_submission_scheduler
+
+BULK_WORKERS = 16
+REFRESH_INTERVAL = 0.25  # seconds between progress / table redraws on the bulk page
+LIVE_TABLE_ROWS = 50  # latest results shown while a bulk run is going, the full table comes at the end
 
 st.set_page_config(page_title="TikTok Ad AI Agent", layout="centered")
 
+
+# Streamlit re-runs this script on every interaction: build the API clients once per
+# process (shared by every browser session) and one agent per session
+@st.cache_resource
+def shared_api(quiet=False):
+    """Blocking + asyncio API clients on the process-wide OAuth token"""
+    tokens = get_token_manager()
+    tokens.prefetch()  # OAuth in the background while the first page renders
+    api = create_api(quiet=quiet)
+    async_api = create_async_api(quiet=quiet)
+    api.token_provider = tokens.get_token
+    async_api.token_provider = tokens.aget_token
+    api.on_unauthorized = async_api.on_unauthorized = tokens.invalidate
+    return api, async_api
+
+
+def session_agent():
+    if "agent" not in st.session_state:
+        api, async_api = shared_api()
+        st.session_state.agent = HybridTikTokAgent(api=api, async_api=async_api)
+    return st.session_state.agent
+
+
+def campaign_page():
+    st.header("Campaign Details")
+
+    campaign_name = st.text_input("Campaign Name (min 3 chars)")
+    objective = st.selectbox("Objective", ["Traffic", "Conversions"])
+    ad_text = st.text_area("Ad Text (max 100 chars)")
+    cta = st.selectbox(
+        "Call To Action",
+        ["Shop Now", "Learn More", "Sign Up", "Download", "Get App", "Watch Now"]
+    )
+
+    st.header("Music")
+
+    music_option = st.radio(
+        "Music Option",
+        ["No Music", "Use Existing Music", "Upload Custom Music"]
+    )
+
+    music_id = None
+    music_file = None
+    if music_option == "Use Existing Music":
+        music_id = st.text_input("Enter Music ID (e.g. music_12345)")
+    elif music_option == "Upload Custom Music":
+        music_file = st.file_uploader("Upload Music File", type=["mp3", "wav", "m4a", "aac", "ogg"])
+
+    if st.button("Create Campaign"):
+        with st.spinner("Validating and creating campaign..."):
+            result = session_agent().run_from_ui(
+                campaign_name=campaign_name,
+                objective=objective,
+                ad_text=ad_text,
+                cta=cta,
+                music_option=music_option,
+                music_id=music_id,
+                music_file=music_file
+            )
+
+        if "error" in result:
+            st.error(result["error"])
+        else:
+            st.success("Campaign created successfully!")
+            st.json(result["payload"])
+
+
+def read_upload(upload):
+    """Rows of an uploaded CSV (BOM-tolerant, as exported by Excel)"""
+    return list(csv.DictReader(io.StringIO(upload.getvalue().decode("utf-8-sig"))))
+
+
+def run_bulk(rows, workers, progress, table):
+    """Submit rows on a worker thread, redrawing the progress bar and the latest results as rows finish"""
+    finished = queue.SimpleQueue()
+    outcome = {}
+    api, _ = shared_api(quiet=True)
+    runner = BulkCampaignRunner(api=api, workers=workers, scheduler=get_submission_scheduler())
+
+    def work():
+        try:
+            outcome["stats"] = runner.run(rows, None, on_result=finished.put)
+        except Exception as e:
+            outcome["error"] = str(e)
+
+    # only this (script) thread touches Streamlit elements, the runner's threads just queue records
+    worker = threading.Thread(target=work, name="bulk-ui", daemon=True)
+    worker.start()
+    records = []
+    created = 0
+    while True:
+        alive = worker.is_alive()
+        arrived = len(records)
+        while not finished.empty():
+            records.append(finished.get())
+        created += sum(1 for record in records[arrived:] if record["status"] == "created")
+        progress.progress(len(records) / len(rows),
+                          text=f"{len(records)}/{len(rows)} done · {created} created · "
+                               f"{len(records) - created} not created")
+        if len(records) > arrived:
+            table.dataframe(records[-LIVE_TABLE_ROWS:])
+        if not alive:
+            break
+        time.sleep(REFRESH_INTERVAL)
+    return records, outcome
+
+
+def bulk_page():
+    st.header("Bulk Upload")
+    st.caption("CSV columns: campaign_name, objective, ad_text, cta, music_id (optional)")
+
+    upload = st.file_uploader("Campaigns CSV", type=["csv"])
+    workers = st.number_input("Concurrent submissions", min_value=1, max_value=64, value=BULK_WORKERS)
+    if upload is None:
+        return
+
+    rows = read_upload(upload)
+    st.write(f"{len(rows)} campaigns in {upload.name}")
+    if rows and st.button("Submit Campaigns"):
+        progress = st.progress(0.0, text="Starting...")
+        table = st.empty()
+        records, outcome = run_bulk(rows, int(workers), progress, table)
+        table.empty()  # the finished table is drawn below, with the summary
+        # keep the results across reruns (e.g. clicking the download button)
+        st.session_state.bulk_results = {"name": upload.name, "records": records, **outcome}
+
+    results = st.session_state.get("bulk_results")
+    if not results or results["name"] != upload.name:
+        return
+    if "error" in results:
+        st.error(results["error"])
+        return
+    stats = results["stats"]
+    st.success(f"Created {stats['created']} of {stats['total']} campaigns in {stats['elapsed']:.1f}s "
+               f"(invalid {stats['invalid']}, failed {stats['failed']})")
+    st.dataframe(results["records"])
+    st.download_button("Download results (JSONL)",
+                       "".join(json.dumps(record) + "\n" for record in results["records"]),
+                       file_name="results.jsonl", mime="application/jsonl")
+
+
 st.title("🎯 TikTok Ad Campaign AI Agent")
 st.caption("Hybrid AI Agent with deterministic validation")
 
-agent = HybridTikTokAgent()
-
-st.header("Campaign Details")
-
-campaign_name = st.text_input("Campaign Name (min 3 chars)")
-objective = st.selectbox("Objective", ["Traffic", "Conversions"])
-ad_text = st.text_area("Ad Text (max 100 chars)")
-cta = st.selectbox(
-    "Call To Action",
-    ["Shop Now", "Learn More", "Sign Up", "Download", "Get App", "Watch Now"]
-)
-
-st.header("Music")
-
-music_option = st.radio(
-    "Music Option",
-    ["No Music", "Use Existing Music", "Upload Custom Music"]
-)
-
-music_id = None
-if music_option == "Use Existing Music":
-    music_id = st.text_input("Enter Music ID (e.g. music_12345)")
-elif music_option == "Upload Custom Music":
-    music_file = st.file_uploader("Upload Music File")
-
-if st.button("Create Campaign"):
-    with st.spinner("Validating and creating campaign..."):
-        result = agent.run_from_ui(
-            campaign_name=campaign_name,
-            objective=objective,
-            ad_text=ad_text,
-            cta=cta,
-            music_option=music_option,
-            music_id=music_id
-        )
-
-    if "error" in result:
-        st.error(result["error"])
-    else:
-        st.success("Campaign created successfully!")
-        st.json(result["payload"])
+page = st.sidebar.radio("Page", ["Create Campaign", "Bulk Upload"])
+if page == "Create Campaign":
+    campaign_page()
+else:
+    bulk_page()
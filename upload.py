@@ -0,0 +1,183 @@
+import contextlib
+import hashlib
+import io
+import mmap
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import UPLOAD_CHUNK_SIZE, UPLOAD_PARALLELISM, UPLOAD_CHUNK_RETRIES
+from metrics import count
+
+# Chunk errors worth sending the same bytes again for
+RETRYABLE_CHUNK_ERRORS = {"chunk_upload_failed", "chunk_checksum_mismatch", "timeout", "network_error"}
+
+
+def source_name(source):
+    """Human-readable name of an upload source"""
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.basename(os.fspath(source))
+    name = getattr(source, "name", None)
+    return os.path.basename(name) if isinstance(name, str) else "music file"
+
+
+@contextlib.contextmanager
+def _mapped(f):
+    size = os.fstat(f.fileno()).st_size
+    if not size:
+        yield memoryview(b"")  # empty files can't be mapped
+        return
+    mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapping)
+    try:
+        yield view
+    finally:
+        view.release()
+        mapping.close()
+
+
+@contextlib.contextmanager
+def open_source(source):
+    """Read-only memoryview over the audio, backed by the page cache rather than a copy.
+
+    Accepts a path, bytes-like object or file object (including Streamlit's UploadedFile).
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        with memoryview(source) as view:
+            yield view
+        return
+
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f, _mapped(f) as view:
+            yield view
+        return
+
+    if hasattr(source, "getbuffer"):  # BytesIO: already in memory, share its buffer
+        with source.getbuffer() as view:
+            yield view
+        return
+
+    try:
+        source.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        # pipes, sockets, wrappers: spool to disk once, then map that
+        import shutil, tempfile  # rare path, keep them off startup
+        with tempfile.TemporaryFile() as spool:
+            shutil.copyfileobj(source, spool, UPLOAD_CHUNK_SIZE)
+            spool.flush()
+            with _mapped(spool) as view:
+                yield view
+        return
+
+    with _mapped(source) as view:
+        yield view
+
+
+class ChunkedUploader:
+    """Uploads a music file in fixed-size chunks: deduplicated by sha256, parallel and resumable.
+
+    `api` is any client with upload_init / upload_chunk / upload_complete (sync for
+    upload(), awaitable for aupload()). When chunks still fail after retries the
+    result carries the upload_id; uploading the same file again resumes it.
+    """
+
+    def __init__(self, api, chunk_size=UPLOAD_CHUNK_SIZE, parallelism=UPLOAD_PARALLELISM,
+                 chunk_retries=UPLOAD_CHUNK_RETRIES, retry_delay=0.1):
+        self.api = api
+        self.chunk_size = chunk_size
+        self.parallelism = max(1, parallelism)
+        self.chunk_retries = chunk_retries
+        self.retry_delay = retry_delay
+
+    def upload(self, source):
+        """Upload `source`, returns {"success", "music_id", ...} or an error dict"""
+        try:
+            with open_source(source) as view:
+                digest = hashlib.sha256(view).hexdigest()
+                init = self.api.upload_init(digest, view.nbytes, self.chunk_size, source_name(source))
+                if not init["success"] or "music_id" in init:
+                    return init
+
+                missing = self._missing(init, view.nbytes)
+                if missing:
+                    with ThreadPoolExecutor(max_workers=min(self.parallelism, len(missing))) as pool:
+                        results = list(pool.map(lambda index: self._send(init, view, index), missing))
+                    failure = self._failure(init, results)
+                    if failure:
+                        return failure
+            return self.api.upload_complete(init["upload_id"])
+        except OSError as e:
+            return self._file_error(source, e)
+
+    async def aupload(self, source):
+        """Async variant of upload()"""
+        import asyncio  # lazy, see AsyncMockTikTokAPI
+        try:
+            with open_source(source) as view:
+                digest = await asyncio.to_thread(lambda: hashlib.sha256(view).hexdigest())
+                init = await self.api.upload_init(digest, view.nbytes, self.chunk_size, source_name(source))
+                if not init["success"] or "music_id" in init:
+                    return init
+
+                slots = asyncio.Semaphore(self.parallelism)
+
+                async def send(index):
+                    async with slots:
+                        return await self._asend(init, view, index)
+
+                results = await asyncio.gather(*(send(index) for index in self._missing(init, view.nbytes)))
+                failure = self._failure(init, results)
+                if failure:
+                    return failure
+            return await self.api.upload_complete(init["upload_id"])
+        except OSError as e:
+            return self._file_error(source, e)
+
+    def _missing(self, init, size):
+        """Chunk indexes the server doesn't have yet (all of them unless resuming)"""
+        received = set(init["received"])
+        return [index for index in range(-(-size // init["chunk_size"])) if index not in received]
+
+    def _send(self, init, view, index):
+        start = index * init["chunk_size"]
+        with view[start:start + init["chunk_size"]] as chunk:
+            digest = hashlib.sha256(chunk).hexdigest()
+            for attempt in range(self.chunk_retries + 1):
+                if attempt:
+                    count("upload_chunk_retries_total", error=result.get("error"))
+                    time.sleep(self.retry_delay * 2 ** (attempt - 1))
+                result = self.api.upload_chunk(init["upload_id"], index, chunk, digest)
+                if result["success"] or result.get("error") not in RETRYABLE_CHUNK_ERRORS:
+                    break
+        return result
+
+    async def _asend(self, init, view, index):
+        import asyncio
+        start = index * init["chunk_size"]
+        with view[start:start + init["chunk_size"]] as chunk:
+            digest = hashlib.sha256(chunk).hexdigest()
+            for attempt in range(self.chunk_retries + 1):
+                if attempt:
+                    count("upload_chunk_retries_total", error=result.get("error"))
+                    await asyncio.sleep(self.retry_delay * 2 ** (attempt - 1))
+                result = await self.api.upload_chunk(init["upload_id"], index, chunk, digest)
+                if result["success"] or result.get("error") not in RETRYABLE_CHUNK_ERRORS:
+                    break
+        return result
+
+    def _failure(self, init, results):
+        failed = [result for result in results if not result["success"]]
+        if not failed:
+            return None
+        return {
+            "success": False,
+            "error": failed[0]["error"],
+            "message": f"{len(failed)} chunk(s) failed to upload ({failed[0]['message']}). Upload the same file again to resume.",
+            "upload_id": init["upload_id"]
+        }
+
+    def _file_error(self, source, e):
+        if isinstance(e, FileNotFoundError):
+            return {"success": False, "error": "file_not_found",
+                    "message": f"Music file '{source_name(source)}' does not exist."}
+        return {"success": False, "error": "file_unreadable",
+                "message": f"Could not read music file '{source_name(source)}': {e.strerror or e}"}
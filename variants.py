@@ -0,0 +1,218 @@
+import argparse
+import json
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from config import (MAX_AD_TEXT_LENGTH, VARIANT_COUNT, VARIANT_CONCURRENCY, VARIANT_MAX_ATTEMPTS,
+                    VARIANT_SIMILARITY)
+from llm import get_llm
+from metrics import span, count
+from rules import field_errors
+
+# one angle per variant slot, so the prompts (and the cached answers) differ
+ANGLES = ["benefit", "urgency", "curiosity", "social proof", "playful", "minimal", "offer", "question hook"]
+
+PROMPT = """Write one TikTok ad text for the campaign "{name}" (objective: {objective}).
+Angle: {angle}. At most {limit} characters, no hashtags, no quotes. Reply with the text only.{feedback}"""
+
+_RETRY = object()  # _check() verdict: ask again with feedback in the prompt
+_WORD = re.compile(r"[a-z0-9]+")
+_LIST_MARKER = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s*")
+
+
+def clean(reply):
+    """First non-empty line of an LLM reply, without list markers or wrapping quotes"""
+    for line in (reply or "").splitlines():
+        line = _LIST_MARKER.sub("", line).strip().strip("\"'“”").strip()
+        if line:
+            return line
+    return ""
+
+
+def trim(text, limit=MAX_AD_TEXT_LENGTH):
+    """Cut at the last word boundary that fits, dropping dangling punctuation"""
+    if len(text) <= limit:
+        return text
+    cut = text[:limit + 1].rsplit(" ", 1)[0] if " " in text[:limit + 1] else text[:limit]
+    return cut[:limit].rstrip(" ,;:-–—")
+
+
+def words(text):
+    return frozenset(_WORD.findall(text.lower()))
+
+
+def similar(a, b, threshold=VARIANT_SIMILARITY):
+    """Near-identical by word overlap (Jaccard), so "Shop now!" and "shop now" are one variant"""
+    if not a or not b:
+        return a == b
+    return len(a & b) / len(a | b) >= threshold
+
+
+class _Slot:
+    """One variant of one campaign, through its attempts"""
+
+    __slots__ = ("campaign", "index", "attempt", "feedback")
+
+    def __init__(self, campaign, index):
+        self.campaign = campaign
+        self.index = index
+        self.attempt = 0
+        self.feedback = ""
+
+
+class _Campaign:
+    __slots__ = ("index", "row", "accepted")
+
+    def __init__(self, index, row):
+        self.index = index
+        self.row = row
+        self.accepted = []  # (words, text) of the variants kept so far
+
+
+class VariantGenerator:
+    """Several AI ad texts per campaign: prompts fanned out to a thread pool, at most `concurrency` in flight.
+
+    Each answer is checked as it arrives: too long -> asked again with the length
+    in the prompt, trimmed on the last attempt; near-duplicate of a kept variant ->
+    asked again for something different, dropped on the last attempt. Variants are
+    streamed in completion order.
+    """
+
+    def __init__(self, llm=None, variants=VARIANT_COUNT, concurrency=VARIANT_CONCURRENCY,
+                 max_attempts=VARIANT_MAX_ATTEMPTS):
+        self.llm = llm
+        self.variants = variants
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.stats = dict.fromkeys(("prompts", "accepted", "regenerated", "trimmed", "duplicates", "failed"), 0)
+
+    def prompt(self, slot):
+        row = slot.campaign.row
+        return PROMPT.format(name=row.get("campaign_name") or "our brand", objective=row.get("objective") or "Traffic",
+                             angle=ANGLES[slot.index % len(ANGLES)], limit=MAX_AD_TEXT_LENGTH, feedback=slot.feedback)
+
+    def _ask(self, prompt):
+        with span("llm", purpose="ad_variant") as llm_span:
+            try:
+                return clean((self.llm or get_llm()).generate(prompt))
+            except Exception as e:
+                llm_span.fail(type(e).__name__)
+                return None
+
+    def stream(self, rows):
+        """Yield {"index", "campaign_name", "variant", "text", "attempts", "trimmed"} as variants are accepted"""
+        campaigns = (_Campaign(index, row) for index, row in enumerate(rows))
+        fresh = (_Slot(campaign, i) for campaign in campaigns for i in range(self.variants))
+        retries = deque()
+        pending = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="variants") as pool:
+            while True:
+                # keep the pool full; retries first so campaigns finish instead of piling up
+                while len(pending) < self.concurrency:
+                    slot = retries.popleft() if retries else next(fresh, None)
+                    if slot is None:
+                        break
+                    slot.attempt += 1
+                    pending[pool.submit(self._ask, self.prompt(slot))] = slot
+                if not pending:
+                    return
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    slot = pending.pop(future)
+                    variant = self._check(slot, future.result())
+                    if variant is None:
+                        continue
+                    if variant is _RETRY:
+                        retries.append(slot)
+                        continue
+                    yield variant
+
+    def _check(self, slot, text):
+        """Accepted variant, _RETRY, or None when the slot is given up"""
+        self._count("prompts")
+        last = slot.attempt >= self.max_attempts
+        campaign = slot.campaign
+        trimmed = False
+
+        if not text:
+            slot.feedback = ""
+            return self._give_up("failed") if last else self._retry()
+        if field_errors("text", text):
+            if not last:
+                slot.feedback = f"\nYour previous text had {len(text)} characters, stay under {MAX_AD_TEXT_LENGTH}."
+                return self._retry()
+            text, trimmed = trim(text), True
+            self._count("trimmed")
+
+        key = words(text)
+        duplicate = next((kept for kept_words, kept in campaign.accepted if similar(key, kept_words)), None)
+        if duplicate is not None:
+            if not last:
+                slot.feedback = f"\nYour previous text was too close to \"{duplicate}\", write something different."
+                return self._retry()
+            return self._give_up("duplicates")
+
+        campaign.accepted.append((key, text))
+        self._count("accepted")
+        count("ad_variants_total", outcome="trimmed" if trimmed else "accepted")
+        return {"index": campaign.index, "campaign_name": campaign.row.get("campaign_name"), "variant": slot.index,
+                "text": text, "attempts": slot.attempt, "trimmed": trimmed}
+
+    def _retry(self):
+        self._count("regenerated")
+        return _RETRY
+
+    def _give_up(self, reason):
+        self._count(reason)
+        count("ad_variants_total", outcome=reason)
+        return None
+
+    def _count(self, key):
+        # only the thread consuming stream() gets here
+        self.stats[key] += 1
+
+    def generate(self, rows):
+        """All variants, as one list of texts per row (in variant order)"""
+        rows = list(rows)
+        texts = [{} for _ in rows]
+        for variant in self.stream(rows):
+            texts[variant["index"]][variant["variant"]] = variant["text"]
+        return [[found[i] for i in sorted(found)] for found in texts]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate AI ad-text variants for every campaign in a CSV or JSONL file")
+    parser.add_argument("input", help="CSV or JSONL file with campaign_name (and objective)")
+    parser.add_argument("-o", "--output", default="variants.jsonl", help="where to stream variants (JSONL)")
+    parser.add_argument("-n", "--variants", type=int, default=VARIANT_COUNT, help="variants per campaign")
+    parser.add_argument("-c", "--concurrency", type=int, default=VARIANT_CONCURRENCY, help="LLM prompts in flight")
+    args = parser.parse_args(argv)
+
+    from bulk import read_rows  # only the CLI reads files
+    generator = VariantGenerator(variants=args.variants, concurrency=args.concurrency)
+    start = time.perf_counter()
+    first = None
+    with open(args.output, "w", encoding="utf-8") as out:
+        for variant in generator.stream(read_rows(args.input)):
+            first = first or time.perf_counter() - start
+            out.write(json.dumps(variant, ensure_ascii=False) + "\n")
+    elapsed = time.perf_counter() - start
+
+    stats = generator.stats
+    print("\n" + "="*50)
+    print("✍️  AD TEXT VARIANTS")
+    print("="*50)
+    print(f"Variants: {stats['accepted']} (trimmed {stats['trimmed']}, duplicates dropped {stats['duplicates']}, "
+          f"failed {stats['failed']})")
+    print(f"Prompts: {stats['prompts']} ({stats['regenerated']} regenerations)")
+    print(f"Elapsed: {elapsed:.2f}s" + (f", first variant after {first:.2f}s" if first else ""))
+    print(f"Throughput: {stats['accepted'] / elapsed:.1f} variants/sec")
+    print(f"Results: {args.output}")
+    print("="*50)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())